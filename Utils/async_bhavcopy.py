@@ -0,0 +1,213 @@
+"""
+asyncio bhavcopy downloads: many dates in flight on one thread
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class AsyncExchangeGate:
+    """
+    Awaitable front for an AdaptiveRateLimiter.
+
+    Uses the limiter's non-blocking try_acquire(), so the async path follows
+    the same AIMD limit, cooldowns and throughput stats as the threaded one
+    without ever blocking the event loop.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self._released = asyncio.Event()
+
+    async def acquire(self):
+        while True:
+            wait = self.limiter.try_acquire()
+            if wait == 0:
+                return
+            self._released.clear()
+            try:
+                await asyncio.wait_for(self._released.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, latency: float, status: Optional[int] = None, size: int = 0,
+                retry_after: Optional[float] = None):
+        self.limiter.release(latency, status=status, size=size, retry_after=retry_after)
+        self._released.set()
+
+
+class AsyncBhavcopyDownloader:
+    """
+    Downloads NSE and BSE bhavcopies for many dates from one event loop.
+
+    Requests go through one aiohttp session whose connector keeps up to
+    `concurrency` kept-alive connections per exchange host. Uses the same
+    URLs, cache files and parsing as fetch_nse_bhavcopy / fetch_bse_bhavcopy;
+    parsing and disk I/O run in worker threads so the loop keeps the
+    downloads going meanwhile.
+    """
+
+    def __init__(self, concurrency: int = 16, retries: int = 3, timeout: float = 30,
+                 base_url: Optional[str] = None):
+        """
+        Args:
+            concurrency: Most requests in flight per exchange
+            retries: Attempts per bhavcopy
+            timeout: Seconds allowed per request
+            base_url: Scheme and host to download from, defaults to the exchanges'
+        """
+        from Utils.down_close_price_data import AdaptiveRateLimiter, BhavcopyFetcher
+
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.base_url = base_url
+        self.gates = {
+            exchange: AsyncExchangeGate(AdaptiveRateLimiter(max_limit=concurrency))
+            for exchange in BhavcopyFetcher.EXCHANGES
+        }
+        self.requests = 0
+        self.connections = 0
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created on first use, inside the running event loop
+        if self._session is None:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[trace],
+            )
+        return self._session
+
+    async def _on_connection(self, session, context, params):
+        self.connections += 1
+
+    async def download(self, exchange: str, date_input) -> Optional[bytes]:
+        """
+        Download one exchange's bhavcopy without parsing or caching it, like download_bhavcopy.
+
+        Args:
+            exchange: "NSE" or "BSE"
+            date_input: Trading date (datetime)
+
+        Returns:
+            The response body, or None if the bhavcopy is missing or fetching fails
+        """
+        from Utils.down_close_price_data import (
+            NSE_HEADERS, get_bse_bhavcopy_url, get_nse_bhavcopy_url, get_random_headers, retry_delay
+        )
+
+        if exchange == "NSE":
+            url = get_nse_bhavcopy_url(date_input, self.base_url)
+        else:
+            url = get_bse_bhavcopy_url(date_input, self.base_url)
+        gate = self.gates[exchange]
+        session = self._get_session()
+
+        for attempt in range(self.retries):
+            if attempt:
+                # Same backoff as download_bhavcopy, on top of the gate's cooldown
+                await asyncio.sleep(retry_delay(attempt - 1))
+            headers = NSE_HEADERS if exchange == "NSE" else get_random_headers()
+            await gate.acquire()
+            start = time.monotonic()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                gate.release(time.monotonic() - start)
+                print(f"Attempt {attempt + 1} failed: {date_input} {exchange} {e!r}")
+                # As in the threaded path, NSE only retries throttled responses
+                if exchange == "NSE":
+                    return None
+                continue
+
+            self.requests += 1
+            gate.release(
+                time.monotonic() - start,
+                status=response.status,
+                size=len(body),
+                retry_after=_retry_after(response.headers)
+            )
+            if response.status == 200:
+                return body
+
+            print(f"Attempt {attempt + 1} failed: {date_input} {exchange} HTTP {response.status}")
+            if response.status == 404 or (exchange == "NSE" and response.status not in THROTTLE_STATUSES):
+                return None
+
+        print(f"Failed to fetch {exchange} Bhavcopy after multiple attempts.")
+        return None
+
+    async def fetch(self, exchange: str, date_input):
+        """
+        Close prices of one exchange's bhavcopy, like fetch_nse_bhavcopy / fetch_bse_bhavcopy.
+
+        Args:
+            exchange: "NSE" or "BSE"
+            date_input: Trading date (datetime or 'YYYY-MM-DD')
+
+        Returns:
+            DataFrame with the symbol and close price columns, or None if fetching fails
+        """
+        from Utils.down_close_price_data import get_bhavcopy_path, is_cached, load_cached_bhavcopy, store_bhavcopy
+
+        if isinstance(date_input, str):
+            date_input = datetime.strptime(date_input, "%Y-%m-%d")
+
+        filename = get_bhavcopy_path(exchange, date_input)
+        if is_cached(filename):
+            return await asyncio.to_thread(load_cached_bhavcopy, exchange, filename)
+
+        body = await self.download(exchange, date_input)
+        if body is None:
+            return None
+        return await asyncio.to_thread(store_bhavcopy, exchange, body, date_input, filename)
+
+    async def fetch_dates(self, dates):
+        """(nse_data, bse_data) per date, in the order of dates; None where a fetch failed"""
+        nse = [self.fetch("NSE", date_input) for date_input in dates]
+        bse = [self.fetch("BSE", date_input) for date_input in dates]
+        results = await asyncio.gather(*nse, *bse, return_exceptions=True)
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                # e.g. an unparsable bhavcopy; the other dates still count
+                print(f"Failed to fetch bhavcopy: {result!r} {dates[i % len(dates)]}")
+                results[i] = None
+
+        # BSE bhavcopies were ingested into the ISIN index; save it once
+        from Utils.isin_index import get_isin_index
+        await asyncio.to_thread(get_isin_index().flush)
+        return list(zip(results[:len(dates)], results[len(dates):]))
+
+    def stats(self):
+        """Requests made, connections opened and the rate limiter stats per exchange"""
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            **{exchange: gate.limiter.stats() for exchange, gate in self.gates.items()},
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _retry_after(headers) -> Optional[float]:
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,179 @@
+"""
+Compressed columnar cache of the downloaded bhavcopies (.npz)
+"""
+import argparse
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".npz"
+
+# Columns kept per exchange: those read by the price lookups and the ISIN index
+KEEP_COLUMNS = {
+    "NSE": ["SYMBOL", " SERIES", " CLOSE_PRICE"],
+    "BSE": [
+        "TckrSymb", "ClsPric", "ISIN", "FinInstrmId",   # BhavCopy_BSE_CM (2024 onwards)
+        "SC_CODE", "SC_NAME", "CLOSE", "ISIN_CODE",     # BSE_EQ_BHAVCOPY (older)
+    ],
+}
+
+# Suffix of the mask array stored next to a text column with missing values
+_MISSING = ".missing"
+
+
+def columnar_path(csv_path: str) -> str:
+    """Columnar cache file standing in for a bhavcopy CSV path"""
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+
+def is_cached(csv_path: str) -> bool:
+    """Whether a bhavcopy is cached, as a columnar file or a not yet migrated CSV"""
+    return os.path.exists(columnar_path(csv_path)) or os.path.exists(csv_path)
+
+
+def write_columnar(path: str, df: pd.DataFrame, columns: Optional[List[str]] = None):
+    """
+    Save columns of a bhavcopy as typed arrays in a compressed .npz.
+
+    Numeric columns keep their dtype; text columns become fixed width
+    unicode arrays (no pickling), with a mask array for missing values.
+
+    Args:
+        path: Target .npz file, replaced atomically
+        df: Bhavcopy as parsed from the exchange's file
+        columns: Columns to keep (those missing from df are skipped), default all
+    """
+    arrays = {}
+    for col in columns if columns is not None else df.columns:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if values.dtype == object:
+            missing = values.isna().to_numpy()
+            arrays[col] = values.where(~missing, "").astype(str).to_numpy(dtype=str)
+            if missing.any():
+                arrays[col + _MISSING] = missing
+        else:
+            arrays[col] = values.to_numpy()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_columnar(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load columns of a cached bhavcopy.
+
+    Only the requested arrays are decompressed.
+
+    Args:
+        path: .npz written by write_columnar
+        columns: Columns to load, in this order (missing ones are skipped), default all
+
+    Returns:
+        DataFrame with the same values and dtypes as the parsed bhavcopy
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        stored = [name for name in npz.files if not name.endswith(_MISSING)]
+        names = stored if columns is None else [col for col in columns if col in stored]
+        data = {}
+        for name in names:
+            values = npz[name]
+            if values.dtype.kind == "U":
+                values = values.astype(object)
+                if name + _MISSING in npz.files:
+                    values[npz[name + _MISSING]] = np.nan
+            data[name] = values
+    return pd.DataFrame(data)
+
+
+def migrate_csv(exchange: str, csv_path: str):
+    """
+    Write the columnar cache file of a raw bhavcopy CSV.
+
+    The CSV is kept: it holds every column of the exchange's file, the
+    columnar copy only KEEP_COLUMNS. remove_migrated_csvs() deletes it once
+    that is no longer needed. A BSE file is ingested into the ISIN index; the
+    index is not saved here, callers migrating a batch of files flush it once
+    they are done.
+    """
+    keep = KEEP_COLUMNS[exchange]
+    df = pd.read_csv(csv_path, usecols=lambda col: col in keep)
+    if exchange == "BSE":
+        from Utils.isin_index import get_isin_index
+        get_isin_index().ingest_file(csv_path)
+
+    write_columnar(columnar_path(csv_path), df, keep)
+    logger.info("Migrated %s to %s", csv_path, columnar_path(csv_path))
+
+
+def remove_migrated_csvs(directory: str) -> int:
+    """
+    Delete the raw bhavcopy CSVs that have a columnar cache file.
+
+    An explicit cleanup: the columns outside KEEP_COLUMNS are lost with the
+    CSVs. BSE files are ingested into the ISIN index (and the index saved)
+    before they go.
+
+    Args:
+        directory: Bhavcopy cache directory
+
+    Returns:
+        Number of files removed
+    """
+    from Utils.isin_index import get_isin_index
+
+    csv_paths = [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.endswith(".csv") and os.path.exists(columnar_path(os.path.join(directory, name)))
+    ]
+    isin_index = get_isin_index()
+    for csv_path in csv_paths:
+        if os.path.basename(csv_path).startswith("bse_bhavcopy_"):
+            isin_index.ingest_file(csv_path)
+    isin_index.flush()
+
+    for csv_path in csv_paths:
+        os.remove(csv_path)
+        logger.info("Removed %s, cached as %s", csv_path, columnar_path(csv_path))
+    return len(csv_paths)
+
+
+def load_bhavcopy(exchange: str, csv_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Columns of a cached bhavcopy, writing the columnar copy of a raw CSV on its first read.
+
+    Args:
+        exchange: "NSE" or "BSE"
+        csv_path: Bhavcopy path as returned by get_bhavcopy_path
+        columns: Columns to load, default all kept ones
+
+    Returns:
+        DataFrame of the requested columns
+    """
+    path = columnar_path(csv_path)
+    if not os.path.exists(path):
+        migrate_csv(exchange, csv_path)
+    return read_columnar(path, columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    remove = commands.add_parser("remove-csvs", help="Delete raw CSVs that have a columnar cache file")
+    remove.add_argument("directory", nargs="?", default="./bhavcopies")
+    args = parser.parse_args()
+
+    if args.command == "remove-csvs":
+        print(f"Removed {remove_migrated_csvs(args.directory)} bhavcopy CSVs from {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
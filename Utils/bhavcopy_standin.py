@@ -0,0 +1,306 @@
+"""
+Local stand-in for the NSE / BSE bhavcopy servers, for testing and benchmarking downloads
+
+    python -m Utils.bhavcopy_standin record recorded_bhavcopies
+    python -m Utils.bhavcopy_standin bench recorded_bhavcopies --latency 0.05 --throttle-rate 0.05
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real servers
+
+    def do_GET(self):
+        server = self.server.standin
+        name = os.path.basename(self.path.split("?", 1)[0])
+        path = os.path.join(server.directory, name)
+
+        if server.latency:
+            time.sleep(server.latency * (1 + server.jitter * (2 * server.random() - 1)))
+
+        if server.random() < server.throttle_rate:
+            server.count("throttled")
+            self._reply(429, b"Too Many Requests", {"Retry-After": f"{server.retry_after:g}"})
+        elif not name or not os.path.isfile(path):
+            server.count("missing")
+            self._reply(404, b"Not Found")
+        else:
+            with open(path, "rb") as f:
+                body = f.read()
+            server.count("served")
+            content_type = "application/zip" if name.endswith(".zip") else "text/csv"
+            self._reply(200, body, {"Content-Type": content_type})
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class BhavcopyStandIn:
+    """
+    Threaded HTTP server answering bhavcopy URLs from a directory of recorded files.
+
+    A request is answered with the file named like the last path segment of
+    the URL (e.g. sec_bhavdata_full_02012024.csv, BSE_EQ_BHAVCOPY_02012023.zip),
+    so one server stands in for both exchanges: pass base_url to the
+    downloads, or set NSE_BHAVCOPY_BASE_URL and BSE_BHAVCOPY_BASE_URL to it
+    before starting the app. Every response is delayed by `latency` seconds
+    and a `throttle_rate` share of them are 429s with a Retry-After header.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0,
+                 seed: Optional[int] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            directory: Recorded bhavcopies, named as on the exchange servers
+            latency: Seconds to wait before each response
+            jitter: Latency varies uniformly by this fraction either way
+            throttle_rate: Share of requests answered with 429
+            retry_after: Retry-After seconds sent with each 429
+            seed: Seed for the latency jitter and throttling draws
+            host: Interface to listen on
+            port: Port to listen on, 0 for any free port
+        """
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"served": 0, "throttled": 0, "missing": 0}
+
+        self._server = ThreadingHTTPServer((host, port), _StandInHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def start(self) -> "BhavcopyStandIn":
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted (Ctrl+C)"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record_bhavcopies(target_dir: str, source_dir: Optional[str] = None) -> int:
+    """
+    Write the cached bhavcopies back in the format the exchanges serve them.
+
+    NSE files and BSE files from 2024 on are CSVs; older BSE files are
+    zipped, as on bseindia.com. Bhavcopies already in the columnar cache
+    are written with the columns it keeps. Files already recorded are kept.
+
+    Args:
+        target_dir: Directory for the stand-in
+        source_dir: Bhavcopy cache, defaults to the download cache
+
+    Returns:
+        Number of files written
+    """
+    from Utils.bhavcopy_cache import CACHE_SUFFIX, read_columnar
+    from Utils.down_close_price_data import BHAVCOPY_DIR, get_bse_bhavcopy_url, get_nse_bhavcopy_url
+
+    source_dir = source_dir or BHAVCOPY_DIR
+    os.makedirs(target_dir, exist_ok=True)
+    written = 0
+    for name in sorted(os.listdir(source_dir)):
+        exchange, _, rest = name.partition("_bhavcopy_")
+        stem, suffix = os.path.splitext(rest)
+        if exchange not in ("nse", "bse") or suffix not in (".csv", CACHE_SUFFIX):
+            continue
+        try:
+            date_input = datetime.strptime(stem, "%d_%m_%Y")
+        except ValueError:
+            continue
+
+        if exchange == "nse":
+            url = get_nse_bhavcopy_url(date_input)
+        else:
+            url = get_bse_bhavcopy_url(date_input)
+        target = os.path.join(target_dir, os.path.basename(url))
+        if os.path.exists(target):
+            continue
+        source = os.path.join(source_dir, name)
+        if suffix == ".csv":
+            with open(source, "rb") as f:
+                content = f.read()
+        else:
+            content = read_columnar(source).to_csv(index=False).encode("utf-8")
+
+        if target.endswith(".zip"):
+            with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(os.path.basename(target)[:-len(".zip")] + ".csv", content)
+        else:
+            with open(target, "wb") as f:
+                f.write(content)
+        written += 1
+    return written
+
+
+def recorded_dates(directory: str) -> List[datetime]:
+    """Trading dates with an NSE bhavcopy in a recorded directory"""
+    dates = []
+    for name in os.listdir(directory):
+        if name.startswith("sec_bhavdata_full_") and name.endswith(".csv"):
+            dates.append(datetime.strptime(name[len("sec_bhavdata_full_"):-len(".csv")], "%d%m%Y"))
+    return sorted(dates)
+
+
+def benchmark(directory: str, dates: Optional[List[datetime]] = None, concurrency: int = 16, **standin_options):
+    """
+    Time the threaded and the asyncio download paths against one stand-in.
+
+    Both paths only download (download_bhavcopy / AsyncBhavcopyDownloader.download),
+    so every bhavcopy is actually requested and the local cache is left alone.
+
+    Args:
+        directory: Recorded bhavcopies
+        dates: Dates to download, defaults to every recorded date
+        concurrency: Worker threads / requests in flight per exchange
+        **standin_options: Latency and throttling options of BhavcopyStandIn
+
+    Returns:
+        dict: path name -> {"seconds", "fetched", "server": stand-in counts, "client": fetch stats}
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from Utils.async_bhavcopy import AsyncBhavcopyDownloader
+    from Utils.down_close_price_data import BhavcopyFetcher, BhavcopyNotFound, download_bhavcopy
+
+    dates = dates if dates is not None else recorded_dates(directory)
+
+    def run_threaded(base_url):
+        fetcher = BhavcopyFetcher(pool_size=concurrency)
+
+        def download(exchange, date_input):
+            try:
+                return download_bhavcopy(exchange, date_input, base_url=base_url, fetcher=fetcher)
+            except BhavcopyNotFound:
+                return None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda d: (download("NSE", d), download("BSE", d)), dates))
+        stats = fetcher.stats()
+        fetcher.close()
+        return results, stats
+
+    def run_async(base_url):
+        async def run():
+            downloader = AsyncBhavcopyDownloader(concurrency=concurrency, base_url=base_url)
+            try:
+                nse = [downloader.download("NSE", d) for d in dates]
+                bse = [downloader.download("BSE", d) for d in dates]
+                results = await asyncio.gather(*nse, *bse)
+                return list(zip(results[:len(dates)], results[len(dates):])), downloader.stats()
+            finally:
+                await downloader.close()
+
+        return asyncio.run(run())
+
+    report = {}
+    for name, run in (("threaded", run_threaded), ("asyncio", run_async)):
+        with BhavcopyStandIn(directory, **standin_options) as standin:
+            start = time.monotonic()
+            results, client_stats = run(standin.base_url)
+            report[name] = {
+                "seconds": round(time.monotonic() - start, 3),
+                "fetched": sum(data is not None for pair in results for data in pair),
+                "server": dict(standin.counts),
+                "client": client_stats,
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Record the cached bhavcopies for the stand-in")
+    record.add_argument("directory")
+    record.add_argument("--source", default=None, help="Bhavcopy cache (default ./bhavcopies)")
+
+    for command in ("serve", "bench"):
+        sub = commands.add_parser(command, help=f"{command.capitalize()} recorded bhavcopies")
+        sub.add_argument("directory")
+        sub.add_argument("--latency", type=float, default=0.0)
+        sub.add_argument("--jitter", type=float, default=0.0)
+        sub.add_argument("--throttle-rate", type=float, default=0.0)
+        sub.add_argument("--retry-after", type=float, default=1.0)
+        sub.add_argument("--seed", type=int, default=None)
+    commands.choices["serve"].add_argument("--port", type=int, default=8000)
+    commands.choices["bench"].add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(f"Recorded {record_bhavcopies(args.directory, args.source)} bhavcopies in {args.directory}")
+        return
+
+    options = dict(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate,
+                   retry_after=args.retry_after, seed=args.seed)
+    if args.command == "serve":
+        standin = BhavcopyStandIn(args.directory, port=args.port, **options)
+        print(f"Serving {args.directory} at {standin.base_url}; set NSE_BHAVCOPY_BASE_URL "
+              f"and BSE_BHAVCOPY_BASE_URL to it")
+        standin.serve_forever()
+        return
+
+    for name, result in benchmark(args.directory, concurrency=args.concurrency, **options).items():
+        print(f"{name}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Persistent cache of parsed CFCA (corporate actions) rows
+"""
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = "processed_cfca.csv"
+MANIFEST_FILE = "processed_cfca.json"
+
+# A CFCA row is identified by these columns; its parsed face values depend only on them
+KEY_COLUMNS = ["SYMBOL", "EX-DATE", "PURPOSE"]
+VALUE_COLUMNS = ["from_value", "to_value"]
+
+
+def file_fingerprint(path: str) -> Dict:
+    """Path, size and mtime of a source file"""
+    stat = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime
+    }
+
+
+def _row_keys(df: pd.DataFrame):
+    """Hashable (SYMBOL, EX-DATE, PURPOSE) key per row, compared as text"""
+    return list(zip(*(df[col].astype(str) for col in KEY_COLUMNS)))
+
+
+class ProcessedCFCACache:
+    """
+    Deduplicated store of parsed CFCA rows, kept next to the CFCA exports.
+
+    Every CF-CA* export in the directory is ingested into one table of rows
+    keyed by (SYMBOL, EX-DATE, PURPOSE), stored with their parsed from/to face
+    values (NaN for rows that are not face value actions). A manifest records
+    the fingerprint of each ingested export, so unchanged exports are skipped
+    entirely, and in a new export only rows whose key is not stored yet are
+    parsed. Rows of exports that were later deleted stay in the store.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the CFCA exports (and the cache files)
+        """
+        self.cache_path = os.path.join(directory, CACHE_FILE)
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+
+    def _read_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable CFCA manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _read_cache(self) -> Optional[pd.DataFrame]:
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            cached = pd.read_csv(self.cache_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable CFCA cache {self.cache_path}: {e}")
+            return None
+        if not set(KEY_COLUMNS + VALUE_COLUMNS).issubset(cached.columns):
+            return None
+        return cached
+
+    def _write(self, df: pd.DataFrame, files: Dict):
+        df.to_csv(self.cache_path, index=False)
+        with open(self.manifest_path, "w") as f:
+            json.dump({"files": files}, f, indent=4)
+
+    def load(self, source_paths: List[str], parse: Callable[[pd.Series], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Deduplicated rows of all CFCA exports with their parsed face values.
+
+        Args:
+            source_paths: CFCA CSV exports, oldest first; for rows with the same
+                key the newest export wins
+            parse: Maps a PURPOSE column to a from_value/to_value frame on the same index
+
+        Returns:
+            One row per (SYMBOL, EX-DATE, PURPOSE), plus from_value and to_value columns
+        """
+        files = self._read_manifest()
+        cached = self._read_cache()
+        if cached is None:
+            files = {}
+
+        fingerprints = [file_fingerprint(path) for path in source_paths]
+        new_sources = [fp for fp in fingerprints if files.get(fp["path"]) != fp]
+        if not new_sources:
+            if cached is None:
+                logger.warning("No CFCA exports to load")
+                return pd.DataFrame(columns=KEY_COLUMNS + VALUE_COLUMNS)
+            logger.info("CFCA exports unchanged, using cached actions from %s", self.cache_path)
+            return cached
+
+        store = cached if cached is not None else pd.DataFrame(columns=KEY_COLUMNS + VALUE_COLUMNS)
+        known = dict(zip(_row_keys(store), zip(*(store[col] for col in VALUE_COLUMNS))))
+
+        frames = [store]
+        for fingerprint in new_sources:
+            cfca_df = pd.read_csv(fingerprint["path"])
+            keys = _row_keys(cfca_df)
+            is_new = pd.Series([key not in known for key in keys], index=cfca_df.index)
+            logger.info(
+                "Ingesting %s: parsing %d new CFCA rows (%d already stored)",
+                fingerprint["path"], is_new.sum(), (~is_new).sum()
+            )
+
+            values = pd.DataFrame(
+                [known.get(key, (None, None)) for key in keys],
+                columns=VALUE_COLUMNS,
+                index=cfca_df.index,
+                dtype=float
+            )
+            if is_new.any():
+                values.loc[is_new, VALUE_COLUMNS] = parse(cfca_df.loc[is_new, "PURPOSE"]).to_numpy(dtype=float)
+            cfca_df[VALUE_COLUMNS] = values
+
+            known.update(zip(keys, zip(*(cfca_df[col] for col in VALUE_COLUMNS))))
+            frames.append(cfca_df)
+            files[fingerprint["path"]] = fingerprint
+
+        store = pd.concat([frame for frame in frames if not frame.empty], ignore_index=True)
+        store = store[~pd.Series(_row_keys(store)).duplicated(keep="last").to_numpy()].reset_index(drop=True)
+
+        self._write(store, files)
+        return store
@@ -2,12 +2,19 @@ import math
 import pandas as pd
 import logging
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, Tuple, List
 
 import pandas as pd
 import numpy as np
 
+def _day_ordinal(value) -> int:
+    """Day ordinal of a date/datetime, or of a date string"""
+    if isinstance(value, date):
+        return value.toordinal()
+    return pd.Timestamp(value).toordinal()
+
+
 class CorporateActionsHandler:
     """Handles corporate actions (splits/consolidations) for accurate volume tracking"""
     
@@ -16,29 +23,24 @@ class CorporateActionsHandler:
         Initialize with CFCA data file
         
         Args:
-            cfca_path: Path to the CFCA CSV file
+            cfca_path: Directory holding the CFCA (CF-CA*) CSV exports
         """
         self.cfca_df = self._load_and_process_cfca(cfca_path)
+        self._index_actions()
         
     def _load_and_process_cfca(self, cfca_dir: str) -> pd.DataFrame:
         """Load and process CFCA data"""
         logger = logging.getLogger(__name__)
         logger.info("Starting CFCA load and processing for directory: %s", cfca_dir)
-        from Utils.split_n_merge_handler import is_face_value_action, extract_face_values, get_latest_CFCA_file
-        cfca_path = get_latest_CFCA_file(cfca_dir)
-        logger.info("Starting CFCA load and processing for directory: %s", cfca_path)
-    
-        cfca_df = pd.read_csv(cfca_path)
+        from Utils.split_n_merge_handler import get_CFCA_files
+        from Utils.cfca_cache import ProcessedCFCACache
+        cfca_paths = get_CFCA_files(cfca_dir)
+        logger.info("Found %d CFCA files: %s", len(cfca_paths), cfca_paths)
+
+        # All exports deduplicated into one store; only rows it has not seen are parsed
+        cfca_df = ProcessedCFCACache(cfca_dir).load(cfca_paths, self._parse_face_values)
         logger.info("CFCA data loaded from: %s", cfca_df.head())
         
-        # Filter for face value actions only
-        cfca_df = cfca_df[cfca_df["PURPOSE"].apply(lambda x: is_face_value_action(x))]
-        
-        # Extract from and to values
-        cfca_df[["from_value", "to_value"]] = cfca_df["PURPOSE"].apply(
-            lambda x: pd.Series(extract_face_values(x))
-        )
-        
         # Remove rows without valid from_value
         cfca_df = cfca_df[~cfca_df["from_value"].isna()]
         
@@ -50,12 +52,213 @@ class CorporateActionsHandler:
         
         # Sort by date for chronological processing
         cfca_df = cfca_df.sort_values('EX-DATE')
-
-        cfca_df.to_csv("processed_cfca.csv", index=False)
-        logger.info("Processed CFCA data saved to processed_cfca.csv")
         
         return cfca_df
 
+    @staticmethod
+    def _parse_face_values(purposes: pd.Series) -> pd.DataFrame:
+        """from_value/to_value per PURPOSE text (NaN unless it is a face value action)"""
+        from Utils.split_n_merge_handler import extract_face_value_columns
+        from_values, to_values = extract_face_value_columns(purposes)
+        return pd.DataFrame({"from_value": from_values, "to_value": to_values}, index=purposes.index)
+
+    def _index_actions(self):
+        """Keep the action columns as plain arrays for the holdings table methods"""
+        from Utils.holdings_util import to_ordinals
+        self._action_days = to_ordinals(self.cfca_df['EX-DATE'], 0)
+        self._action_symbols = self.cfca_df['SYMBOL'].to_numpy(dtype=object)
+        self._action_ratios = self.cfca_df['volume_adjustment_ratio'].to_numpy(dtype=np.float64)
+
+        # ex-date ordinal -> (symbols, ratios) of that day's actions, in CFCA order
+        self._action_schedule = {}
+        for day in np.unique(self._action_days):
+            rows = np.flatnonzero(self._action_days == day)
+            self._action_schedule[int(day)] = (self._action_symbols[rows], self._action_ratios[rows])
+
+        # symbol -> (ex-date ordinals, ratios) of its actions, in CFCA (ex-date) order
+        self._symbol_actions = {}
+        order = np.argsort(self._action_days, kind='stable')
+        for symbol in pd.unique(self._action_symbols[order]):
+            rows = order[self._action_symbols[order] == symbol]
+            self._symbol_actions[symbol] = (self._action_days[rows], self._action_ratios[rows])
+
+    @staticmethod
+    def _first_pending_action(ex_days: np.ndarray, as_of_day: int, dop_days):
+        """
+        Index of a symbol's first action that is undone to get a lot's volume as of a day.
+
+        That is the first action going ex after `as_of_day` and on or after
+        the purchase date (actions before the purchase date never applied).
+        Works on one purchase day ordinal or an array of them.
+        """
+        return np.maximum(
+            np.searchsorted(ex_days, as_of_day, side='right'),
+            np.searchsorted(ex_days, dop_days, side='left')
+        )
+
+    def adjustment_factor(self, symbol: str, as_of, dop) -> float:
+        """
+        Combined volume ratio of the actions a lot of `symbol` still goes through after `as_of`.
+
+        Actions going ex before the purchase date do not apply to the lot, and
+        a lot without a purchase date is never adjusted (as in reverse_actions).
+
+        Args:
+            symbol: NSE symbol
+            as_of: date (str or datetime) of interest
+            dop: Purchase date of the lot (None / NaT if missing)
+
+        Returns:
+            Product of the volume_adjustment_ratio of every later action (1.0 if none)
+        """
+        entry = self._symbol_actions.get(symbol)
+        if entry is None or dop is None or pd.isna(dop):
+            return 1.0
+        ex_days, ratios = entry
+        k = int(self._first_pending_action(ex_days, _day_ordinal(as_of), _day_ordinal(dop)))
+        return math.prod(ratios[k:].tolist())
+
+    def quantity_as_of(self, symbol: str, quantity: float, as_of, dop) -> float:
+        """
+        Volume of a lot as of a date, from its current volume.
+
+        The actions going ex after `as_of` are undone one at a time with a
+        ceil after each, in the order reverse_actions applies them, so the
+        result equals reverse_actions with a start date the day after `as_of`.
+        The first such action is found by binary search.
+
+        Args:
+            symbol: NSE symbol
+            quantity: Current volume of the lot
+            as_of: date (str or datetime) of interest
+            dop: Purchase date of the lot (None / NaT if missing, never adjusted)
+
+        Returns:
+            Volume as of `as_of`
+        """
+        entry = self._symbol_actions.get(symbol)
+        if entry is None or dop is None or pd.isna(dop):
+            return quantity
+        ex_days, ratios = entry
+        k = int(self._first_pending_action(ex_days, _day_ordinal(as_of), _day_ordinal(dop)))
+        for ratio in ratios[k:].tolist():
+            quantity = math.ceil(quantity / ratio)
+        return quantity
+
+    def quantities_as_of_on_holdings(self, holdings, as_of) -> np.ndarray:
+        """
+        HoldingsTable counterpart of quantity_as_of for all lots at once.
+
+        Args:
+            holdings: HoldingsTable with current volumes
+            as_of: date (str or datetime) of interest
+
+        Returns:
+            Volume per lot as of `as_of`
+        """
+        from Utils.holdings_util import NO_PURCHASE_DATE
+        as_of_day = _day_ordinal(as_of)
+        quantity = holdings.quantity.copy()
+        for symbol, (ex_days, ratios) in self._symbol_actions.items():
+            rows = holdings.symbol_rows(symbol)
+            if not len(rows):
+                continue
+            dop = holdings.dop[rows]
+            k = self._first_pending_action(ex_days, as_of_day, dop)
+            # Lots without a purchase date are never adjusted
+            k[dop == NO_PURCHASE_DATE] = len(ex_days)
+            for j in range(k.min(), len(ex_days)):
+                step = rows[k <= j]
+                quantity[step] = np.ceil(quantity[step] / ratios[j])
+        return quantity
+
+    def _reverse_quantities(
+        self,
+        quantity: np.ndarray,
+        lot_symbols: np.ndarray,
+        lot_dates: np.ndarray,
+        action_symbols: np.ndarray,
+        action_dates: np.ndarray,
+        start
+    ) -> None:
+        """
+        Undo every action on/after `start` on the lots it affects, in place.
+
+        Actions are joined to lots by symbol code and purchase date (a lot is
+        affected when it was bought on or before the ex-date). Each lot's
+        actions are ranked in CFCA order and applied one rank at a time across
+        all lots, so every lot still gets one ceil per action, in sequence.
+
+        Args:
+            quantity: Volumes to adjust
+            lot_symbols: Symbol code per lot (-1 for none / no purchase date)
+            lot_dates: Purchase date per lot, comparable with action_dates
+            action_symbols: Symbol code per CFCA row (-1 for none)
+            action_dates: Ex-date per CFCA row
+            start: Roll back actions with ex-date >= start
+        """
+        actions = np.flatnonzero((action_dates >= start) & (action_symbols >= 0))
+        lots = np.flatnonzero(lot_symbols >= 0)
+        if not len(actions) or not len(lots):
+            return
+
+        pairs = pd.DataFrame({'lot': lots, 'symbol': lot_symbols[lots]}).merge(
+            pd.DataFrame({'action': actions, 'symbol': action_symbols[actions]}),
+            on='symbol'
+        )
+        pairs = pairs[lot_dates[pairs['lot'].to_numpy()] <= action_dates[pairs['action'].to_numpy()]]
+        if pairs.empty:
+            return
+        pairs = pairs.sort_values(['lot', 'action'], kind='stable')
+        pair_lots = pairs['lot'].to_numpy()
+        pair_ratios = self._action_ratios[pairs['action'].to_numpy()]
+        rank = pairs.groupby('lot', sort=False).cumcount().to_numpy()
+
+        for r in range(rank.max() + 1):
+            step = rank == r
+            rows = pair_lots[step]
+            quantity[rows] = np.ceil(quantity[rows] / pair_ratios[step])
+
+    def reverse_actions_on_holdings(self, holdings, start_date) -> None:
+        """
+        HoldingsTable counterpart of reverse_actions; adjusts holdings.quantity in place.
+
+        Args:
+            holdings: HoldingsTable to roll back
+            start_date: date (str or datetime) from which to roll back
+        """
+        from Utils.holdings_util import NO_PURCHASE_DATE
+        lot_symbols = np.where(holdings.dop != NO_PURCHASE_DATE, holdings.symbol_code, -1)
+        action_symbols = np.array(
+            [holdings.symbol_index(symbol) for symbol in self._action_symbols], dtype=np.int64
+        )
+        self._reverse_quantities(
+            holdings.quantity, lot_symbols, holdings.dop,
+            action_symbols, self._action_days, pd.Timestamp(start_date).toordinal()
+        )
+
+    def apply_tday_actions_on_holdings(self, holdings, current_date) -> None:
+        """
+        HoldingsTable counterpart of apply_tday_actions; adjusts holdings.quantity in place.
+
+        Args:
+            holdings: HoldingsTable to adjust
+            current_date: date (str or datetime) whose actions are applied
+        """
+        from Utils.holdings_util import NO_PURCHASE_DATE
+        current_day = _day_ordinal(current_date)
+        actions = self._action_schedule.get(current_day)
+        if actions is None:
+            return
+
+        quantity = holdings.quantity
+        for symbol, ratio in zip(*actions):
+            rows = holdings.symbol_rows(symbol)
+            dop = holdings.dop[rows]
+            rows = rows[(dop != NO_PURCHASE_DATE) & (dop <= current_day)]
+            if len(rows):
+                quantity[rows] = np.floor(quantity[rows] * ratio)
+
     def reverse_actions(self, df: pd.DataFrame, start_date: str) -> pd.DataFrame:
         """
         Reverse corporate actions on volumes to reflect state at given start_date (or DOP if later).
@@ -75,20 +278,22 @@ class CorporateActionsHandler:
         # Ensure date column present
         df['DOP'] = pd.to_datetime(df['DOP'])
 
-        # For each corporate action after start_date, undo the effect
-        for _, action in self.cfca_df.iterrows():
-            action_date = action['EX-DATE']
-            symbol = action['SYMBOL']
-            ratio = action['volume_adjustment_ratio']
-
-            if action_date >= start_date:
-                # Affected rows: matching symbol, purchased before action date
-                mask = (df["NSE Name "] == symbol) & (df['DOP'] <= action_date)
-                if mask.any():
-                    # Reverse the adjustment: divide by ratio
-                    df.loc[mask, 'No. '] = df.loc[mask, 'No. '].apply(
-                        lambda x: self._reverse_volume(x, ratio)
-                    )
+        # Symbol codes shared by lots and actions; NaN never matches
+        codes, _ = pd.factorize(pd.concat(
+            [df["NSE Name "], self.cfca_df['SYMBOL']], ignore_index=True
+        ))
+        lot_symbols, action_symbols = codes[:len(df)], codes[len(df):]
+        dop = df['DOP'].to_numpy(dtype='datetime64[ns]')
+        lot_symbols = np.where(np.isnat(dop), -1, lot_symbols)
+
+        # Undo the effect of each corporate action on/after start_date
+        quantity = df['No. '].to_numpy(copy=True)
+        self._reverse_quantities(
+            quantity, lot_symbols, dop, action_symbols,
+            self.cfca_df['EX-DATE'].to_numpy(dtype='datetime64[ns]'),
+            start_date.to_datetime64()
+        )
+        df['No. '] = quantity
         return df
 
     
@@ -102,19 +307,18 @@ class CorporateActionsHandler:
             current_date: date (str or datetime) for which to apply forward adjustments
         
         Returns:
-            DataFrame with adjusted volumes for that date
+            DataFrame with adjusted volumes for that date (`df` itself if
+            there are no actions on that date)
         """
         current_date = pd.to_datetime(current_date)
+        actions = self._action_schedule.get(current_date.toordinal())
+        if actions is None:
+            return df
+
         df = df.copy()
         df['DOP'] = pd.to_datetime(df['DOP'])
 
-        # filter actions that happen exactly on current_date
-        actions_today = self.cfca_df[self.cfca_df['EX-DATE'] == current_date]
-
-        for _, action in actions_today.iterrows():
-            symbol = action['SYMBOL']
-            ratio = action['volume_adjustment_ratio']
-
+        for symbol, ratio in zip(*actions):
             mask = (df["NSE Name "] == symbol) & (df['DOP'] <= current_date)
             if mask.any():
                 df.loc[mask, 'No. '] = df.loc[mask, 'No. '].apply(
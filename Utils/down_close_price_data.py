@@ -2,16 +2,22 @@ import requests
 import pandas as pd
 import io
 import zipfile
+import threading
 from datetime import datetime, timedelta
 from io import StringIO
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import time
 import random
 import os
+import logging
+
+from Utils.bhavcopy_cache import KEEP_COLUMNS, columnar_path, is_cached, load_bhavcopy, write_columnar
+
+logger = logging.getLogger(__name__)
 
 timeout = 30
-server_overloaded = False
 
 # Define series priority
 series_priority = {' EQ': 1, ' BE': 2}
@@ -35,11 +41,20 @@ def get_random_headers():
     return headers
 
 
+# Backoff between attempts at one bhavcopy: RETRY_BASE_DELAY seconds, doubling up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
 
-def wait_between_requests(min_delay=5, max_delay=15):
-    delay = random.uniform(min_delay, max_delay)
-    print(f"Waiting for {delay:.2f} seconds before retrying...")
-    time.sleep(delay)
+
+def retry_delay(attempt):
+    """
+    Seconds to wait after failed attempt `attempt` (0 based) before the next one.
+
+    Exponential backoff with jitter: half the step is fixed and half random,
+    so threads that failed together do not retry together.
+    """
+    step = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return step / 2 + random.uniform(0, step / 2)
 
 
 proxies = [
@@ -52,253 +67,595 @@ def get_random_proxy():
     return random.choice(proxies)
 
 
-def get_bse_bhavcopy_url(date_input):
+class AdaptiveRateLimiter:
+    """
+    AIMD concurrency limit for one exchange.
+
+    Healthy responses raise the limit by about one request per window. A
+    429/503 (or a failed request) halves it and holds new requests back for a
+    doubling cooldown (or the server's Retry-After). Latency well above the
+    running baseline trims it. A 404 (no bhavcopy for the date) is counted
+    but leaves the limit alone. Completed requests and bytes are counted for
+    throughput reporting.
+    """
+
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=16,
+                 latency_factor=2.0, base_cooldown=5.0, max_cooldown=120.0):
+        """
+        Args:
+            initial_limit (int): Concurrent requests allowed at start
+            min_limit (int): Lowest concurrency the limit can drop to
+            max_limit (int): Highest concurrency (the connection pool size)
+            latency_factor (float): Latency above this multiple of the baseline counts as overload
+            base_cooldown (float): Seconds to hold back after the first throttled response
+            max_cooldown (float): Longest hold back, in seconds
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_factor = latency_factor
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._cooldown = base_cooldown
+        self._resume_at = 0.0
+        self._baseline = None   # slow moving average latency
+        self._recent = None     # fast moving average latency
+        self._since_decrease = 0
+
+        self.completed = 0
+        self.throttled = 0
+        self.failed = 0
+        self.missing = 0
+        self.bytes = 0
+        self._busy_since = None
+        self._busy_time = 0.0
+
+    def acquire(self):
+        """Block until a request may start"""
+        with self._cond:
+            while True:
+                wait = self._resume_at - time.monotonic()
+                if wait <= 0 and self._in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._start()
+
+    def try_acquire(self):
+        """
+        Non-blocking acquire() for callers that must not block a thread (asyncio).
+
+        Returns:
+            float or None: 0.0 if the request may start, seconds left in the
+            cooldown, or None if the limit is reached until a release()
+        """
+        with self._cond:
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                return wait
+            if self._in_flight >= int(self.limit):
+                return None
+            self._start()
+            return 0.0
+
+    def _start(self):
+        if self._in_flight == 0:
+            self._busy_since = time.monotonic()
+        self._in_flight += 1
+
+    def release(self, latency, status=None, size=0, retry_after=None):
+        """
+        Record the outcome of a request started with acquire().
+
+        Args:
+            latency (float): Seconds the request took
+            status (int or None): HTTP status, None if the request failed
+            size (int): Response size in bytes
+            retry_after (float or None): Server's Retry-After, in seconds
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if self._in_flight == 0 and self._busy_since is not None:
+                self._busy_time += time.monotonic() - self._busy_since
+                self._busy_since = None
+
+            if status is None or status in {429, 503}:
+                if status is None:
+                    self.failed += 1
+                else:
+                    self.throttled += 1
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._since_decrease = 0
+                pause = retry_after if retry_after is not None else self._cooldown
+                self._resume_at = max(self._resume_at, time.monotonic() + pause)
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                logger.warning(f"Server overloaded ({status}); concurrency {self.limit:.1f}, pausing {pause:.1f}s")
+            elif status == 404:
+                # A holiday or a date not published yet, not a sign of server health
+                self.missing += 1
+            else:
+                self.completed += 1
+                self.bytes += size
+                self._cooldown = self.base_cooldown
+                if self._baseline is None:
+                    self._baseline = self._recent = latency
+                self._recent = 0.7 * self._recent + 0.3 * latency
+                self._baseline = 0.95 * self._baseline + 0.05 * latency
+                self._since_decrease += 1
+
+                # Trim at most once per window of requests while latency keeps rising
+                if (self._recent > self.latency_factor * self._baseline
+                        and self._since_decrease >= self.limit):
+                    self.limit = max(self.min_limit, self.limit * 0.8)
+                    self._since_decrease = 0
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Limit, outcome counts and throughput while requests were in flight"""
+        with self._cond:
+            busy = self._busy_time
+            if self._busy_since is not None:
+                busy += time.monotonic() - self._busy_since
+            return {
+                "limit": round(self.limit, 2),
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "missing": self.missing,
+                "requests_per_s": round(self.completed / busy, 2) if busy else 0.0,
+                "mb_per_s": round(self.bytes / busy / 1e6, 3) if busy else 0.0,
+            }
+
+
+def _retry_after(response):
+    """Retry-After header in seconds, if the server sent one"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class BhavcopyFetcher:
+    """
+    Shared HTTP client for bhavcopy downloads.
+
+    Owns one requests.Session per exchange, each with a connection pool sized
+    for the worker threads, so consecutive downloads reuse kept-alive
+    connections instead of doing a TCP/TLS handshake per file. Requests to
+    each exchange go through its own AdaptiveRateLimiter.
+    """
+
+    EXCHANGES = ("NSE", "BSE")
+
+    def __init__(self, pool_size=16):
+        """
+        Args:
+            pool_size (int): Connections kept per exchange host (match the worker count)
+        """
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._adapters = {}
+        self._requests = {}
+        self.limiters = {}
+        for exchange in self.EXCHANGES:
+            self.limiters[exchange] = AdaptiveRateLimiter(max_limit=pool_size)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Connection": "keep-alive"})
+            self._sessions[exchange] = session
+            self._adapters[exchange] = adapter
+            self._requests[exchange] = 0
+
+    def get(self, exchange, url, headers=None, timeout=timeout):
+        """GET a URL on the exchange's session, within the exchange's rate limit"""
+        limiter = self.limiters[exchange]
+        limiter.acquire()
+        with self._lock:
+            self._requests[exchange] += 1
+
+        start = time.monotonic()
+        response = None
+        try:
+            response = self._sessions[exchange].get(url, headers=headers, timeout=timeout)
+            return response
+        finally:
+            if response is None:
+                limiter.release(time.monotonic() - start)
+            else:
+                limiter.release(
+                    time.monotonic() - start,
+                    status=response.status_code,
+                    size=len(response.content),
+                    retry_after=_retry_after(response)
+                )
+
+    def stats(self):
+        """
+        Connection reuse per exchange.
+
+        Returns:
+            dict: exchange -> {"requests", "connections", "reused"}, where
+            connections counts the TCP connections opened by the pools, plus
+            the rate limiter's stats
+        """
+        stats = {}
+        for exchange, adapter in self._adapters.items():
+            pools = adapter.poolmanager.pools
+            connections = sum(pools[key].num_connections for key in list(pools.keys()) if key in pools)
+            requests_made = self._requests[exchange]
+            stats[exchange] = {
+                "requests": requests_made,
+                "connections": connections,
+                "reused": max(requests_made - connections, 0),
+                **self.limiters[exchange].stats(),
+            }
+        return stats
+
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_bhavcopy_fetcher():
+    """Fetcher shared by all download threads"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = BhavcopyFetcher()
+    return _fetcher
+
+
+BHAVCOPY_DIR = "./bhavcopies"
+
+# Exchange hosts, overridable to point the downloads at a local stand-in
+# (see Utils/bhavcopy_standin.py). BSE serves the pre-2024 zips over plain http.
+NSE_BASE_URL = os.environ.get("NSE_BHAVCOPY_BASE_URL", "https://nsearchives.nseindia.com")
+BSE_BASE_URL = os.environ.get("BSE_BHAVCOPY_BASE_URL")
+
+NSE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def get_bse_bhavcopy_url(date_input, base_url=None):
     """
     Returns the BSE Bhavcopy URL based on the input date.
     
     Parameters:
     date_input (datetime): The date for which the URL is to be generated.
+    base_url (str): Scheme and host to download from; defaults to BSE_BASE_URL or bseindia.com.
 
     Returns:
     str: The URL for the BSE Bhavcopy.
     """
     if date_input < datetime(2024, 1, 1):
+        base_url = base_url or BSE_BASE_URL or "http://www.bseindia.com"
         formatted_date = date_input.strftime('%d%m%Y')
-        return f"http://www.bseindia.com/download/BhavCopy/Equity/BSE_EQ_BHAVCOPY_{formatted_date}.zip"
+        return f"{base_url}/download/BhavCopy/Equity/BSE_EQ_BHAVCOPY_{formatted_date}.zip"
     else:
+        base_url = base_url or BSE_BASE_URL or "https://www.bseindia.com"
         formatted_date = date_input.strftime('%Y%m%d')
-        return f"https://www.bseindia.com/download/BhavCopy/Equity/BhavCopy_BSE_CM_0_0_0_{formatted_date}_F_0000.csv"
+        return f"{base_url}/download/BhavCopy/Equity/BhavCopy_BSE_CM_0_0_0_{formatted_date}_F_0000.csv"
 
-def get_nse_bhavcopy_url(date_input):
+def get_nse_bhavcopy_url(date_input, base_url=None):
     """
     Returns the NSE Bhavcopy URL based on the input date.
 
     Parameters:
     date_input (datetime): The date for which the URL is to be generated.
+    base_url (str): Scheme and host to download from; defaults to NSE_BASE_URL.
 
     Returns:
     str: The URL for the NSE Bhavcopy.
     """
+    base_url = base_url or NSE_BASE_URL
     dd = date_input.strftime('%d')
     mm = date_input.strftime('%m')
     yyyy = date_input.strftime('%Y')
-    return f"https://nsearchives.nseindia.com/products/content/sec_bhavdata_full_{dd}{mm}{yyyy}.csv"
+    return f"{base_url}/products/content/sec_bhavdata_full_{dd}{mm}{yyyy}.csv"
 
 
-def fetch_nse_bhavcopy(date_input, retries=3):
+def get_bhavcopy_path(exchange, date_input):
     """
-    Fetches the NSE Bhavcopy for the given date and returns only the SYMBOL and CLOSE_PRICE columns.
-
-    Parameters:
-    date_input (str or datetime): The date for which the Bhavcopy is to be fetched.
-    retries (int): Number of retry attempts in case of failure.
+    Local cache path of an exchange's ("NSE" / "BSE") bhavcopy for a date.
 
-    Returns:
-    pd.DataFrame or None: DataFrame with SYMBOL and CLOSE_PRICE columns, or None if fetching fails.
+    Bhavcopies are stored in the columnar format of Utils/bhavcopy_cache.py
+    next to this (raw CSV) path; use is_cached() to test for either.
     """
-    if isinstance(date_input, str):
-        date_input = datetime.strptime(date_input, "%Y-%m-%d")
+    os.makedirs(BHAVCOPY_DIR, exist_ok=True)
+    return os.path.join(BHAVCOPY_DIR, f"{exchange.lower()}_bhavcopy_{date_input.strftime('%d_%m_%Y')}.csv")
 
-    directory = "./bhavcopies"
-    os.makedirs(directory, exist_ok=True)
-    filename = os.path.join(directory, f"nse_bhavcopy_{date_input.strftime('%d_%m_%Y')}.csv")
 
-    if os.path.exists(filename):
-        print(f"File {filename} already exists. Loading from local storage.")
-        data = pd.read_csv(filename)
+def _select_close_prices(exchange, data):
+    """Symbol and close price columns of a full bhavcopy"""
+    if exchange == "NSE":
         data['SERIES_PRIORITY'] = data[' SERIES'].map(series_priority).fillna(default_priority)
         filtered_data = data.drop_duplicates(subset='SYMBOL', keep='first')
         return filtered_data[["SYMBOL", " CLOSE_PRICE"]]
+    return data[["TckrSymb", "ClsPric"]]
 
-    url = get_nse_bhavcopy_url(date_input)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
 
-    retry_delay = 30  # Initial delay in seconds
+# Cached columns _select_close_prices reads
+PRICE_COLUMNS = {
+    "NSE": ["SYMBOL", " SERIES", " CLOSE_PRICE"],
+    "BSE": ["TckrSymb", "ClsPric"],
+}
+
+
+def load_cached_bhavcopy(exchange, filename):
+    """Close prices of a bhavcopy already saved by store_bhavcopy (or a raw CSV, migrated on the way)"""
+    print(f"File {filename} already exists. Loading from local storage.")
+    return _select_close_prices(exchange, load_bhavcopy(exchange, filename, PRICE_COLUMNS[exchange]))
+
+
+def store_bhavcopy(exchange, content, date_input, filename):
+    """
+    Parse a downloaded bhavcopy, save it to the local cache and return its close prices.
+
+    Parameters:
+    exchange (str): "NSE" or "BSE"
+    content (bytes): Response body (a zip for BSE before 2024, else CSV)
+    date_input (datetime): Trading date of the bhavcopy
+    filename (str): Cache path from get_bhavcopy_path
+
+    Returns:
+    pd.DataFrame: Symbol and close price columns
+    """
+    if exchange == "BSE" and date_input < datetime(2024, 1, 1):
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            csv_file_name = zf.namelist()[0]
+            with zf.open(csv_file_name) as file:
+                data = pd.read_csv(file)
+    else:
+        data = pd.read_csv(io.StringIO(content.decode('utf-8')))
+
+    # Save the columns in use to the columnar cache
+    write_columnar(columnar_path(filename), data, KEEP_COLUMNS[exchange])
+    print(f"Saved Bhavcopy to {columnar_path(filename)}")
+
+    if exchange == "BSE":
+        from Utils.isin_index import get_isin_index
+        isin_index = get_isin_index()
+        # Saved by the caller once its batch is done (see IsinIndex.flush)
+        isin_index.ingest(data, date_input.date(), os.path.basename(filename))
+    return _select_close_prices(exchange, data)
+
+
+class BhavcopyNotFound(Exception):
+    """The exchange has no bhavcopy for the date (HTTP 404)"""
+
+
+def download_bhavcopy(exchange, date_input, retries=3, base_url=None, fetcher=None):
+    """
+    Downloads an exchange's bhavcopy for the given date, without parsing it.
+
+    Parameters:
+    exchange (str): "NSE" or "BSE"
+    date_input (datetime): The date for which the Bhavcopy is to be fetched.
+    retries (int): Number of retry attempts in case of failure.
+    base_url (str): Scheme and host to download from; defaults to the exchange's.
+    fetcher (BhavcopyFetcher): Client to download with; defaults to the shared one.
+
+    Returns:
+    bytes or None: The response body, or None if fetching fails.
+
+    Raises:
+    BhavcopyNotFound: The exchange answered 404 (a holiday, or not published yet).
+    """
+    if exchange == "NSE":
+        url = get_nse_bhavcopy_url(date_input, base_url)
+    else:
+        url = get_bse_bhavcopy_url(date_input, base_url)
+    fetcher = fetcher or get_bhavcopy_fetcher()
+
     for attempt in range(retries):
+        response = None
         try:
-            response = requests.get(url, headers=headers, timeout=30)  # Increased timeout
+            headers = NSE_HEADERS if exchange == "NSE" else get_random_headers()
+            response = fetcher.get(exchange, url, headers=headers, timeout=30)  # Increased timeout
             response.raise_for_status()
-            data = pd.read_csv(io.StringIO(response.content.decode('utf-8')))
-
-            # Save the full Bhavcopy to file
-            data.to_csv(filename, index=False)
-            print(f"Saved Bhavcopy to {filename}")
-            data['SERIES_PRIORITY'] = data[' SERIES'].map(series_priority).fillna(default_priority)
-            filtered_data = data.drop_duplicates(subset='SYMBOL', keep='first')
-            return filtered_data[["SYMBOL", " CLOSE_PRICE"]]
+            return response.content
 
         except RequestException as e:
-            print(f"Attempt {attempt + 1} failed: {date_input}")
-            if response and (response.status_code in {503, 429}):
-                print(f"Rate limit exceeded. Pausing for {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Exponentially increase the delay
-                retry_delay += random.uniform(0, 1)
-            else:
+            print(f"Attempt {attempt + 1} failed: {date_input} {e}")
+            if response is not None and response.status_code == 404:
+                # No bhavcopy for the date; asking again will not change that
+                raise BhavcopyNotFound(f"No {exchange} bhavcopy for {date_input:%Y-%m-%d}") from e
+            # NSE only retries rate limited responses
+            if exchange == "NSE" and (response is None or response.status_code not in {503, 429}):
                 return None
             if attempt < retries - 1:
-                print("Retrying...")
+                # On top of any cooldown the fetcher's rate limiter imposes
+                delay = retry_delay(attempt)
+                print(f"Retrying in {delay:.1f}s...")
+                time.sleep(delay)
 
-    print("Failed to fetch NSE Bhavcopy after multiple attempts.")
+    print(f"Failed to fetch {exchange} Bhavcopy after multiple attempts.")
     return None
 
-def fetch_bse_bhavcopy(date_input, retries=3):
-    if isinstance(date_input, str):
-        date_input = datetime.strptime(date_input, "%Y-%m-%d")
 
-    directory = "./bhavcopies"
-    os.makedirs(directory, exist_ok=True)
-    filename = os.path.join(directory, f"bse_bhavcopy_{date_input.strftime('%d_%m_%Y')}.csv")
+def fetch_nse_bhavcopy(date_input, retries=3):
+    """
+    Fetches the NSE Bhavcopy for the given date and returns only the SYMBOL and CLOSE_PRICE columns.
 
-    if os.path.exists(filename):
-        print(f"File {filename} already exists. Loading from local storage.")
-        data = pd.read_csv(filename)
-        return data[["TckrSymb", "ClsPric"]]
+    Parameters:
+    date_input (str or datetime): The date for which the Bhavcopy is to be fetched.
+    retries (int): Number of retry attempts in case of failure.
 
-    url = get_bse_bhavcopy_url(date_input)
+    Returns:
+    pd.DataFrame or None: DataFrame with SYMBOL and CLOSE_PRICE columns, or None if fetching fails.
+    """
+    if isinstance(date_input, str):
+        date_input = datetime.strptime(date_input, "%Y-%m-%d")
 
-    retry_delay = 30
-    for attempt in range(retries):
-        try:
-            headers = get_random_headers()
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+    filename = get_bhavcopy_path("NSE", date_input)
+    if is_cached(filename):
+        return load_cached_bhavcopy("NSE", filename)
 
-            if date_input < datetime(2024, 1, 1):
-                with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-                    csv_file_name = zf.namelist()[0]
-                    with zf.open(csv_file_name) as file:
-                        data = pd.read_csv(file)
-            else:
-                data = pd.read_csv(io.StringIO(response.content.decode("utf-8")))
+    try:
+        content = download_bhavcopy("NSE", date_input, retries)
+    except BhavcopyNotFound:
+        return None
+    if content is None:
+        return None
+    return store_bhavcopy("NSE", content, date_input, filename)
 
-            data.to_csv(filename, index=False)
-            print(f"Saved Bhavcopy to {filename}")
-            return data[["TckrSymb", "ClsPric"]]
+def fetch_bse_bhavcopy(date_input, retries=3):
+    if isinstance(date_input, str):
+        date_input = datetime.strptime(date_input, "%Y-%m-%d")
 
-        except requests.exceptions.RequestException as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                wait_between_requests()
-                retry_delay *= 2
-            else:
-                break
+    filename = get_bhavcopy_path("BSE", date_input)
+    if is_cached(filename):
+        return load_cached_bhavcopy("BSE", filename)
 
-    print("Failed to fetch BSE Bhavcopy after multiple attempts.")
-    return None
+    try:
+        content = download_bhavcopy("BSE", date_input, retries)
+    except BhavcopyNotFound:
+        return None
+    if content is None:
+        return None
+    return store_bhavcopy("BSE", content, date_input, filename)
+
+def combine_close_prices(nse_data, bse_data):
+    """
+    Close prices of every ticker in one date's NSE and BSE bhavcopies.
 
-def fetch_data_for_ticker(ticker, stock_name, date_input, nse_data, bse_data):
-    symbol, exchange = ticker.split(".")
-    close_price = None
+    Parameters:
+    nse_data (pd.DataFrame or None): SYMBOL and CLOSE_PRICE columns of the NSE bhavcopy
+    bse_data (pd.DataFrame or None): TckrSymb and ClsPric columns of the BSE bhavcopy
 
-    if exchange.lower() == "ns" and nse_data is not None:
-        row = nse_data[nse_data["SYMBOL"].str.strip() == symbol]
-        if not row.empty:
-            close_price = row.iloc[0][" CLOSE_PRICE"]
-    
-    elif exchange.lower() == "bo" and bse_data is not None:
-        if date_input < datetime(2024, 1, 1):
-            row = bse_data[bse_data["SC_NAME"].str.strip() == stock_name.strip()]
-            if not row.empty:
-                close_price = row.iloc[0]["CLOSE"]
-        else:
-            row = bse_data[bse_data["TckrSymb"].str.strip() == symbol]
-            if not row.empty:
-                close_price = row.iloc[0]["ClsPric"]
+    Returns:
+    pd.Series or None: Close prices indexed by ticker ("<symbol>.NS" / ".BO"),
+    None if either bhavcopy is missing
+    """
+    if nse_data is None or bse_data is None:
+        return None
     
-    return close_price
+    nse_data = nse_data.rename(columns={"SYMBOL": "Symbol", " CLOSE_PRICE": "CLOSE_PRICE"})
+    nse_data["Symbol"] = nse_data["Symbol"] + ".NS"
+    bse_data = bse_data.rename(columns={"TckrSymb": "Symbol", "ClsPric": "CLOSE_PRICE"})
+    bse_data["Symbol"] = bse_data["Symbol"] + ".BO"
+
+    # Concatenating both dataframes
+    merged_data = pd.concat([nse_data, bse_data], ignore_index=True)
+
+    # Removing duplicates, if any
+    merged_data = merged_data.drop_duplicates(subset=["Symbol", "CLOSE_PRICE"])
+
+    close_prices = merged_data.set_index("Symbol")["CLOSE_PRICE"]
+    if not close_prices.index.is_unique:
+        print("not unique index")
+        duplicates = merged_data[["Symbol", "CLOSE_PRICE"]][merged_data["Symbol"].duplicated()]
+        print("Duplicate Symbols:", duplicates)
+        close_prices = close_prices.groupby(close_prices.index).first()
+    return close_prices
+
+def iter_bhavcopy_days(dates, combine, io_workers=None, parse_workers=None):
+    """
+    Stream a result per date while downloads and parsing overlap.
 
- 
-def get_stock_data(date_input, keys):
-    """Fetches the close prices for the given tickers based on their exchange (NSE or BSE)."""
-    try:
-        if isinstance(date_input, str):
-            date_input = datetime.strptime(date_input, "%Y-%m-%d")
-        elif not isinstance(date_input, datetime):
-            date_input = datetime.fromtimestamp(date_input.timestamp())
-        
-        nse_data = fetch_nse_bhavcopy(date_input)
-        bse_data = fetch_bse_bhavcopy(date_input)
-        
-        if nse_data is None or bse_data is None:
-            return None
-        
-        if nse_data is None:
-            print("No close prices for nse")
-            print(bse_data)
-            
-        if bse_data is None:
-            print("No close prices for bse")
-            print(nse_data)
-        
-        nse_data = nse_data.rename(columns={"SYMBOL": "Symbol", " CLOSE_PRICE": "CLOSE_PRICE"})
-        nse_data["Symbol"] = nse_data["Symbol"] + ".NS"
-        bse_data = bse_data.rename(columns={"TckrSymb": "Symbol", "ClsPric": "CLOSE_PRICE"})
-        bse_data["Symbol"] = bse_data["Symbol"] + ".BO"
-
-        # Concatenating both dataframes
-        merged_data = pd.concat([nse_data, bse_data], ignore_index=True)
-
-        # Removing duplicates, if any
-        merged_data = merged_data.drop_duplicates(subset=["Symbol", "CLOSE_PRICE"])
-
-
-        # Debug: Check for duplicate labels
-
-        # Select symbols based on the date
-        symbols_to_fetch = keys
-
-        # close_prices = merged_data.set_index("Symbol")[["CLOSE_PRICE"]].T[symbols_to_fetch].values
-        # close_prices = merged_data.set_index("Symbol").drop(["Symbol"], axis=1)[["CLOSE_PRICE"]].reindex(symbols_to_fetch).T.values
-        close_prices = merged_data.set_index("Symbol")["CLOSE_PRICE"]
-        if not close_prices.index.is_unique:
-            print("not unique index")
-            duplicates = merged_data[["Symbol", "CLOSE_PRICE"]][merged_data["Symbol"].duplicated()]
-            print("Duplicate Symbols:", duplicates)
-            close_prices = close_prices.groupby(close_prices.index).first()
-       
-        close_prices = close_prices.reindex(symbols_to_fetch)
-
-        return close_prices
-    except Exception as e:
-        print(f"Failed to fetch close prices: {e}  {date_input}")
-        return None
+    Both exchanges' bhavcopies of every date are downloaded on a pool of I/O
+    threads. Each file is handed to a separate, smaller parse pool as soon as
+    it arrives (or straight away when it is cached), and `combine` runs there
+    once both of a date's bhavcopies are parsed. The I/O threads therefore
+    never wait on parsing, and dates are yielded in the order they complete,
+    not in the order of dates. BSE bhavcopies parsed on the way are ingested
+    into the ISIN index, which is saved once at the end.
 
-def create_stock_price_df(start_date, end_date, keys, symbols_dict):
-    """Create a DataFrame with stock close prices for a range of dates."""
+    Parameters:
+    dates (list of datetime): Trading dates
+    combine (callable): (nse_data, bse_data, date) -> result, run on the parse pool
+    io_workers (int): Download threads, defaults to the fetcher's pool size
+    parse_workers (int): Parse threads, defaults to the CPU count (at most 8)
+
+    Yields:
+    (str, result or None, bool): 'YYYY-MM-DD', the result of combine (None if
+    it raised or a bhavcopy is missing) and whether both exchanges answered
+    that they have no bhavcopy for the date
+    """
+    io_workers = io_workers or get_bhavcopy_fetcher().pool_size
+    parse_workers = parse_workers or min(os.cpu_count() or 1, 8)
+
+    def parse(exchange, date_input, filename, content):
+        if content is None:
+            return load_cached_bhavcopy(exchange, filename) if is_cached(filename) else None
+        return store_bhavcopy(exchange, content, date_input, filename)
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, \
+            ThreadPoolExecutor(max_workers=parse_workers) as parse_pool:
+        stage = {}    # future -> (stage, date, exchange)
+        for date_input in dates:
+            for exchange in ("NSE", "BSE"):
+                if is_cached(get_bhavcopy_path(exchange, date_input)):
+                    future = parse_pool.submit(
+                        parse, exchange, date_input, get_bhavcopy_path(exchange, date_input), None
+                    )
+                    stage[future] = ("parse", date_input, exchange)
+                else:
+                    future = io_pool.submit(download_bhavcopy, exchange, date_input)
+                    stage[future] = ("download", date_input, exchange)
+
+        parsed = {}      # date -> {exchange: close prices}
+        not_found = {}   # date -> exchanges that answered 404
+        pending = set(stage)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, date_input, exchange = stage.pop(future)
+                try:
+                    result = future.result()
+                except BhavcopyNotFound:
+                    not_found.setdefault(date_input, set()).add(exchange)
+                    result = None
+                except Exception as e:
+                    print(f"Failed to fetch close prices: {e}  {date_input}")
+                    result = None
+
+                if name == "merge":
+                    yield date_input.strftime("%Y-%m-%d"), result, False
+                    continue
+
+                if name == "download" and result is not None:
+                    next_future = parse_pool.submit(
+                        parse, exchange, date_input, get_bhavcopy_path(exchange, date_input), result
+                    )
+                    stage[next_future] = ("parse", date_input, exchange)
+                    pending.add(next_future)
+                    continue
+
+                # Parsed (or failed) bhavcopy: merge the date once both exchanges are in
+                parsed.setdefault(date_input, {})[exchange] = result
+                if len(parsed[date_input]) == 2:
+                    day = parsed.pop(date_input)
+                    if len(not_found.pop(date_input, ())) == 2:
+                        yield date_input.strftime("%Y-%m-%d"), None, True
+                        continue
+                    next_future = parse_pool.submit(combine, day["NSE"], day["BSE"], date_input)
+                    stage[next_future] = ("merge", date_input, None)
+                    pending.add(next_future)
+
+    # Save the ISIN index once for the batch; if the run is cut short,
+    # ingest_directory() picks the unsaved files up next time
+    from Utils.isin_index import get_isin_index
+    get_isin_index().flush()
+
+
+def bhavcopy_dates(start_date, end_date):
+    """Dates of a 'YYYY-MM-DD' range to look for bhavcopies on, as datetimes"""
     start_date = datetime.strptime(start_date, "%Y-%m-%d")
     end_date = datetime.strptime(end_date, "%Y-%m-%d")
     
     dates = pd.date_range(start=start_date, end=end_date).to_pydatetime().tolist()
-    dates = [date for date in dates if date.weekday() != 6]  # Skip Sundays
- 
-    def fetch_data_for_date(date):
-        if server_overloaded:
-            time.sleep(30)
-        date_str = date.strftime("%Y-%m-%d")
-        return get_stock_data(date_str, symbols_dict[date_str])
-    
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_data_for_date, dates))
-    
-    # Filter out None results and their corresponding dates
-    filtered_data = [(d.strftime("%Y-%m-%d"), r) for d, r in zip(dates, results) if r is not None]
-
-    # Extract the filtered dates and results
-    filtered_dates = [item[0] for item in filtered_data]
-    filtered_results = [item[1] for item in filtered_data]
-
-    print("Filtered results")
-    print(filtered_results)
-    # Create the DataFrame
-    # price_df = pd.DataFrame(filtered_results, index=filtered_dates, columns=keys)
-    price_df = pd.DataFrame([series.values for series in filtered_results], index=filtered_dates, columns=keys)
-    # Reset the index to make dates a column
-    price_df = price_df.T.reset_index()
-
-    # Rename the columns for clarity
-    price_df = price_df.rename(columns={"index": "ticker"})
-    print("shape", price_df.shape)
-    return price_df
+    return [date for date in dates if date.weekday() != 6]  # Skip Sundays
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import os
 def check_and_create_drill_down_track_df():
@@ -64,4 +65,206 @@ def save_drill_down_df(drill_down_df, filename="Excels/drill_down_track.csv"):
         by="date",
         key=lambda col: pd.to_datetime(col, errors="coerce", dayfirst=True)
     )
-    drill_down_df.to_csv(filename, index=False)
\ No newline at end of file
+    drill_down_df.to_csv(filename, index=False)
+
+TRACK_COLUMNS = ["date", "share name", "broker", "File", "purchase cost", "quantity", "t_day mkt price", "total market value"]
+_KEY_COLUMNS = ["date", "share name", "broker", "File"]
+_VALUE_COLUMNS = ["purchase cost", "quantity", "t_day mkt price", "total market value"]
+
+
+def _track_key(date, share_name, broker, file):
+    """Hashable row key, or None when a part is missing (NaN never equals itself in enter_track)"""
+    key = (date, share_name, broker, file)
+    if any(pd.isna(part) for part in key):
+        return None
+    return key
+
+
+class DrillDownTracker:
+    """
+    Upsert accumulator for the drill-down track.
+
+    Rows are keyed by (date, share name, broker, File) in a dict, so entering a
+    holding is an O(1) lookup plus a weighted-average merge instead of four
+    boolean masks over the whole history. Merges follow enter_track exactly,
+    and the DataFrame is only built by to_frame().
+    """
+
+    def __init__(self, drill_down_df=None):
+        """
+        Args:
+            drill_down_df: Existing track (e.g. from init_drill_down_df); its rows
+                can still be merged into
+        """
+        if drill_down_df is None:
+            drill_down_df = check_and_create_drill_down_track_df()
+        self._seed = drill_down_df
+        self._seed_values = {}  # seed position -> updated values
+        self._index = {}        # key -> ("seed", position) or ("new", position)
+
+        for pos, key in enumerate(zip(*(drill_down_df[col] for col in _KEY_COLUMNS))):
+            key = _track_key(*key)
+            if key is not None and key not in self._index:
+                self._index[key] = ("seed", pos)
+
+        self._rows = {col: [] for col in TRACK_COLUMNS}
+
+    def __len__(self):
+        return len(self._seed) + len(self._rows["date"])
+
+    def _get_values(self, location):
+        source, pos = location
+        if source == "new":
+            return [self._rows[col][pos] for col in _VALUE_COLUMNS]
+        if pos in self._seed_values:
+            return self._seed_values[pos]
+        return [self._seed[col].iat[pos] for col in _VALUE_COLUMNS]
+
+    def _set_values(self, location, values):
+        source, pos = location
+        if source == "new":
+            for col, value in zip(_VALUE_COLUMNS, values):
+                self._rows[col][pos] = value
+        else:
+            self._seed_values[pos] = values
+
+    def enter(self, date, share_name, broker, file, qty, purchase_cost, current_market_price, current_mv):
+        """Same as enter_track, without scanning or copying the track"""
+        key = _track_key(date, share_name, broker, file)
+        location = self._index.get(key) if key is not None else None
+
+        if location is not None:
+            old_purchase_cost, old_qty, old_cmp, old_mv = self._get_values(location)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                new_avg_purchase_cost = np.float64((old_qty * old_purchase_cost) + (qty * purchase_cost)) / (old_qty + qty)
+            new_market_val = old_mv + current_mv
+            new_cmp = current_market_price if current_market_price == old_cmp else new_avg_purchase_cost
+
+            self._set_values(location, [new_avg_purchase_cost, old_qty + qty, new_cmp, new_market_val])
+        else:
+            new_row = [date, share_name, broker, file, purchase_cost, qty, current_market_price, qty * current_market_price]
+            for col, value in zip(TRACK_COLUMNS, new_row):
+                self._rows[col].append(value)
+            if key is not None:
+                self._index[key] = ("new", len(self._rows["date"]) - 1)
+
+    def contains(self, date, share_name, broker, file):
+        """Whether a row with this key can be merged into"""
+        key = _track_key(date, share_name, broker, file)
+        return key is not None and key in self._index
+
+    def append_rows(self, date, share_names, brokers, files, purchase_costs, quantities, market_prices, market_values):
+        """Append rows whose keys are not in the track yet (see enter_tracks)"""
+        start = len(self._rows["date"])
+        columns = [[date] * len(share_names), share_names, brokers, files,
+                   purchase_costs, quantities, market_prices, market_values]
+        for col, values in zip(TRACK_COLUMNS, columns):
+            self._rows[col].extend(values)
+        for offset, key in enumerate(zip(share_names, brokers, files)):
+            key = _track_key(date, *key)
+            if key is not None:
+                self._index[key] = ("new", start + offset)
+
+    def to_frame(self):
+        """Existing rows (with merged updates) followed by the new rows"""
+        seed = self._seed
+        if self._seed_values:
+            seed = seed.copy()
+            for pos, values in self._seed_values.items():
+                seed.loc[seed.index[pos], _VALUE_COLUMNS] = values
+
+        if not self._rows["date"]:
+            return seed
+        new_rows = pd.DataFrame(self._rows)
+        if seed.empty:
+            return new_rows
+        return pd.concat([seed, new_rows], ignore_index=True)
+
+
+def enter_tracks(drill_down, date, share_names, brokers, files, quantities, purchase_costs, market_prices, market_values):
+    """
+    Enter one day's held lots at once.
+
+    Lots are grouped by (share name, broker, File) and each group is folded in
+    rank rounds (first lot of every group, then the second, ...), so the result
+    matches calling enter_track for every lot in order, including its weighted
+    average cost and t_day mkt price rules.
+
+    Args:
+        drill_down: DrillDownTracker (updated in place) or drill-down DataFrame / None
+        date: Date of the entries
+        share_names, brokers, files: Per-lot keys
+        quantities, purchase_costs, market_prices, market_values: Per-lot values
+
+    Returns:
+        The tracker, or the updated DataFrame when a DataFrame was given
+    """
+    if not isinstance(drill_down, DrillDownTracker):
+        tracker = DrillDownTracker(drill_down)
+        enter_tracks(tracker, date, share_names, brokers, files, quantities,
+                     purchase_costs, market_prices, market_values)
+        return tracker.to_frame()
+
+    lots = pd.DataFrame({
+        "share name": pd.Series(share_names, dtype=object),
+        "broker": pd.Series(brokers, dtype=object),
+        "File": pd.Series(files, dtype=object),
+    })
+    if lots.empty:
+        return drill_down
+    quantities = np.asarray(quantities)
+    purchase_costs = np.asarray(purchase_costs)
+    market_prices = np.asarray(market_prices)
+    market_values = np.asarray(market_values)
+
+    # Group ids in order of first appearance; lots with a missing key part never merge
+    group = lots.groupby(["share name", "broker", "File"], sort=False, dropna=False).ngroup().to_numpy()
+    unmergeable = lots.isna().any(axis=1).to_numpy()
+    group[unmergeable] = group.max() + 1 + np.arange(unmergeable.sum())
+    group = pd.factorize(group)[0]
+    rank = pd.Series(group).groupby(group).cumcount().to_numpy()
+    n_groups = group.max() + 1
+
+    # Keys that already exist in the track are merged lot by lot
+    first = np.flatnonzero(rank == 0)
+    existing = np.array([
+        drill_down.contains(date, lots.iat[i, 0], lots.iat[i, 1], lots.iat[i, 2]) for i in first
+    ], dtype=bool)
+    if existing.any():
+        merge_groups = np.isin(group, group[first[existing]])
+        for i in np.flatnonzero(merge_groups):
+            drill_down.enter(date, lots.iat[i, 0], lots.iat[i, 1], lots.iat[i, 2], quantities[i],
+                             purchase_costs[i], market_prices[i], market_values[i])
+        keep = ~merge_groups
+        if not keep.any():
+            return drill_down
+        return enter_tracks(drill_down, date, lots["share name"][keep].tolist(), lots["broker"][keep].tolist(),
+                            lots["File"][keep].tolist(), quantities[keep], purchase_costs[keep],
+                            market_prices[keep], market_values[keep])
+
+    # First lot of each group starts the row
+    start = first[np.argsort(group[first])]
+    qty = quantities[start].copy()
+    cost = purchase_costs[start].astype(np.float64)
+    cmp = market_prices[start].astype(np.float64)
+    mv = (quantities[start] * market_prices[start]).astype(np.float64)
+
+    # Fold the remaining lots one rank at a time
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for r in range(1, rank.max() + 1):
+            idx = np.flatnonzero(rank == r)
+            g = group[idx]
+            new_cost = ((qty[g] * cost[g]) + (quantities[idx] * purchase_costs[idx])) / (qty[g] + quantities[idx])
+            mv[g] = mv[g] + market_values[idx]
+            cmp[g] = np.where(market_prices[idx] == cmp[g], market_prices[idx], new_cost)
+            qty[g] = qty[g] + quantities[idx]
+            cost[g] = new_cost
+
+    drill_down.append_rows(
+        date,
+        lots["share name"].to_numpy()[start].tolist(),
+        lots["broker"].to_numpy()[start].tolist(),
+        lots["File"].to_numpy()[start].tolist(),
+        cost.tolist(), qty.tolist(), cmp.tolist(), mv.tolist(),
+    )
+    return drill_down
@@ -0,0 +1,171 @@
+"""
+Utility structures for walking portfolio holdings through time
+"""
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Day ordinals used for missing dates. A missing DOP never makes a lot "not yet
+# bought" and a missing sale date never makes it "already sold", which is how
+# the NaT comparisons behave on the dataframe.
+NO_PURCHASE_DATE = 0
+NO_SALE_DATE = date.max.toordinal() + 1
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_ordinals(dates, missing: int) -> np.ndarray:
+    """Convert a date-like column to day ordinals, using `missing` for NaT"""
+    days = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[D]')
+    ordinals = days.astype(np.int64) + _EPOCH_ORDINAL
+    ordinals[np.isnat(days)] = missing
+    return ordinals
+
+
+def _encode(values) -> Tuple[np.ndarray, List]:
+    """Integer-code values in order of first appearance; missing values get -1"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return codes.astype(np.int32), list(uniques)
+
+
+@dataclass
+class HoldingsTable:
+    """
+    Columnar, array-backed view of the holdings sheet.
+
+    Built once per run from DataLoader.load_main_dataframe output. Row i of
+    every array is row i of the sheet. Tickers, symbols and brokers are
+    integer coded (-1 where the sheet has no NSE Name) and dates are stored as
+    day ordinals: the sheet holds calendar dates, so a time of day in DOP or
+    S. Date is dropped and the lot counts as bought / sold on that date.
+    """
+    symbols: List[str]          # NSE Name per symbol code
+    symbol_code: np.ndarray     # int32
+    tickers: List[str]          # "<NSE Name>.NS" / ".BO" per ticker code
+    ticker_code: np.ndarray     # int32
+    brokers: List[str]          # broker name per broker code
+    broker_code: np.ndarray     # int32
+    file: np.ndarray            # object, 'File' column
+    quantity: np.ndarray        # 'No. ' (adjusted in place for corporate actions)
+    cost: np.ndarray            # 'Cost/Sh'
+    net_cost: np.ndarray        # float64
+    net_sale: np.ndarray        # float64
+    dop: np.ndarray             # int64 day ordinals, NO_PURCHASE_DATE if missing
+    sale_date: np.ndarray       # int64 day ordinals, NO_SALE_DATE if missing
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'HoldingsTable':
+        """Build the table from the preprocessed holdings dataframe"""
+        symbol_code, symbols = _encode(df['NSE Name '])
+
+        has_symbol = df['NSE Name '].notna()
+        suffix = np.where(df['Symbol'] == "NSE", ".NS", ".BO")
+        ticker_values = (df['NSE Name '].astype(str) + suffix).where(has_symbol)
+        ticker_code, tickers = _encode(ticker_values)
+
+        broker_code, brokers = _encode(df['Broker'])
+
+        return cls(
+            symbols=symbols,
+            symbol_code=symbol_code,
+            tickers=tickers,
+            ticker_code=ticker_code,
+            brokers=brokers,
+            broker_code=broker_code,
+            file=df['File'].to_numpy(dtype=object),
+            quantity=df['No. '].to_numpy(copy=True),
+            cost=df['Cost/Sh'].to_numpy(copy=True),
+            net_cost=df['Net Cost'].to_numpy(dtype=np.float64),
+            net_sale=df['Net Sale'].to_numpy(dtype=np.float64),
+            dop=to_ordinals(df['DOP'], NO_PURCHASE_DATE),
+            sale_date=to_ordinals(df['S. Date'], NO_SALE_DATE),
+        )
+
+    def __post_init__(self):
+        self._symbol_lookup = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._symbol_rows = None
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    def copy(self) -> 'HoldingsTable':
+        """Copy with its own quantity column; the other columns are shared read-only"""
+        return replace(self, quantity=self.quantity.copy())
+
+    def symbol_index(self, symbol: str) -> int:
+        """Code of an NSE Name, or -1 if no lot holds it"""
+        return self._symbol_lookup.get(symbol, -1)
+
+    def symbol_rows(self, symbol: str) -> np.ndarray:
+        """Row positions (ascending) of the lots of an NSE Name"""
+        if self._symbol_rows is None:
+            order = np.argsort(self.symbol_code, kind='stable')
+            bounds = np.searchsorted(self.symbol_code[order], np.arange(len(self.symbols) + 1))
+            self._symbol_rows = [order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        code = self.symbol_index(symbol)
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return self._symbol_rows[code]
+
+
+class ActiveHoldingsIndex:
+    """
+    Event driven set of lots held on the current day.
+
+    Open events (DOP) and close events (S. Date) are sorted once. As the day
+    cursor moves forward, lots are added when their DOP is reached and dropped
+    once their sale date has passed, so each step only touches the lots whose
+    state actually changes.
+
+    A lot is held on day D when not DOP > D and not S. Date < D.
+    """
+
+    def __init__(self, open_days: np.ndarray, close_days: np.ndarray):
+        """
+        Args:
+            open_days: Purchase day ordinals per lot (NO_PURCHASE_DATE if missing)
+            close_days: Sale day ordinals per lot (NO_SALE_DATE if missing)
+        """
+        self._open_order = np.argsort(open_days, kind='stable')
+        self._open_days = open_days[self._open_order]
+        self._close_order = np.argsort(close_days, kind='stable')
+        self._close_days = close_days[self._close_order]
+
+        self._open_pos = 0
+        self._close_pos = 0
+        self._closed = np.zeros(len(open_days), dtype=bool)
+        self._cursor = None
+        self.active = set()
+
+    def advance(self, day: int) -> List[int]:
+        """
+        Move the day cursor forward and return the positions of held lots.
+
+        Args:
+            day: Day ordinal to move to; must not be earlier than the previous call
+
+        Returns:
+            Sorted row positions of lots held on that day
+        """
+        if self._cursor is not None and day < self._cursor:
+            raise ValueError(f"ActiveHoldingsIndex cannot move backwards to {date.fromordinal(day)}")
+        self._cursor = day
+
+        # Close lots whose sale date is strictly before the day
+        close_end = np.searchsorted(self._close_days, day, side='left')
+        for lot in self._close_order[self._close_pos:close_end].tolist():
+            self._closed[lot] = True
+            self.active.discard(lot)
+        self._close_pos = close_end
+
+        # Open lots purchased on or before the day (unless already sold)
+        open_end = np.searchsorted(self._open_days, day, side='right')
+        for lot in self._open_order[self._open_pos:open_end].tolist():
+            if not self._closed[lot]:
+                self.active.add(lot)
+        self._open_pos = open_end
+
+        return sorted(self.active)
@@ -0,0 +1,313 @@
+"""
+ISIN index over the cached bhavcopies, for resolving renamed tickers by date
+"""
+import glob
+import json
+import logging
+import os
+import threading
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BHAVCOPY_DIR = "./bhavcopies"
+INDEX_FILE = "isin_index.json"
+# Bumped when the stored intervals change meaning; older indexes are rebuilt
+INDEX_VERSION = 2
+
+# (ISIN, ticker symbol, scrip code) columns of the BSE bhavcopy formats. The NSE
+# sec_bhavdata_full files carry no ISIN, but BSE's TckrSymb is the NSE symbol
+# for dual listed shares, so NSE tickers are resolved through the same entries.
+# The older format only has the company's short name (SC_NAME), which is not a
+# ticker symbol, so its rows store the scrip code alone.
+_ISIN_COLUMNS = [
+    ("ISIN", "TckrSymb", "FinInstrmId"),   # BhavCopy_BSE_CM (2024 onwards)
+    ("ISIN_CODE", None, "SC_CODE"),        # BSE_EQ_BHAVCOPY with ISIN (older)
+]
+
+# One interval: [valid_from, valid_to, symbol, code] with day ordinals; the
+# symbol is "" where the bhavcopy format has none
+Interval = List
+
+
+def _file_key(name: str) -> str:
+    """Bhavcopy file name without directory and extension (CSV and .npz share it)"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class IsinIndex:
+    """
+    ISIN -> [(valid_from, valid_to, symbol, code), ...] built from bhavcopies.
+
+    Every ingested bhavcopy extends the interval of each ISIN it lists, so
+    renames show up as consecutive intervals with different symbols. A
+    symbol -> ISIN dict makes resolving a ticker a hash lookup plus a bisect
+    over that ISIN's (few) intervals. Dates only covered by the older BSE
+    format (scrip code, no symbol) resolve to the symbol of the ISIN's
+    nearest interval that has one.
+
+    The index is persisted next to the bhavcopies together with the names of
+    the files already ingested. Ingesting only updates memory; callers that
+    ingest a batch of files save once at the end with flush(). Files ingested
+    but never saved are picked up again by ingest_directory().
+    """
+
+    def __init__(self, directory: str = BHAVCOPY_DIR):
+        """
+        Args:
+            directory: Bhavcopy cache directory
+        """
+        self.path = os.path.join(directory, INDEX_FILE)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._intervals: Dict[str, List[Interval]] = {}
+        self._symbol_isin: Optional[Dict[str, str]] = {}
+        self._files = set()
+        self._unsaved = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Rebuilding unreadable ISIN index {self.path}: {e}")
+            return
+        if stored.get("version") != INDEX_VERSION:
+            logger.info(f"Rebuilding ISIN index {self.path} written by an older version")
+            return
+        self._intervals = stored.get("intervals", {})
+        self._files = {_file_key(name) for name in stored.get("files", [])}
+        self._rebuild_symbol_lookup()
+
+    def save(self):
+        """Persist the index next to the bhavcopies"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "files": sorted(self._files),
+                    "intervals": self._intervals,
+                }, f)
+            self._unsaved = False
+
+    def flush(self):
+        """Save the index if files were ingested since it was last saved"""
+        if self._unsaved:
+            self.save()
+
+    def _rebuild_symbol_lookup(self):
+        # A symbol maps to the ISIN that used it last
+        latest = {}
+        for isin, intervals in self._intervals.items():
+            for valid_from, valid_to, symbol, _ in intervals:
+                if not symbol:
+                    continue
+                if symbol not in latest or valid_to > latest[symbol][0]:
+                    latest[symbol] = (valid_to, isin)
+        self._symbol_isin = {symbol: isin for symbol, (_, isin) in latest.items()}
+
+    def _add(self, isin: str, day: int, symbol: str, code: str):
+        """Extend or insert the interval covering `day` for an ISIN"""
+        intervals = self._intervals.setdefault(isin, [])
+        pos = bisect_right([interval[0] for interval in intervals], day)
+        before = intervals[pos - 1] if pos > 0 else None
+        after = intervals[pos] if pos < len(intervals) else None
+
+        if before is not None and before[1] >= day:
+            if before[2:] == [symbol, code]:
+                return
+            # Conflicting entry inside an interval: split it around the day
+            tail = [day + 1, before[1], before[2], before[3]]
+            before[1] = day - 1
+            intervals[pos:pos] = [[day, day, symbol, code]] + ([tail] if tail[0] <= tail[1] else [])
+            if before[0] > before[1]:
+                intervals.remove(before)
+            return
+
+        same_before = before is not None and before[2:] == [symbol, code]
+        same_after = after is not None and after[2:] == [symbol, code]
+        if same_before and same_after:
+            before[1] = after[1]
+            intervals.remove(after)
+        elif same_before:
+            before[1] = day
+        elif same_after:
+            after[0] = day
+        else:
+            intervals.insert(pos, [day, day, symbol, code])
+
+    def ingest(self, bhavcopy: pd.DataFrame, trade_date: date, name: Optional[str] = None) -> bool:
+        """
+        Add one day's bhavcopy to the index.
+
+        Args:
+            bhavcopy: Full bhavcopy as downloaded
+            trade_date: Trading date of the bhavcopy
+            name: File name (or path), to skip it next time
+
+        Returns:
+            True if the bhavcopy had ISIN columns
+        """
+        for isin_col, symbol_col, code_col in _ISIN_COLUMNS:
+            required = [col for col in (isin_col, symbol_col, code_col) if col]
+            if set(required).issubset(bhavcopy.columns):
+                break
+        else:
+            return False
+
+        rows = bhavcopy[required].dropna()
+        symbols = rows[symbol_col].astype(str).str.strip() if symbol_col else [""] * len(rows)
+        day = trade_date.toordinal()
+        with self._lock:
+            for isin, symbol, code in zip(
+                rows[isin_col].astype(str).str.strip(),
+                symbols,
+                rows[code_col].astype(str).str.strip()
+            ):
+                self._add(isin, day, symbol, code)
+            if name is not None:
+                self._files.add(_file_key(name))
+            # Rebuilt on the next lookup, not once per ingested file
+            self._symbol_isin = None
+            self._unsaved = True
+        return True
+
+    def ingest_file(self, path: str) -> bool:
+        """
+        Ingest one cached BSE bhavcopy (raw CSV or columnar .npz) not in the index yet.
+
+        Returns:
+            True if the file was ingested
+        """
+        name = _file_key(path)
+        if name in self._files:
+            return False
+        trade_date = datetime.strptime(name[len("bse_bhavcopy_"):], "%d_%m_%Y").date()
+        columns = [c for cols in _ISIN_COLUMNS for c in cols if c]
+        if path.endswith(".csv"):
+            header = pd.read_csv(path, nrows=0).columns
+            bhavcopy = pd.read_csv(path, usecols=[c for c in columns if c in header])
+        else:
+            from Utils.bhavcopy_cache import read_columnar
+            bhavcopy = read_columnar(path, columns)
+        if self.ingest(bhavcopy, trade_date, name):
+            return True
+        with self._lock:
+            self._files.add(name)
+            self._unsaved = True
+        return False
+
+    def ingest_directory(self) -> int:
+        """
+        Ingest cached BSE bhavcopies that are not in the index yet.
+
+        Returns:
+            Number of files ingested
+        """
+        ingested = 0
+        paths = glob.glob(os.path.join(self.directory, "bse_bhavcopy_*.csv"))
+        paths += glob.glob(os.path.join(self.directory, "bse_bhavcopy_*.npz"))
+        for path in sorted(paths):
+            try:
+                if self.ingest_file(path):
+                    ingested += 1
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping bhavcopy {path} for the ISIN index: {e}")
+        if ingested:
+            logger.info(f"Ingested {ingested} bhavcopies into the ISIN index")
+        self.flush()
+        return ingested
+
+    def isin_of(self, symbol: str) -> Optional[str]:
+        """ISIN that last traded under a symbol"""
+        with self._lock:
+            if self._symbol_isin is None:
+                self._rebuild_symbol_lookup()
+            return self._symbol_isin.get(symbol)
+
+    def resolve(self, isin: str, day: date) -> Optional[Tuple[str, str]]:
+        """
+        (symbol, code) an ISIN traded under on a date.
+
+        Dates after an interval (and before the next one) keep its symbol;
+        dates before the first bhavcopy listing the ISIN resolve to None. The
+        symbol is "" for dates only the older BSE format covers.
+        """
+        intervals = self._intervals.get(isin)
+        if not intervals:
+            return None
+        pos = bisect_right([interval[0] for interval in intervals], day.toordinal()) - 1
+        if pos < 0:
+            return None
+        _, _, symbol, code = intervals[pos]
+        return symbol, code
+
+    def resolve_ticker(self, ticker: str, day: date) -> Optional[str]:
+        """
+        Ticker ("<symbol>.NS" / ".BO") under which the same ISIN traded on a date.
+
+        Returns:
+            The resolved ticker, or None if the symbol is not in the index
+        """
+        return self.resolve_ticker_dates(ticker, [day])[0]
+
+    def resolve_ticker_dates(self, ticker: str, days: List[date]) -> List[Optional[str]]:
+        """
+        resolve_ticker for many dates of one ticker.
+
+        The ticker's ISIN and interval starts are looked up once; each date
+        then costs a bisect.
+
+        Returns:
+            The resolved ticker per date, None where there is none
+        """
+        symbol, _, exchange = ticker.rpartition(".")
+        isin = self.isin_of(symbol)
+        intervals = self._intervals.get(isin) if isin is not None else None
+        if not intervals:
+            return [None] * len(days)
+
+        starts = [interval[0] for interval in intervals]
+        resolved = []
+        for day in days:
+            pos = bisect_right(starts, day.toordinal()) - 1
+            if pos < 0:
+                resolved.append(None)
+                continue
+            symbol = intervals[pos][2] or self._nearest_symbol(isin, day)
+            resolved.append(f"{symbol}.{exchange}" if symbol else None)
+        return resolved
+
+    def _nearest_symbol(self, isin: str, day: date) -> Optional[str]:
+        """Symbol of the ISIN's interval closest to a date, among those that have one"""
+        day = day.toordinal()
+        best = None
+        for valid_from, valid_to, symbol, _ in self._intervals.get(isin, ()):
+            if not symbol:
+                continue
+            distance = max(valid_from - day, day - valid_to, 0)
+            if best is None or distance < best[0]:
+                best = (distance, symbol)
+        return best[1] if best else None
+
+
+_index: Optional[IsinIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_isin_index() -> IsinIndex:
+    """Shared index over ./bhavcopies, catching up with cached files on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IsinIndex()
+            _index.ingest_directory()
+    return _index
@@ -0,0 +1,76 @@
+"""
+Array based NAV / units computation for the sales-purchase sheets
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def compute_nav(
+    values: np.ndarray,
+    purchases: np.ndarray,
+    sales: np.ndarray,
+    prev_units: np.ndarray,
+    prev_nav: np.ndarray,
+    prev_value: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute units and NAV for every broker at once as a scan over days.
+
+    Each step applies the same rules as PortfolioCalculator.update_nav:
+    a previous NAV of 0 restarts at 1000, units grow by net fund / NAV while
+    the previous value is non-zero (otherwise they are re-based on the current
+    value), and a zero current value zeroes both units and NAV.
+
+    Days where a broker has no purchase, no sale and zero value produce no
+    sales/purchase row, so they leave that broker's state untouched.
+
+    Args:
+        values: Market value per day and broker, shape (days, brokers)
+        purchases: Purchases per day and broker, shape (days, brokers)
+        sales: Sales per day and broker, shape (days, brokers)
+        prev_units: Units per broker before the first day, shape (brokers,)
+        prev_nav: NAV per broker before the first day, shape (brokers,)
+        prev_value: Value per broker before the first day, shape (brokers,)
+
+    Returns:
+        units, nav: Arrays of shape (days, brokers), NaN where no row is written
+        emitted: Boolean array of shape (days, brokers), True where a row is written
+    """
+    values = np.asarray(values, dtype=np.float64)
+    purchases = np.asarray(purchases, dtype=np.float64)
+    sales = np.asarray(sales, dtype=np.float64)
+
+    units_state = np.array(prev_units, dtype=np.float64)
+    nav_state = np.array(prev_nav, dtype=np.float64)
+    value_state = np.array(prev_value, dtype=np.float64)
+
+    emitted = (sales != 0) | (purchases != 0) | (values != 0)
+    units = np.full(values.shape, np.nan)
+    nav = np.full(values.shape, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for day in range(values.shape[0]):
+            value = values[day]
+            net_fund = purchases[day] - sales[day]
+            base_nav = np.where(nav_state == 0, 1000.0, nav_state)
+
+            day_units = np.where(
+                value_state != 0,
+                units_state + net_fund / base_nav,
+                value / base_nav
+            )
+            day_nav = np.where(day_units != 0, value / day_units, 0.0)
+
+            zero_value = value == 0
+            day_units = np.where(zero_value, 0.0, day_units)
+            day_nav = np.where(zero_value, 0.0, day_nav)
+
+            mask = emitted[day]
+            units[day, mask] = day_units[mask]
+            nav[day, mask] = day_nav[mask]
+            units_state = np.where(mask, day_units, units_state)
+            nav_state = np.where(mask, day_nav, nav_state)
+            value_state = np.where(mask, value, value_state)
+
+    return units, nav, emitted
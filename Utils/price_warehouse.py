@@ -0,0 +1,338 @@
+"""
+Persistent memory-mapped close price warehouse (dates x symbols)
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WAREHOUSE_DIR = "./bhavcopies"
+MATRIX_FILE = "close_prices.f8"
+META_FILE = "close_prices.json"
+
+MIN_WIDTH = 4096
+FLUSH_EVERY = 50   # dates appended between metadata writes during an update
+
+# A date both exchanges still answer 404 for this many days later is taken as a market holiday
+CLOSED_AFTER_DAYS = 7
+
+
+class PriceWarehouse:
+    """
+    Close prices of every ticker on every ingested date, in one float64 matrix.
+
+    Rows are dates (in the order they were added) and columns are symbol ids
+    ("<symbol>.NS" / ".BO"), NaN where a ticker has no price. The matrix is a
+    raw row-major file opened with np.memmap, so appending a date appends one
+    row and reading a slice only touches the pages it needs. Symbols get the
+    next free column; the file reserves spare columns and is rewritten at
+    twice the width when they run out.
+
+    A JSON file next to the matrix holds the date and symbol dictionaries. It
+    is replaced atomically after the rows are written, so rows past the last
+    recorded date (from an interrupted update) are ignored. It also lists the
+    closed dates: dates for which both exchanges still answered 404
+    CLOSED_AFTER_DAYS after the fact, which later updates do not request
+    again. Dates missing for any other reason (network errors, throttling,
+    one exchange failing) are requested again by the next update.
+    """
+
+    def __init__(self, directory: str = WAREHOUSE_DIR):
+        """
+        Args:
+            directory: Where the matrix and its metadata live
+        """
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, MATRIX_FILE)
+        self.meta_path = os.path.join(directory, META_FILE)
+        self._lock = threading.RLock()
+        self.width = MIN_WIDTH
+        self.dates: List[str] = []
+        self.symbols: List[str] = []
+        self.closed_dates = set()
+        self._date_rows: Dict[str, int] = {}
+        self._symbol_ids: Dict[str, int] = {}
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            width, dates, symbols = meta["width"], meta["dates"], meta["symbols"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Starting a new price warehouse, {self.meta_path} is unreadable: {e}")
+            return
+        matrix_size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        if matrix_size < len(dates) * width * 8:
+            logger.warning(f"Starting a new price warehouse, {self.matrix_path} is truncated")
+            return
+
+        self.width = width
+        self.dates = dates
+        self.symbols = symbols
+        self.closed_dates = set(meta.get("closed_dates", []))
+        self._date_rows = {date_str: row for row, date_str in enumerate(dates)}
+        self._symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+    def _save_meta(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "width": self.width,
+                "dates": self.dates,
+                "symbols": self.symbols,
+                "closed_dates": sorted(self.closed_dates),
+            }, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _close_matrix(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = None
+
+    def _open_matrix(self) -> Optional[np.memmap]:
+        """Memory map of the recorded rows (None while the warehouse is empty)"""
+        if self._matrix is None and self.dates:
+            self._matrix = np.memmap(
+                self.matrix_path, dtype=np.float64, mode="r+", shape=(len(self.dates), self.width)
+            )
+        return self._matrix
+
+    def __contains__(self, date_str) -> bool:
+        return date_str in self._date_rows
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _symbol_columns(self, symbols) -> np.ndarray:
+        """Column of every symbol, assigning new ids (and widening the file) as needed"""
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._symbol_ids]
+        if new:
+            for symbol in new:
+                self._symbol_ids[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            if len(self.symbols) > self.width:
+                width = self.width
+                while width < len(self.symbols):
+                    width *= 2
+                self._widen(width)
+        return np.fromiter((self._symbol_ids[symbol] for symbol in symbols), dtype=np.int64, count=len(symbols))
+
+    def _widen(self, width: int):
+        """Rewrite the matrix with `width` columns"""
+        logger.info(f"Widening the price warehouse from {self.width} to {width} symbols")
+        old = self._open_matrix()
+        tmp_path = self.matrix_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            row = np.full(width, np.nan)
+            for i in range(len(self.dates)):
+                row[:self.width] = old[i]
+                f.write(row.tobytes())
+        # No view may keep the file mapped while it is replaced (Windows)
+        del old
+        self._close_matrix()
+        os.replace(tmp_path, self.matrix_path)
+        self.width = width
+        # The recorded width must match the file from here on
+        self._save_meta()
+
+    def add(self, date_str: str, close_prices: pd.Series):
+        """
+        Store the close prices of one date, replacing that date's row if present.
+
+        Args:
+            date_str: Date in 'YYYY-MM-DD' format
+            close_prices: Close price by ticker, as combine_close_prices returns
+        """
+        # Rows without a symbol (NaN label) can never be looked up
+        close_prices = close_prices[[isinstance(symbol, str) for symbol in close_prices.index]]
+        with self._lock:
+            columns = self._symbol_columns(list(close_prices.index))
+            row = np.full(self.width, np.nan)
+            row[columns] = pd.to_numeric(close_prices, errors="coerce").to_numpy(dtype=float)
+
+            if date_str in self._date_rows:
+                self._open_matrix()[self._date_rows[date_str]] = row
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            self._close_matrix()
+            with open(self.matrix_path, "r+b" if os.path.exists(self.matrix_path) else "wb") as f:
+                # Drop rows of an interrupted update before appending
+                f.truncate(len(self.dates) * self.width * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(row.tobytes())
+            self._date_rows[date_str] = len(self.dates)
+            self.dates.append(date_str)
+
+    def flush(self):
+        """Record the added dates and symbols on disk"""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._save_meta()
+
+    def update(self, dates: Iterable, retry_closed: bool = False) -> int:
+        """
+        Fetch and store the dates not in the warehouse yet.
+
+        Bhavcopies go through the download/parse pipeline of
+        iter_bhavcopy_days (and its cache); dates without both bhavcopies are
+        not stored.
+
+        Args:
+            dates: Datetimes to cover
+            retry_closed: Also request dates recorded as closed
+
+        Returns:
+            Number of dates added
+        """
+        from Utils.down_close_price_data import combine_close_prices, iter_bhavcopy_days
+
+        missing = [
+            d for d in dates
+            if d.strftime("%Y-%m-%d") not in self
+            and (retry_closed or d.strftime("%Y-%m-%d") not in self.closed_dates)
+        ]
+        if not missing:
+            return 0
+        logger.info(f"Adding {len(missing)} dates to the price warehouse")
+
+        settled = (datetime.now() - timedelta(days=CLOSED_AFTER_DAYS)).strftime("%Y-%m-%d")
+        added = closed = 0
+        combine = lambda nse_data, bse_data, date_input: combine_close_prices(nse_data, bse_data)
+        try:
+            for date_str, close_prices, not_found in iter_bhavcopy_days(missing, combine):
+                if close_prices is None:
+                    if not_found and date_str <= settled:
+                        self.closed_dates.add(date_str)
+                        closed += 1
+                    continue
+                self.closed_dates.discard(date_str)
+                self.add(date_str, close_prices)
+                added += 1
+                if added % FLUSH_EVERY == 0:
+                    self.flush()
+        finally:
+            if added or closed:
+                self.flush()
+        return added
+
+    def price_df(self, tickers: List[str], dates: Iterable, symbols_dict) -> pd.DataFrame:
+        """
+        Tickers x dates close price table, as PriceDataManager uses it.
+
+        Each date looks up the symbols symbols_dict lists for it (so renamed
+        tickers read their symbol of that date), and missing prices are filled
+        through the ISIN index (_fill_renamed). Dates not in the warehouse are
+        left out.
+
+        Args:
+            tickers: Row order of the result
+            dates: Datetimes to include, in column order
+            symbols_dict: 'YYYY-MM-DD' -> symbols, positionally matching tickers
+
+        Returns:
+            DataFrame with a 'ticker' column and one column per stored date
+        """
+        with self._lock:
+            matrix = self._open_matrix()
+
+            rows, columns, keys_of, days, filtered_dates = [], [], [], [], []
+            columns_of = {}   # id(symbol list) -> (list, its columns); symbols_dict shares lists across dates
+            for date_input in dates:
+                date_str = date_input.strftime("%Y-%m-%d")
+                row = self._date_rows.get(date_str)
+                if row is None:
+                    continue
+                keys = symbols_dict[date_str]
+                cached = columns_of.get(id(keys))
+                if cached is None or cached[0] is not keys:
+                    cached = (keys, np.array([self._symbol_ids.get(symbol, -1) for symbol in keys], dtype=np.int64))
+                    columns_of[id(keys)] = cached
+                rows.append(row)
+                columns.append(cached[1])
+                keys_of.append(keys)
+                days.append(date_input.date())
+                filtered_dates.append(date_str)
+
+            if rows:
+                rows = np.array(rows, dtype=np.int64)
+                columns = np.vstack(columns)
+                # One gather for the whole table; unknown symbols read column 0 and are blanked
+                prices = matrix[rows[:, None], np.maximum(columns, 0)]
+                prices[columns < 0] = np.nan
+                self._fill_renamed(prices, matrix, rows, keys_of, days)
+            else:
+                prices = np.empty((0, len(tickers)))
+
+        price_df = pd.DataFrame(prices, index=filtered_dates, columns=tickers)
+        # Reset the index to make dates a column
+        return price_df.T.reset_index().rename(columns={"index": "ticker"})
+
+    def _fill_renamed(self, prices: np.ndarray, matrix, rows: np.ndarray, keys_of: List, days: List):
+        """
+        Fill NaN prices with the price of the symbol the ticker's ISIN traded under that day.
+
+        The missing (date, ticker) cells are grouped by symbol, so each symbol
+        resolves its ISIN intervals once, and the fills are read from the
+        matrix in one gather.
+
+        Args:
+            prices: Dates x tickers prices, filled in place
+            matrix: Open warehouse matrix
+            rows: Warehouse row of each date
+            keys_of: Symbols of each date, positionally matching the tickers
+            days: Date of each row
+        """
+        missing_at, missing_col = np.nonzero(np.isnan(prices))
+        if not len(missing_at):
+            return
+
+        by_symbol = {}
+        for i, j in zip(missing_at.tolist(), missing_col.tolist()):
+            by_symbol.setdefault(keys_of[i][j], []).append((i, j))
+
+        from Utils.isin_index import get_isin_index
+        try:
+            isin_index = get_isin_index()
+        except (OSError, ValueError) as e:
+            # Loading the index reads and saves files under ./bhavcopies
+            logger.warning(f"ISIN index unavailable, renamed tickers left unfilled: {e}")
+            return
+
+        cells, sources = [], []
+        for symbol, symbol_cells in by_symbol.items():
+            resolved = isin_index.resolve_ticker_dates(symbol, [days[i] for i, _ in symbol_cells])
+            for (i, j), ticker in zip(symbol_cells, resolved):
+                column = self._symbol_ids.get(ticker) if ticker != symbol else None
+                if column is not None:
+                    cells.append((i, j))
+                    sources.append((rows[i], column))
+        if cells:
+            cells, sources = np.array(cells), np.array(sources)
+            prices[cells[:, 0], cells[:, 1]] = matrix[sources[:, 0], sources[:, 1]]
+
+
+_warehouse: Optional[PriceWarehouse] = None
+_warehouse_lock = threading.Lock()
+
+
+def get_price_warehouse() -> PriceWarehouse:
+    """Shared warehouse next to the bhavcopies"""
+    global _warehouse
+    with _warehouse_lock:
+        if _warehouse is None:
+            _warehouse = PriceWarehouse()
+    return _warehouse
@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 
 def init_dict(file_path="./Excels/sales_purchase_data.xlsx", broker_names=[]): 
@@ -68,3 +69,97 @@ def save_sales_purchase_dict(sales_purchase_dict, filename='./Excels/sales_purch
                 combined_df.to_excel(writer, sheet_name=sheet_name, index=False)
         
         print(f"File '{filename}' updated with new data without duplicating overlapping days.")
+
+
+SALES_PURCHASE_COLUMNS = ['Date', 'Value', 'Purchase', 'Sales', 'Net Fund', 'Units', 'NAV']
+
+
+class SalesPurchaseBuffer:
+    """
+    Columnar row accumulator for one broker's sales/purchase sheet.
+
+    Rows are written into preallocated arrays that grow in chunks, the last
+    row is available in O(1), and the DataFrame expected by
+    save_sales_purchase_dict is only built once by to_frame().
+    """
+
+    def __init__(self, seed_df=None, chunk_size=256):
+        """
+        Args:
+            seed_df: Rows already present (e.g. the last row loaded by init_dict)
+            chunk_size: Number of rows added to the buffers each time they fill up
+        """
+        if seed_df is None:
+            seed_df = pd.DataFrame(columns=SALES_PURCHASE_COLUMNS)
+        self._seed = seed_df
+        self._chunk_size = chunk_size
+        self._dates = np.empty(chunk_size, dtype=object)
+        self._numbers = np.empty((chunk_size, len(SALES_PURCHASE_COLUMNS) - 1), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self):
+        return len(self._seed) + self._size
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._dates)
+        if needed <= capacity:
+            return
+        new_capacity = max(2 * capacity, needed)
+        new_capacity = -(-new_capacity // self._chunk_size) * self._chunk_size
+
+        dates = np.empty(new_capacity, dtype=object)
+        dates[:self._size] = self._dates[:self._size]
+        numbers = np.empty((new_capacity, self._numbers.shape[1]), dtype=np.float64)
+        numbers[:self._size] = self._numbers[:self._size]
+        self._dates, self._numbers = dates, numbers
+
+    def append(self, row):
+        """Append one row given as a dict keyed by SALES_PURCHASE_COLUMNS"""
+        self._reserve(1)
+        self._dates[self._size] = row['Date']
+        self._numbers[self._size] = [row[col] for col in SALES_PURCHASE_COLUMNS[1:]]
+        self._size += 1
+
+    def extend(self, block):
+        """
+        Append several rows at once.
+
+        Args:
+            block: Dict keyed by SALES_PURCHASE_COLUMNS; 'Date' holds the new
+                rows' dates, the other columns arrays of the same length or
+                scalars repeated on every row
+        """
+        count = len(block['Date'])
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        self._dates[rows] = list(block['Date'])
+        for i, col in enumerate(SALES_PURCHASE_COLUMNS[1:]):
+            self._numbers[rows, i] = block[col]
+        self._size += count
+
+    def last_row(self):
+        """Most recent row as a dict, or None when there are no rows"""
+        if self._size:
+            last = self._size - 1
+            row = {'Date': self._dates[last]}
+            row.update(zip(SALES_PURCHASE_COLUMNS[1:], self._numbers[last]))
+            return row
+        if not self._seed.empty:
+            return self._seed.iloc[-1].to_dict()
+        return None
+
+    def to_frame(self):
+        """Seed rows followed by the buffered rows as a DataFrame"""
+        if not self._size:
+            return self._seed
+
+        buffered = pd.DataFrame(self._numbers[:self._size], columns=SALES_PURCHASE_COLUMNS[1:])
+        buffered.insert(0, 'Date', self._dates[:self._size])
+        if self._seed.empty:
+            return buffered
+        return pd.concat([self._seed, buffered], ignore_index=True)
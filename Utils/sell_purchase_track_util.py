@@ -12,18 +12,65 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+SELL_PURCHASE_TRACK_COLUMNS = [
+    'Purchase Date',
+    'Sell Date',
+    'Broker',
+    'File',
+    'Stock Symbol',
+    'Purchase Price',
+    'Sell Price',
+    'Quantity'
+]
+
+
 def check_and_create_sell_purchase_track_df():
     """Create initialized sell_purchase_track DataFrame"""
-    return pd.DataFrame(columns=[
-        'Purchase Date',
-        'Sell Date', 
-        'Broker',
-        'File',
-        'Stock Symbol',
-        'Purchase Price',
-        'Sell Price',
-        'Quantity'
-    ])
+    return pd.DataFrame(columns=SELL_PURCHASE_TRACK_COLUMNS)
+
+
+class TransactionRecorder:
+    """
+    Buffered sell/purchase transaction log.
+
+    Records are appended to per-column lists and the DataFrame is built once
+    by to_frame() (e.g. for save_sell_purchase_track_df), instead of
+    concatenating a one-row frame onto the whole log for every transaction.
+    """
+
+    def __init__(self, sell_purchase_track_df=None):
+        """
+        Args:
+            sell_purchase_track_df: Existing log (e.g. from init_sell_purchase_track_df)
+        """
+        if sell_purchase_track_df is None:
+            sell_purchase_track_df = check_and_create_sell_purchase_track_df()
+        self._seed = sell_purchase_track_df
+        self._rows = {col: [] for col in SELL_PURCHASE_TRACK_COLUMNS}
+
+    def __len__(self):
+        return len(self._seed) + len(self._rows['Quantity'])
+
+    def _append(self, row):
+        for col, value in zip(SELL_PURCHASE_TRACK_COLUMNS, row):
+            self._rows[col].append(value)
+
+    def record_purchase(self, purchase_date, broker, file, stock_symbol, purchase_price, quantity):
+        """Record a purchase transaction (see enter_purchase_track)"""
+        self._append([purchase_date, None, broker, file, stock_symbol, purchase_price, None, quantity])
+
+    def record_sell(self, purchase_date, sell_date, broker, file, stock_symbol, sell_price, quantity):
+        """Record a sell transaction (see enter_sell_track)"""
+        self._append([purchase_date, sell_date, broker, file, stock_symbol, None, sell_price, quantity])
+
+    def to_frame(self):
+        """Existing log followed by the recorded transactions"""
+        if not self._rows['Quantity']:
+            return self._seed
+        new_rows = pd.DataFrame(self._rows, columns=SELL_PURCHASE_TRACK_COLUMNS)
+        if self._seed.empty:
+            return new_rows
+        return pd.concat([self._seed, new_rows], ignore_index=True)
 
 
 def init_sell_purchase_track_df(filename="Excels/sell_purchase_track.csv"):
@@ -47,7 +94,8 @@ def enter_purchase_track(
     Record a purchase transaction
     
     Args:
-        sell_purchase_track_df: sell_purchase_track dataframe
+        sell_purchase_track_df: sell_purchase_track dataframe, or a TransactionRecorder
+            to record into
         purchase_date: Date of purchase
         broker: Broker name
         file: File reference
@@ -56,27 +104,17 @@ def enter_purchase_track(
         quantity: Number of shares
         
     Returns:
-        Updated dataframe
+        Updated dataframe (or the same recorder)
     """
-    # Initialize if None
-    if sell_purchase_track_df is None:
-        sell_purchase_track_df = check_and_create_sell_purchase_track_df()
-    
-    # Create new purchase row
-    new_row = pd.DataFrame({
-        'Purchase Date': [purchase_date],
-        'Sell Date': [None],
-        'Broker': [broker],
-        'File': [file],
-        'Stock Symbol': [stock_symbol],
-        'Purchase Price': [purchase_price],
-        'Sell Price': [None],
-        'Quantity': [quantity]
-    })
-    
-    sell_purchase_track_df = pd.concat([sell_purchase_track_df, new_row], ignore_index=True)
-    
-    return sell_purchase_track_df
+    if isinstance(sell_purchase_track_df, TransactionRecorder):
+        sell_purchase_track_df.record_purchase(
+            purchase_date, broker, file, stock_symbol, purchase_price, quantity
+        )
+        return sell_purchase_track_df
+
+    recorder = TransactionRecorder(sell_purchase_track_df)
+    recorder.record_purchase(purchase_date, broker, file, stock_symbol, purchase_price, quantity)
+    return recorder.to_frame()
 
 
 def enter_sell_track(
@@ -93,7 +131,8 @@ def enter_sell_track(
     Record a sell transaction
     
     Args:
-        sell_purchase_track_df: sell_purchase_track dataframe
+        sell_purchase_track_df: sell_purchase_track dataframe, or a TransactionRecorder
+            to record into
         purchase_date: Original purchase date
         sell_date: Date of sale
         broker: Broker name
@@ -103,32 +142,26 @@ def enter_sell_track(
         quantity: Number of shares sold
         
     Returns:
-        Updated dataframe
+        Updated dataframe (or the same recorder)
     """
-    # Initialize if None
-    if sell_purchase_track_df is None:
-        sell_purchase_track_df = check_and_create_sell_purchase_track_df()
-    
-    # Create new sell row
-    new_row = pd.DataFrame({
-        'Purchase Date': [purchase_date],
-        'Sell Date': [sell_date],
-        'Broker': [broker],
-        'File': [file],
-        'Stock Symbol': [stock_symbol],
-        'Purchase Price': [None],
-        'Sell Price': [sell_price],
-        'Quantity': [quantity]
-    })
-    
-    sell_purchase_track_df = pd.concat([sell_purchase_track_df, new_row], ignore_index=True)
-    
-    return sell_purchase_track_df
+    if isinstance(sell_purchase_track_df, TransactionRecorder):
+        sell_purchase_track_df.record_sell(
+            purchase_date, sell_date, broker, file, stock_symbol, sell_price, quantity
+        )
+        return sell_purchase_track_df
+
+    recorder = TransactionRecorder(sell_purchase_track_df)
+    recorder.record_sell(purchase_date, sell_date, broker, file, stock_symbol, sell_price, quantity)
+    return recorder.to_frame()
 
 
 def save_sell_purchase_track_df(sell_purchase_track_df, filename="Excels/sell_purchase_track.csv"):
-    """Save sell_purchase_track dataframe to CSV"""
+    """Save sell_purchase_track dataframe (or TransactionRecorder) to CSV"""
     try:
+        if isinstance(sell_purchase_track_df, TransactionRecorder):
+            sell_purchase_track_df = sell_purchase_track_df.to_frame()
+
+
         # Sort by Purchase Date, then Sell Date
         sell_purchase_track_df = sell_purchase_track_df.sort_values(
             by=["Purchase Date", "Sell Date"],
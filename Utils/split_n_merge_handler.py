@@ -1,10 +1,27 @@
 import re
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 file_initial = "CF-CA"
 
-import re
+# Face value patterns, tried in order by extract_face_values
+_FROM_TO_PATTERN = re.compile(
+    r"(?:from|frm)\s+[^0-9]*([0-9]+)[^0-9]+to\s+[^0-9]*([0-9]+)",
+    flags=re.IGNORECASE
+)
+_RS_TO_RS_PATTERN = re.compile(
+    r"rs?\s*\.?\s*([0-9]+)[^0-9]+to\s+rs?|re\s*\.?\s*([0-9]+)",
+    flags=re.IGNORECASE
+)
+_RS_RE_PATTERN = re.compile(
+    r"(?:rs|re)\s*([0-9]+)\s*.*?\s*to\s*(?:rs|re)\s*([0-9]+)",
+    flags=re.IGNORECASE
+)
+_CLEAN_TABLE = str.maketrans({"/": "", "-": " ", ".": " "})
 
 
 def get_latest_CFCA_file( directory: Optional[str] = None) -> Optional[str]:
@@ -36,6 +53,28 @@ def get_latest_CFCA_file( directory: Optional[str] = None) -> Optional[str]:
     return latest_file
 
 
+def get_CFCA_files(directory: Optional[str] = None) -> List[str]:
+    """
+    All files in a directory that start with the CFCA prefix.
+
+    Args:
+        directory (str, optional): Directory path. Defaults to current directory.
+
+    Returns:
+        list: Paths ordered by modification time, oldest first.
+    """
+    if directory is None:
+        directory = os.getcwd()
+
+    matching_files = [
+        os.path.join(directory, f)
+        for f in os.listdir(directory)
+        if f.startswith(file_initial) and os.path.isfile(os.path.join(directory, f))
+    ]
+    return sorted(matching_files, key=os.path.getmtime)
+
+
+@lru_cache(maxsize=4096)
 def is_face_value_action(purpose: str) -> bool:
     """
     Returns True if the PURPOSE text indicates a face value
@@ -54,6 +93,7 @@ def is_face_value_action(purpose: str) -> bool:
     return False
 
 
+@lru_cache(maxsize=4096)
 def extract_face_values(text: str):
     """
     Extracts the two face values (before and after) from corporate action text.
@@ -64,44 +104,54 @@ def extract_face_values(text: str):
       - "Fv Splt Frm Rs 10 To Re 1" -> (10, 1)
       - "Fv Splt Frm Rs 10 To Rs 2" -> (10, 2)
       - "Fv Split Rs.10/- To Rs.2/" -> (10, 2)
+
+    Results are memoized per distinct text, CFCA exports repeat the same wording a lot.
     """
-    # Normalize
-    clean_text = text.replace("/-", "").replace("/", "").replace("-", " ")
-    clean_text = clean_text.replace(".", " ")
+    # Normalize ("/-" and "/" are dropped, "-" and "." become spaces)
+    clean_text = text.replace("/-", "").translate(_CLEAN_TABLE)
     
     # Pattern 1: with "From ... To ..."
-    match = re.search(
-        r"(?:from|frm)\s+[^0-9]*([0-9]+)[^0-9]+to\s+[^0-9]*([0-9]+)",
-        clean_text,
-        flags=re.IGNORECASE
-    )
+    match = _FROM_TO_PATTERN.search(clean_text)
     if match:
         return int(match.group(1)), int(match.group(2))
     
     # Pattern 2: direct "Rs 10 ... To Rs 2"
-    match = re.search(
-        r"rs?\s*\.?\s*([0-9]+)[^0-9]+to\s+rs?|re\s*\.?\s*([0-9]+)",
-        clean_text,
-        flags=re.IGNORECASE
-    )
+    match = _RS_TO_RS_PATTERN.search(clean_text)
     if match:
         nums = [g for g in match.groups() if g]  # filter None
         if len(nums) == 2:
             return int(nums[0]), int(nums[1])
     
-    match = re.search(
-        r"(?:rs|re)\s*([0-9]+)\s*.*?\s*to\s*(?:rs|re)\s*([0-9]+)",
-        clean_text,
-        flags=re.IGNORECASE
-    )
+    match = _RS_RE_PATTERN.search(clean_text)
     if match:
         return int(match.group(1)), int(match.group(2))
     
     return None, None
 
 
+def extract_face_value_columns(purposes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Column-wise is_face_value_action + extract_face_values.
 
+    Each distinct PURPOSE text is parsed once and the results are scattered
+    back to every row.
 
+    Args:
+        purposes: PURPOSE column (any sequence of strings)
 
-
-
+    Returns:
+        from_values, to_values: float arrays, NaN where the row is not a face
+        value action or no values could be extracted
+    """
+    codes, uniques = pd.factorize(pd.Series(purposes, dtype=object))
+    parsed = np.array([
+        extract_face_values(purpose) if is_face_value_action(purpose) else (None, None)
+        for purpose in uniques
+    ], dtype=float).reshape(-1, 2)
+
+    from_values = np.full(len(codes), np.nan)
+    to_values = np.full(len(codes), np.nan)
+    has_text = codes >= 0
+    from_values[has_text] = parsed[codes[has_text], 0]
+    to_values[has_text] = parsed[codes[has_text], 1]
+    return from_values, to_values
@@ -1,64 +1,203 @@
+import os
+import logging
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
-file_path = 'Excels\symbolchange.csv'
-df = pd.read_csv(file_path, encoding="latin1", header=None)
-df.columns = ["name", "old_symbol", "new_symbol", "date"]
-df = df[df["old_symbol"] != df["new_symbol"]]
+logger = logging.getLogger(__name__)
 
-def map_symbols(symbol_list, start_date, end_date):
+file_path = os.path.join('Excels', 'symbolchange.csv')
+
+
+class SymbolChangeRegistry:
     """
-    Maps symbols based on a given date range and a dataframe of symbol changes.
+    Lazily loaded view of symbolchange.csv.
 
-    Args:
-        symbol_list (list): List of stock symbols to process.
-        df (pd.DataFrame): DataFrame containing columns ["name", "old_symbol", "new_symbol", "date"].
-        start_date (str): Start date of the range (format: 'YYYY-MM-DD').
-        end_date (str): End date of the range (format: 'YYYY-MM-DD').
+    The file is only read on first use and re-read when its mtime changes.
+    Each load parses the dates once, groups the changes by effective date and
+    resolves old -> new chains transitively, so later lookups are dict hits.
+    """
 
-    Returns:
-        dict: A dictionary where the key is the date and the value is the updated symbol list for that date.
+    def __init__(self, path: str = file_path):
+        """
+        Args:
+            path: Symbol change CSV (name, old symbol, new symbol, date; no header)
+        """
+        self.path = path
+        self._mtime = None
+        self._changes_by_date: List[Tuple[date, List[Tuple[str, str]]]] = []
+        self._latest: Dict[str, str] = {}
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+
+        logger.info("Loading symbol changes from %s", self.path)
+        df = pd.read_csv(self.path, encoding="latin1", header=None)
+        df.columns = ["name", "old_symbol", "new_symbol", "date"]
+        df = df[df["old_symbol"] != df["new_symbol"]].copy()
+        df["date"] = pd.to_datetime(df["date"])
+
+        # Changes only take effect on whole days, in file order within a day
+        df = df[df["date"] == df["date"].dt.normalize()]
+        self._changes_by_date = [
+            (change_date.date(), list(zip(day_changes["old_symbol"], day_changes["new_symbol"])))
+            for change_date, day_changes in df.groupby("date", sort=True)
+        ]
+
+        # Follow every symbol through all of its later renames. A reused symbol
+        # follows the last company that traded under it.
+        holder: Dict[str, int] = {}          # symbol -> company trading under it
+        last_company: Dict[str, int] = {}    # symbol -> last company seen with it
+        current: List[str] = []              # company -> its current symbol
+        for _, day_changes in self._changes_by_date:
+            for old_symbol, new_symbol in day_changes:
+                company = holder.pop(old_symbol, None)
+                if company is None:
+                    company = len(current)
+                    current.append(old_symbol)
+                holder[new_symbol] = company
+                current[company] = new_symbol
+                last_company[old_symbol] = company
+                last_company[new_symbol] = company
+        latest = {
+            symbol: current[company]
+            for symbol, company in last_company.items()
+            if current[company] != symbol
+        }
+        self._latest = latest
+        self._mtime = mtime
+
+    def changes_after(self, start_date: date) -> List[Tuple[date, List[Tuple[str, str]]]]:
+        """(date, [(old, new), ...]) for changes dated after start_date, oldest first"""
+        self._refresh()
+        return [(d, changes) for d, changes in self._changes_by_date if d > start_date]
+
+    def latest_symbol(self, symbol: str) -> str:
+        """Current symbol of a (possibly renamed several times) symbol; a dict hit"""
+        self._refresh()
+        return self._latest.get(symbol, symbol)
+
+
+_registry: Optional[SymbolChangeRegistry] = None
+
+
+def get_symbol_change_registry() -> SymbolChangeRegistry:
+    """Shared registry for the default symbolchange.csv"""
+    global _registry
+    if _registry is None:
+        _registry = SymbolChangeRegistry()
+    return _registry
+
+
+class SymbolMap:
+    """
+    Symbols to fetch for every date of a range, stored by change point.
+
+    The range is split into segments between symbol changes. Each segment holds
+    one symbol list and every date maps to its segment through a day-offset
+    array, so `symbol_map[date_str]` is O(1) and memory grows with the number
+    of changes instead of days x tickers.
+
+    `intervals` holds the same data per ticker: ticker -> list of
+    (valid_from, valid_to, symbol), oldest first, with both ends inclusive.
     """
-    # Convert start_date and end_date to datetime objects
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
-    # Ensure the date column in df is in datetime format
-    df["date"] = pd.to_datetime(df["date"])
+    def __init__(self, symbol_list: List[str], start_date: date, end_date: date,
+                 segments: List[Tuple[date, date, List[str]]]):
+        """
+        Args:
+            symbol_list: Tickers as passed to map_symbols (order of every symbol list)
+            start_date: First date of the range
+            end_date: Last date of the range
+            segments: (valid_from, valid_to, symbols) covering the range, oldest first
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self._segments = [symbols for _, _, symbols in segments]
+
+        self._day_segment = np.empty(max((end_date - start_date).days + 1, 0), dtype=np.int32)
+        for i, (valid_from, valid_to, _) in enumerate(segments):
+            self._day_segment[(valid_from - start_date).days:(valid_to - start_date).days + 1] = i
+
+        self.intervals: Dict[str, List[Tuple[date, date, str]]] = {}
+        for k, ticker in enumerate(symbol_list):
+            ticker_intervals = []
+            for valid_from, valid_to, symbols in segments:
+                if ticker_intervals and ticker_intervals[-1][2] == symbols[k]:
+                    ticker_intervals[-1] = (ticker_intervals[-1][0], valid_to, symbols[k])
+                else:
+                    ticker_intervals.append((valid_from, valid_to, symbols[k]))
+            self.intervals[ticker] = ticker_intervals
 
-    # Determine the maximum date in the dataframe
-    max_date_in_df = df["date"].max()
+    def _offset(self, date_str: str) -> int:
+        offset = (date.fromisoformat(date_str) - self.start_date).days
+        if offset < 0 or offset >= len(self._day_segment):
+            raise KeyError(date_str)
+        return offset
 
-    # Determine the starting date for the loop
-    loop_start_date = max(max_date_in_df, end_date)
+    def __getitem__(self, date_str: str) -> List[str]:
+        """Symbols for a 'YYYY-MM-DD' date, in symbol_list order (shared list, do not modify)"""
+        return self._segments[self._day_segment[self._offset(date_str)]]
 
-    # Initialize the result dictionary
-    date_to_symbols = {}
+    def __contains__(self, date_str) -> bool:
+        try:
+            self._offset(date_str)
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
 
-    # Create a copy of the symbol list to modify
-    updated_symbols = symbol_list[:]
+    def __len__(self) -> int:
+        return len(self._day_segment)
 
-    # Iterate from loop_start_date to start_date in reverse
-    current_date = loop_start_date
-    while current_date >= start_date:
-        # Filter the DataFrame for changes effective on the current_date
-        daily_changes = df[df["date"] == current_date]
+    def keys(self) -> List[str]:
+        return [(self.start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(len(self))]
 
 
-        # Add the updated symbols to the result dictionary if the current_date is within the range
-        if start_date <= current_date <= end_date:
-            date_to_symbols[current_date.strftime("%Y-%m-%d")] = updated_symbols[:]
-            
-        # Apply changes from the daily_changes DataFrame
-        for _, row in daily_changes.iterrows():
-            updated_symbols = [
-                row["old_symbol"]+'.NS' if symbol == (row["new_symbol"]+'.NS') else symbol
-                for symbol in updated_symbols
-            ]
+def _undo_changes(symbols: List[str], changes: List[Tuple[str, str]]) -> List[str]:
+    """Replace new symbols by old ones (NSE tickers only), one change after another"""
+    for old_symbol, new_symbol in changes:
+        symbols = [
+            old_symbol + '.NS' if symbol == (new_symbol + '.NS') else symbol
+            for symbol in symbols
+        ]
+    return symbols
+
+
+def map_symbols(symbol_list, start_date, end_date):
+    """
+    Maps symbols based on a given date range and a dataframe of symbol changes.
+
+    A change dated D applies from D onwards; before D the old symbol is used.
+
+    Args:
+        symbol_list (list): List of stock symbols to process.
+        start_date (str): Start date of the range (format: 'YYYY-MM-DD').
+        end_date (str): End date of the range (format: 'YYYY-MM-DD').
+
+    Returns:
+        SymbolMap: `symbol_map[date_str]` is the updated symbol list for that date.
+    """
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    if end_date < start_date:
+        return SymbolMap(symbol_list, start_date, end_date, [])
 
-        
+    # Changes on or before start_date never reach a date in the range
+    changes = get_symbol_change_registry().changes_after(start_date)
 
-        # Move to the previous day
-        current_date -= timedelta(days=1)
+    # Walk the change points from the latest one back to start_date
+    segments = []
+    symbols = symbol_list[:]
+    valid_to = end_date
+    for change_date, day_changes in reversed(changes):
+        if change_date <= end_date:
+            segments.append((change_date, valid_to, symbols))
+            valid_to = change_date - timedelta(days=1)
+        symbols = _undo_changes(symbols, day_changes)
+    segments.append((start_date, valid_to, symbols))
 
-    return date_to_symbols
+    return SymbolMap(symbol_list, start_date, end_date, segments[::-1])
@@ -22,6 +22,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Lot-days per matrix in one block of the vectorized engine (8 MB per float64 matrix)
+VECTOR_BLOCK_CELLS = 1 << 20
+
 
 @dataclass
 class AppConfig:
@@ -33,7 +36,8 @@ class AppConfig:
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     dates_included: List[Tuple[str, str]] = None  # List of (start_date, end_date) pairs
-    
+    engine: str = "vectorized"  # "vectorized" (array based) or "loop" (row by row)
+
     def __post_init__(self):
         if self.dates_included is None:
             self.dates_included = []
@@ -50,7 +54,8 @@ class AppConfig:
                         main_file_path=data.get("main_file_path", ""),
                         sales_purchase_file_path=data.get("sales_purchase_file_path", ""),
                         sheet_name=data.get("sheet_name", ""),
-                        dates_included=data.get("dates_included", [])
+                        dates_included=data.get("dates_included", []),
+                        engine=data.get("engine", "vectorized")
                     )
             except Exception as e:
                 logger.error(f"Failed to load config: {e}")
@@ -64,7 +69,8 @@ class AppConfig:
                     "main_file_path": self.main_file_path,
                     "sales_purchase_file_path": self.sales_purchase_file_path,
                     "sheet_name": self.sheet_name,
-                    "dates_included": self.dates_included
+                    "dates_included": self.dates_included,
+                    "engine": self.engine
                 }, f, indent=2)
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
@@ -157,7 +163,14 @@ class PriceDataManager:
         self.start_date = start_date
         self.end_date = end_date
         self.price_df = None
-        self._market_closed_cache = {}
+        
+        # Trading calendar over start_date..end_date (True = market open)
+        self.trading_days = None
+        
+        # Dense tickers x dates close price matrix with O(1) row/column lookup
+        self.price_matrix = None
+        self._ticker_rows: Dict[str, int] = {}
+        self._date_cols: Dict[str, int] = {}
     
     def prepare_ticker_mapping(self, df: pd.DataFrame) -> Tuple[List[str], pd.DataFrame]:
         """Prepare ticker symbols and mapping dataframe"""
@@ -177,9 +190,15 @@ class PriceDataManager:
         return list(set(unique_df['ticker'])), unique_df
     
     def fetch_prices(self, tickers: List[str]) -> pd.DataFrame:
-        """Fetch price data for given tickers"""
+        """
+        Fetch price data for given tickers.
+        
+        Dates missing from the price warehouse are downloaded and added to it
+        first; the tickers x dates table is then sliced from the warehouse.
+        """
         from Utils.symbol_change_handler import map_symbols
-        from Utils.down_close_price_data import create_stock_price_df
+        from Utils.down_close_price_data import bhavcopy_dates
+        from Utils.price_warehouse import get_price_warehouse
         
         logger.info(f"Fetching prices for {len(tickers)} tickers")
         
@@ -189,12 +208,10 @@ class PriceDataManager:
             end_date=str(self.end_date)
         )
         
-        self.price_df = create_stock_price_df(
-            start_date=str(self.start_date),
-            end_date=str(self.end_date),
-            keys=tickers,
-            symbols_dict=symbols_dict
-        )
+        dates = bhavcopy_dates(str(self.start_date), str(self.end_date))
+        warehouse = get_price_warehouse()
+        warehouse.update(dates)
+        self.set_price_df(warehouse.price_df(tickers, dates, symbols_dict))
         
         # Cache to disk
         self.price_df.to_csv("close_prices_dataframe.csv", index=False)
@@ -202,10 +219,49 @@ class PriceDataManager:
         
         return self.price_df
     
+    def set_price_df(self, price_df: pd.DataFrame):
+        """Use the given price dataframe (ticker column + one column per date)"""
+        self.price_df = price_df
+        
+        date_cols = [col for col in price_df.columns if col != 'ticker']
+        self.price_matrix = price_df[date_cols].apply(
+            pd.to_numeric, errors='coerce'
+        ).to_numpy(dtype=float)
+        
+        # First row wins for duplicated tickers, as with a boolean-mask lookup
+        self._ticker_rows = {}
+        for row, ticker in enumerate(price_df['ticker']):
+            self._ticker_rows.setdefault(ticker, row)
+        self._date_cols = {date_str: col for col, date_str in enumerate(date_cols)}
+        
+        self.trading_days = self._build_trading_calendar(self.start_date, self.end_date)
+    
+    def _build_trading_calendar(self, start_date: date, end_date: date) -> np.ndarray:
+        """Boolean array over start_date..end_date, True where any price exists"""
+        total_days = (end_date - start_date).days + 1
+        cols = np.array([
+            self._date_cols.get((start_date + timedelta(days=i)).strftime("%Y-%m-%d"), -1)
+            for i in range(total_days)
+        ], dtype=np.int64)
+        
+        has_any_price = ~np.isnan(self.price_matrix).all(axis=0)
+        open_days = np.zeros(total_days, dtype=bool)
+        open_days[cols >= 0] = has_any_price[cols[cols >= 0]]
+        return open_days
+    
+    def market_open_mask(self, start_date: date, end_date: date) -> np.ndarray:
+        """Trading calendar for an arbitrary range (True = market open)"""
+        if self.price_matrix is None:
+            logger.warning("Price dataframe not initialized - but market_open_mask() invoked")
+            return np.ones((end_date - start_date).days + 1, dtype=bool)
+        
+        if start_date == self.start_date and end_date == self.end_date:
+            return self.trading_days
+        return self._build_trading_calendar(start_date, end_date)
+    
     def is_market_closed(self, date_str: str) -> bool:
         """
-        Check if market was closed on a given date by checking if the date column exists
-        and if any prices exist for that date.
+        Check if market was closed on a given date, i.e. no prices exist for that date.
         
         Args:
             date_str: Date in 'YYYY-MM-DD' format
@@ -213,53 +269,47 @@ class PriceDataManager:
         Returns:
             True if market was closed (no data for that date), False otherwise
         """
-        # Check cache first
-        if date_str in self._market_closed_cache:
-            return self._market_closed_cache[date_str]
-        
-        if self.price_df is None:
+        if self.price_matrix is None:
             logger.warning("Price dataframe not initialized - but is_market_closed() invoked")
             return False
         
-        try:
-            # Check if date column exists in the dataframe
-            if date_str not in self.price_df.columns:
-                self._market_closed_cache[date_str] = True
-                return True
-            
-            # Check if there are any non-null prices for this date
-            date_column = self.price_df[date_str]
-            has_any_price = date_column.notna().any()
-            
-            market_closed = not has_any_price
-            self._market_closed_cache[date_str] = market_closed
-            
-            if market_closed:
-                logger.debug(f"Market closed on {date_str}")
-            
-            return market_closed
-            
-        except Exception as e:
-            logger.warning(f"Error checking market status for {date_str}: {e}")
-            return False
+        day = date.fromisoformat(date_str)
+        if self.start_date <= day <= self.end_date:
+            return not self.trading_days[(day - self.start_date).days]
+        
+        col = self._date_cols.get(date_str)
+        return col is None or bool(np.isnan(self.price_matrix[:, col]).all())
         
     def get_price(self, symbol: str, date_str: str) -> Optional[float]:
         """Get closing price for a symbol on a specific date"""
-        if self.price_df is None:
+        if self.price_matrix is None:
             return None
         
-        try:
-            if symbol in self.price_df['ticker'].values:
-                if date_str in self.price_df.columns:
-                    price = self.price_df.loc[
-                        self.price_df['ticker'] == symbol, date_str
-                    ].values[0]
-                    
-                    return None if pd.isna(price) else float(price)
-        except Exception as e:
-            logger.warning(f"Error getting price for {symbol} on {date_str}: {e}")
+        row = self._ticker_rows.get(symbol)
+        col = self._date_cols.get(date_str)
+        if row is None or col is None:
+            return None
         
-        return None
+        price = self.price_matrix[row, col]
+        return None if np.isnan(price) else float(price)
+    
+    def get_prices(self, tickers: List[str], date_str: str) -> np.ndarray:
+        """Closing prices for many tickers on one date (NaN where unknown)"""
+        return self.get_price_matrix(tickers, [date_str])[:, 0]
+    
+    def get_price_matrix(self, tickers: List[str], date_strs: List[str]) -> np.ndarray:
+        """Closing prices for tickers (rows) on dates (columns), NaN where unknown"""
+        prices = np.full((len(tickers), len(date_strs)), np.nan)
+        if self.price_matrix is None:
+            return prices
+        
+        rows = np.array([self._ticker_rows.get(t, -1) for t in tickers], dtype=np.int64)
+        cols = np.array([self._date_cols.get(d, -1) for d in date_strs], dtype=np.int64)
+        known_rows, known_cols = rows >= 0, cols >= 0
+        prices[np.ix_(known_rows, known_cols)] = self.price_matrix[
+            np.ix_(rows[known_rows], cols[known_cols])
+        ]
+        return prices
 
 
 class PortfolioCalculator:
@@ -282,14 +332,14 @@ class PortfolioCalculator:
     
     def calculate_holding_value(
         self, 
-        row: pd.Series, 
+        quantity: float, 
         closing_price: float,
-        current_date: date
+        sale_day: int,
+        current_day: int
     ) -> Tuple[float, bool]:
-        """Calculate value for a single holding"""
-        market_value = closing_price * row['No. ']
-        is_sold = (pd.notna(row['S. Date']) and 
-                   row['S. Date'].date() == current_date)
+        """Calculate value for a single holding (days as ordinals)"""
+        market_value = closing_price * quantity
+        is_sold = sale_day == current_day
         
         return market_value, is_sold
     
@@ -345,147 +395,343 @@ class PortfolioProcessor:
         self.cfca_handler = cfca_handler
         self.calculator = PortfolioCalculator(brokers, cfca_handler)
         
+        # Columnar holdings, built once and shared by every run
+        from Utils.holdings_util import HoldingsTable
+        self.holdings = HoldingsTable.from_dataframe(df)
+        
         # Initialize data structures
         self.sales_purchase_dict = self._init_sales_purchase_dict()
-        self.drill_down_df = self._init_drill_down_df()
-        self.sell_purchase_track_df = self._init_sell_purchase_track_df()
+        self.drill_down_tracker = self._init_drill_down_tracker()
+        self.transaction_recorder = self._init_transaction_recorder()
     
-    def _init_sales_purchase_dict(self) -> Dict[str, pd.DataFrame]:
-        """Initialize sales/purchase tracking dictionary"""
-        from Utils.sales_purchase_util import init_dict
-        return init_dict(
+    def _init_sales_purchase_dict(self) -> Dict:
+        """Initialize sales/purchase tracking dictionary (one row buffer per broker)"""
+        from Utils.sales_purchase_util import init_dict, SalesPurchaseBuffer
+        sheets = init_dict(
             file_path=self.config.sales_purchase_file_path,
             broker_names=self.brokers
         )
+        return {broker: SalesPurchaseBuffer(df) for broker, df in sheets.items()}
     
-    def _init_sell_purchase_track_df(self) -> pd.DataFrame:
-        """Initialize sell-purchase track dataframe"""
-        from Utils.sell_purchase_track_util import init_sell_purchase_track_df
-        return init_sell_purchase_track_df()
+    def _init_transaction_recorder(self):
+        """Initialize sell-purchase transaction recorder from the saved track"""
+        from Utils.sell_purchase_track_util import init_sell_purchase_track_df, TransactionRecorder
+        return TransactionRecorder(init_sell_purchase_track_df())
     
-    def _init_drill_down_df(self) -> pd.DataFrame:
-        """Initialize drill-down dataframe"""
-        from Utils.drill_down_util import init_drill_down_df
-        return init_drill_down_df()
+    def _init_drill_down_tracker(self):
+        """Initialize drill-down accumulator from the saved track"""
+        from Utils.drill_down_util import init_drill_down_df, DrillDownTracker
+        return DrillDownTracker(init_drill_down_df())
     
     def process(self, progress_callback=None) -> bool:
         """Process portfolio data day by day"""
         try:
-            total_days = (self.config.end_date - self.config.start_date).days + 1
-            current_date = self.config.start_date
-            
-            # Work on a copy
-            temp_df = self.df.copy()
-            original_volume = temp_df['No. '].copy()
-            
+            # Work on a copy of the volumes
+            holdings = self.holdings.copy()
+
             # Reverse corporate actions to start state
-            temp_df = self.cfca_handler.reverse_actions(
-                df=temp_df, 
-                start_date=str(current_date)
+            self.cfca_handler.reverse_actions_on_holdings(
+                holdings,
+                start_date=str(self.config.start_date)
             )
-            
-            days_processed = 0
-            update_frequency = 5
-            
-            while current_date <= self.config.end_date:
+
+            if self.config.engine == "vectorized":
+                self._process_vectorized(holdings, progress_callback)
+            else:
+                self._process_loop(holdings, progress_callback)
+
+            # The sheet is saved with its original volumes
+            self._save_results(self.df)
+
+            # Add processed date range to config
+            self.config.add_date_range(self.config.start_date, self.config.end_date)
+            self.config.save()
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Processing failed: {e}", exc_info=True)
+            return False
+
+    def _process_loop(self, holdings, progress_callback=None):
+        """Reference engine: walk the held lots for every calendar day"""
+        from Utils.holdings_util import ActiveHoldingsIndex
+
+        total_days = (self.config.end_date - self.config.start_date).days + 1
+        current_date = self.config.start_date
+        days_processed = 0
+        update_frequency = 5
+
+        # Purchase/sale events only need sorting once for the whole run
+        active_index = ActiveHoldingsIndex(holdings.dop, holdings.sale_date)
+
+        for run_dates, market_open in self._calendar_runs():
+            if not market_open:
+                # Whole holiday stretch at once; volumes still follow corporate actions
+                for current_date in run_dates:
+                    self.cfca_handler.apply_tday_actions_on_holdings(
+                        holdings,
+                        current_date=current_date
+                    )
+                self._repeat_previous_day_data(run_dates)
+
+                days_processed += len(run_dates)
+                if progress_callback:
+                    progress_callback(days_processed, total_days)
+                continue
+
+            for current_date in run_dates:
                 # Apply corporate actions for current day
-                temp_df = self.cfca_handler.apply_tday_actions(
-                    temp_df, 
-                    current_date=str(current_date)
+                self.cfca_handler.apply_tday_actions_on_holdings(
+                    holdings,
+                    current_date=current_date
                 )
-                
+
                 # Process day
-                success = self._process_single_day(temp_df, current_date)
-                
+                success = self._process_single_day(holdings, current_date, active_index)
+
                 if not success:
                     logger.warning(f"Skipping day {current_date} due to missing data")
-                
+
                 # Update progress
                 days_processed += 1
-                if progress_callback and (days_processed % update_frequency == 0 or 
+                if progress_callback and (days_processed % update_frequency == 0 or
                                         current_date == self.config.end_date):
                     progress_callback(days_processed, total_days)
-                
-                current_date += timedelta(days=1)
-            
-            # Restore original volumes and save
-            temp_df["No. "] = original_volume
-            self._save_results(temp_df)
-            
-            # Add processed date range to config
-            self.config.add_date_range(self.config.start_date, self.config.end_date)
-            self.config.save()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Processing failed: {e}", exc_info=True)
-            return False  
-        
-    def _process_single_day(self, df: pd.DataFrame, current_date: date) -> bool:
-        """Process portfolio for a single day"""
+
+    def _calendar_runs(self) -> List[Tuple[List[date], bool]]:
+        """Split the run's calendar into stretches of market-open / market-closed days"""
+        start_date = self.config.start_date
+        open_mask = self.price_manager.market_open_mask(start_date, self.config.end_date)
+
+        boundaries = np.flatnonzero(np.diff(open_mask.astype(np.int8))) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(open_mask)]])
+        return [
+            ([start_date + timedelta(days=int(k)) for k in range(lo, hi)], bool(open_mask[lo]))
+            for lo, hi in zip(starts, ends)
+        ]
+
+    def _process_vectorized(self, holdings, progress_callback=None):
+        """
+        Array engine: build holdings x trading-day matrices and aggregate
+        market values, sales and purchases per broker with NumPy.
+
+        The calendar is worked through in blocks of trading days sized so each
+        matrix holds about VECTOR_BLOCK_CELLS lot-days, which bounds memory on
+        multi-year runs. NAV state carries over between blocks through the
+        rows already written, as it does between days in _process_loop.
+
+        Produces the same sales/purchase, drill-down and sell/purchase rows as
+        _process_loop.
+        """
+        total_days = (self.config.end_date - self.config.start_date).days + 1
+        block_days = max(1, VECTOR_BLOCK_CELLS // max(len(holdings), 1))
+
+        # Broker code of each lot in the sales/purchase sheet order ("Overall" first)
+        broker_index = {broker: i for i, broker in enumerate(self.calculator.brokers)}
+        broker_codes = np.array(
+            [broker_index[b] for b in holdings.brokers], dtype=np.int64
+        )[holdings.broker_code]
+
+        days_processed = 0
+        for block in self._day_blocks(self._calendar_runs(), block_days):
+            days_processed = self._process_vectorized_block(
+                holdings, block, broker_index, broker_codes,
+                days_processed, total_days, progress_callback
+            )
+
+    @staticmethod
+    def _day_blocks(runs, block_days: int):
+        """Group calendar runs into blocks of at most block_days trading days, in order"""
+        block, trading = [], 0
+        for run_dates, market_open in runs:
+            if not market_open:
+                block.append((run_dates, False))
+                continue
+            for lo in range(0, len(run_dates), block_days):
+                chunk = run_dates[lo:lo + block_days]
+                if trading + len(chunk) > block_days:
+                    yield block
+                    block, trading = [], 0
+                block.append((chunk, True))
+                trading += len(chunk)
+        if block:
+            yield block
+
+    def _process_vectorized_block(
+        self,
+        holdings,
+        runs,
+        broker_index: Dict[str, int],
+        broker_codes: np.ndarray,
+        days_processed: int,
+        total_days: int,
+        progress_callback=None
+    ) -> int:
+        """Process one block of calendar runs; returns the updated days_processed"""
+        trading_days = [d for run_dates, market_open in runs if market_open for d in run_dates]
+        n_lots, n_days = len(holdings), len(trading_days)
+
+        # Volumes as of each trading day; corporate actions only change them on ex-dates
+        quantities = np.empty((n_lots, n_days), dtype=holdings.quantity.dtype)
+        col = 0
+        for run_dates, market_open in runs:
+            for day in run_dates:
+                self.cfca_handler.apply_tday_actions_on_holdings(holdings, current_date=day)
+                if market_open:
+                    quantities[:, col] = holdings.quantity
+                    col += 1
+
+        # Ownership mask over day ordinals
+        days = np.array([d.toordinal() for d in trading_days], dtype=np.int64)
+        dop = holdings.dop[:, None]
+        sale_date = holdings.sale_date[:, None]
+        owned = ~(dop > days) & ~(sale_date < days) & (holdings.ticker_code >= 0)[:, None]
+        sold = owned & (sale_date == days)
+        bought = owned & (dop == days)
+
+        # Closing prices (looked up once per ticker) with cost price fallback
+        ticker_prices = self.price_manager.get_price_matrix(
+            holdings.tickers, [d.strftime("%Y-%m-%d") for d in trading_days]
+        )
+        closing = np.full((n_lots, n_days), np.nan)
+        has_ticker = holdings.ticker_code >= 0
+        closing[has_ticker] = ticker_prices[holdings.ticker_code[has_ticker]]
+        missing = np.isnan(closing)
+        closing[missing] = np.broadcast_to(holdings.cost.astype(float)[:, None], closing.shape)[missing]
+        del missing
+        market_values = closing * quantities
+
+        # Broker-wise sums; bincount adds lots in row order just like the loop
+        n_brokers = len(self.calculator.brokers)
+        day_keys = np.broadcast_to(np.arange(n_days), (n_lots, n_days)).ravel()
+        broker_keys = (broker_codes[:, None] * n_days + np.arange(n_days)).ravel()
+
+        def per_broker(weights: np.ndarray) -> np.ndarray:
+            totals = np.bincount(
+                broker_keys, weights=weights.ravel(), minlength=n_brokers * n_days
+            ).reshape(n_brokers, n_days)
+            totals[0] = np.bincount(day_keys, weights=weights.ravel(), minlength=n_days)
+            return totals
+
+        values = per_broker(np.where(owned & ~sold, market_values, 0.0))
+        sales = per_broker(np.where(sold, holdings.net_sale[:, None], 0.0))
+        purchases = per_broker(np.where(bought, holdings.net_cost[:, None], 0.0))
+        held_counts = owned.sum(axis=0)
+        del day_keys, broker_keys
+
+        # Units and NAV for all brokers in one scan over the block's trading days
+        from Utils.nav_util import compute_nav
+        prev = [self._get_previous_broker_data(broker) for broker in self.calculator.brokers]
+        units, nav, emitted = compute_nav(
+            values.T, purchases.T, sales.T,
+            prev_units=[p['units'] for p in prev],
+            prev_nav=[p['nav'] for p in prev],
+            prev_value=[p['value'] for p in prev]
+        )
+
+        # Emit tracking rows day by day in the loop's order
+        update_frequency = 5
+        col = 0
+        for run_dates, market_open in runs:
+            if not market_open:
+                self._repeat_previous_day_data(run_dates)
+                days_processed += len(run_dates)
+                if progress_callback:
+                    progress_callback(days_processed, total_days)
+                continue
+
+            for day in run_dates:
+                for i in np.flatnonzero(sold[:, col] | bought[:, col]):
+                    if sold[i, col]:
+                        self._enter_sell(
+                            holdings, i, day, closing[i, col], quantities[i, col]
+                        )
+                    if bought[i, col]:
+                        self._enter_purchase(holdings, i, day, quantities[i, col])
+
+                held = np.flatnonzero(owned[:, col])
+                self._enter_day_drill_down(
+                    holdings, held, day, quantities[held, col],
+                    closing[held, col], market_values[held, col]
+                )
+
+                for broker, b in broker_index.items():
+                    if emitted[col, b]:
+                        self._append_sales_purchase_row(broker, {
+                            'Date': day,
+                            'Value': values[b, col],
+                            'Purchase': purchases[b, col],
+                            'Sales': sales[b, col],
+                            'Net Fund': purchases[b, col] - sales[b, col],
+                            'Units': units[col, b],
+                            'NAV': nav[col, b]
+                        })
+
+                if held_counts[col] == 0:
+                    logger.warning(f"Skipping day {day} due to missing data")
+                col += 1
+
+                days_processed += 1
+                if progress_callback and (days_processed % update_frequency == 0 or
+                                        day == self.config.end_date):
+                    progress_callback(days_processed, total_days)
+        return days_processed
+
+    def _process_single_day(self, holdings, current_date: date, active_index) -> bool:
+        """Process the held lots for a single trading day"""
         
         date_str = current_date.strftime("%Y-%m-%d")
         
-        # Check if market is closed using the price manager
-        if self.price_manager.is_market_closed(date_str):
-            # Repeat previous day's data if it exists
-            self._repeat_previous_day_data(current_date)
-            return True  # Consider it successfully processed
-        
         metrics = self.calculator.initialize_metrics()
         holdings_processed = 0
         
-        current_date_dt = pd.Timestamp(current_date)
+        current_day = current_date.toordinal()
         
-        for index, row in df.iterrows():
+        for i in active_index.advance(current_day):
             # Skip if not owned on this date
-            if row['DOP'] > current_date_dt:
-                continue
-            
-            if pd.notna(row['S. Date']) and row['S. Date'] < current_date_dt:
+            if holdings.dop[i] > current_day or holdings.sale_date[i] < current_day:
                 continue
             
             # Get closing price
-            symbol = row['NSE Name ']
-            if pd.isna(symbol):
+            ticker_code = holdings.ticker_code[i]
+            if ticker_code < 0:
                 continue
             
-            symbol_ns = symbol + (".NS" if row['Symbol'] == "NSE" else ".BO")
-            
-            closing_price = self.price_manager.get_price(symbol_ns, date_str)
+            closing_price = self.price_manager.get_price(holdings.tickers[ticker_code], date_str)
             
             if closing_price is None:
                 # Use cost price as fallback for individual missing prices
-                closing_price = row['Cost/Sh']
+                closing_price = holdings.cost[i]
             
             # Calculate values
+            quantity = holdings.quantity[i]
             market_value, is_sold = self.calculator.calculate_holding_value(
-                row, closing_price, current_date
+                quantity, closing_price, holdings.sale_date[i], current_day
             )
             
-            broker = row['Broker']
+            broker = holdings.brokers[holdings.broker_code[i]]
             
             # Update metrics
             if is_sold:
-                metrics['sales']['Overall'] += row['Net Sale']
-                metrics['sales'][broker] += row['Net Sale']
+                metrics['sales']['Overall'] += holdings.net_sale[i]
+                metrics['sales'][broker] += holdings.net_sale[i]
                 # create sell entry on current date
-                if pd.notna(row['S. Date']) and row['S. Date'] == current_date_dt:
-                    self._track_sell_transaction(row, current_date, closing_price)
+                self._enter_sell(holdings, i, current_date, closing_price, quantity)
             else:
                 metrics['values']['Overall'] += market_value
                 metrics['values'][broker] += market_value
             
             # Track purchases on DOP
-            if row['DOP'].date() == current_date:
-                metrics['purchases']['Overall'] += row['Net Cost']
-                metrics['purchases'][broker] += row['Net Cost']
-                self._track_purchase_transaction(row, current_date)
+            if holdings.dop[i] == current_day:
+                metrics['purchases']['Overall'] += holdings.net_cost[i]
+                metrics['purchases'][broker] += holdings.net_cost[i]
+                self._enter_purchase(holdings, i, current_date, quantity)
             
             # Update drill-down
-            self._update_drill_down(
-                current_date, symbol, broker, row, closing_price, market_value
+            self._enter_drill_down(
+                holdings, i, current_date, quantity, closing_price, market_value
             )
             
             holdings_processed += 1
@@ -495,88 +741,105 @@ class PortfolioProcessor:
         
         return holdings_processed > 0
 
-    def _repeat_previous_day_data(self, current_date: date):
-        """Repeat previous day's sales/purchase data for all brokers"""
+    def _repeat_previous_day_data(self, closed_dates: List[date]):
+        """Repeat previous day's sales/purchase data for all brokers over a holiday stretch"""
         for broker in self.calculator.brokers:
-            prev_data = self._get_previous_broker_data(broker)
-            
             # Skip if no previous data exists
             if self.sales_purchase_dict[broker].empty:
                 continue
             
-            # Create new row with same values as previous day but current date
-            new_row = {
-                'Date': current_date,
+            prev_data = self._get_previous_broker_data(broker)
+            
+            # Same values as previous day, one row per closed date
+            self.sales_purchase_dict[broker].extend({
+                'Date': closed_dates,
                 'Value': prev_data['value'],
                 'Purchase': np.nan,  # No new purchases on market holiday
                 'Sales': np.nan,     # No new sales on market holiday
                 'Net Fund': np.nan,
                 'Units': prev_data['units'],
                 'NAV': prev_data['nav']
-            }
-            
-            self.sales_purchase_dict[broker] = pd.concat([
-                self.sales_purchase_dict[broker],
-                pd.DataFrame([new_row])
-            ], ignore_index=True)
+            })
         
-        logger.info(f"Repeated previous day's data for {current_date} (market closed)")
+        logger.info(
+            f"Repeated previous day's data for {closed_dates[0]} to {closed_dates[-1]} (market closed)"
+        )
 
     
-    def _track_purchase_transaction(self, row: pd.Series, purchase_date):
-        """Track a purchase transaction"""
-        from Utils.sell_purchase_track_util import enter_purchase_track
-        
-        self.sell_purchase_track_df = enter_purchase_track(
-            sell_purchase_track_df=self.sell_purchase_track_df,
+    def _enter_purchase(self, holdings, i: int, purchase_date: date, quantity):
+        """Record the purchase of lot i in the sell-purchase track"""
+        self.transaction_recorder.record_purchase(
             purchase_date=purchase_date,
-            broker=row['Broker'],
-            file=row['File'],
-            stock_symbol=row['NSE Name '],
-            purchase_price=row['Cost/Sh'],
-            quantity=row['No. ']
+            broker=holdings.brokers[holdings.broker_code[i]],
+            file=holdings.file[i],
+            stock_symbol=holdings.symbols[holdings.symbol_code[i]],
+            purchase_price=holdings.cost[i],
+            quantity=quantity
         )
 
+    def _enter_sell(self, holdings, i: int, sell_date: date, sell_price: float, quantity):
+        """Record the sale of lot i in the sell-purchase track"""
+        from Utils.holdings_util import NO_PURCHASE_DATE
 
-    def _track_sell_transaction(self, row: pd.Series, sell_date, sell_price: float):
-        """Track a sell transaction"""
-        from Utils.sell_purchase_track_util import enter_sell_track
-        
-        self.sell_purchase_track_df = enter_sell_track(
-            sell_purchase_track_df=self.sell_purchase_track_df,
-            purchase_date=row['DOP'].date(),
+        # A lot without a DOP is logged with a blank purchase date
+        dop = int(holdings.dop[i])
+        self.transaction_recorder.record_sell(
+            purchase_date=pd.NaT if dop == NO_PURCHASE_DATE else date.fromordinal(dop),
             sell_date=sell_date,
-            broker=row['Broker'],
-            file=row['File'],
-            stock_symbol=row['NSE Name '],
+            broker=holdings.brokers[holdings.broker_code[i]],
+            file=holdings.file[i],
+            stock_symbol=holdings.symbols[holdings.symbol_code[i]],
             sell_price=sell_price,
-            quantity=row['No. ']
+            quantity=quantity
         )
 
-    def _update_drill_down(
-        self, 
-        current_date: date, 
-        symbol: str, 
-        broker: str, 
-        row: pd.Series,
+    def _enter_drill_down(
+        self,
+        holdings,
+        i: int,
+        current_date: date,
+        quantity,
         closing_price: float,
         market_value: float
     ):
-        """Update drill-down tracking"""
-        from Utils.drill_down_util import enter_track
-        
-        self.drill_down_df = enter_track(
-            self.drill_down_df,
+        """Add lot i to the drill-down track"""
+        self.drill_down_tracker.enter(
             current_date,
-            symbol,
-            broker,
-            row['File'],
-            row['No. '],
-            row['Cost/Sh'],
+            holdings.symbols[holdings.symbol_code[i]],
+            holdings.brokers[holdings.broker_code[i]],
+            holdings.file[i],
+            quantity,
+            holdings.cost[i],
             closing_price,
             market_value
         )
     
+    def _enter_day_drill_down(
+        self,
+        holdings,
+        lots: np.ndarray,
+        current_date: date,
+        quantities: np.ndarray,
+        closing_prices: np.ndarray,
+        market_values: np.ndarray
+    ):
+        """Add all lots held on a day to the drill-down track in one batch"""
+        from Utils.drill_down_util import enter_tracks
+
+        symbols = np.array(holdings.symbols, dtype=object)
+        brokers = np.array(holdings.brokers, dtype=object)
+        enter_tracks(
+            self.drill_down_tracker,
+            current_date,
+            symbols[holdings.symbol_code[lots]],
+            brokers[holdings.broker_code[lots]],
+            holdings.file[lots],
+            quantities,
+            holdings.cost[lots],
+            closing_prices,
+            market_values
+        )
+
     def _update_sales_purchase_tracking(self, current_date: date, metrics: Dict):
         """Update sales/purchase tracking for all brokers"""
         for broker in self.calculator.brokers:
@@ -602,7 +865,7 @@ class PortfolioProcessor:
             )
             
             # Append new row
-            new_row = {
+            self._append_sales_purchase_row(broker, {
                 'Date': current_date,
                 'Value': metrics['values'][broker],
                 'Purchase': metrics['purchases'][broker],
@@ -610,19 +873,18 @@ class PortfolioProcessor:
                 'Net Fund': metrics['purchases'][broker] - metrics['sales'][broker],
                 'Units': units,
                 'NAV': nav
-            }
-            
-            self.sales_purchase_dict[broker] = pd.concat([
-                self.sales_purchase_dict[broker],
-                pd.DataFrame([new_row])
-            ], ignore_index=True)
+            })
+    
+    def _append_sales_purchase_row(self, broker: str, new_row: Dict):
+        """Append one day's row to a broker's sales/purchase sheet"""
+        self.sales_purchase_dict[broker].append(new_row)
     
     def _get_previous_broker_data(self, broker: str) -> Dict[str, float]:
         """Get previous day's data for a broker"""
-        if self.sales_purchase_dict[broker].empty:
+        last_row = self.sales_purchase_dict[broker].last_row()
+        if last_row is None:
             return {'units': 0.0, 'nav': 1000.0, 'value': 0.0}
         
-        last_row = self.sales_purchase_dict[broker].iloc[-1]
         return {
             'units': last_row['Units'],
             'nav': last_row['NAV'],
@@ -646,9 +908,12 @@ class PortfolioProcessor:
                 df.to_excel(writer, sheet_name=self.config.sheet_name, index=False)
             
             # Save tracking data
-            save_sales_purchase_dict(self.sales_purchase_dict)
-            save_drill_down_df(self.drill_down_df)
-            save_sell_purchase_track_df(self.sell_purchase_track_df)
+            save_sales_purchase_dict({
+                broker: buffer.to_frame()
+                for broker, buffer in self.sales_purchase_dict.items()
+            })
+            save_drill_down_df(self.drill_down_tracker.to_frame())
+            save_sell_purchase_track_df(self.transaction_recorder.to_frame())
             
             logger.info("Results saved successfully")
             
@@ -785,7 +1050,7 @@ class StockAnalysisApp:
         if (self.processor.sales_purchase_dict and 
             "Overall" in self.processor.sales_purchase_dict and
             not self.processor.sales_purchase_dict["Overall"].empty):
-            last_date = self.processor.sales_purchase_dict["Overall"]["Date"].iloc[-1]
+            last_date = self.processor.sales_purchase_dict["Overall"].last_row()["Date"]
             self.start_date_var.set(str(last_date))
         
         ttk.Entry(frame, textvariable=self.start_date_var, width=25).pack(pady=5)
@@ -0,0 +1,130 @@
+"""
+Columnar bhavcopy cache: round trips, lazy migration of raw CSVs and the explicit cleanup
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Utils.isin_index as isin_index_module
+from Utils.bhavcopy_cache import (
+    columnar_path, is_cached, load_bhavcopy, read_columnar, remove_migrated_csvs, write_columnar
+)
+from Utils.isin_index import INDEX_FILE, IsinIndex
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # Keep the shared ISIN index out of ./bhavcopies
+    monkeypatch.setattr(isin_index_module, "_index", IsinIndex(str(tmp_path)))
+    return tmp_path
+
+
+def _write_nse_csv(directory):
+    path = os.path.join(directory, "nse_bhavcopy_02_01_2024.csv")
+    pd.DataFrame({
+        "SYMBOL": ["AAA", "BBB"], " SERIES": [" EQ", " BE"], " CLOSE_PRICE": [10.5, 20.0],
+        " TTL_TRD_QNTY": [100, 200],
+    }).to_csv(path, index=False)
+    return path
+
+
+def _write_bse_csv(directory):
+    path = os.path.join(directory, "bse_bhavcopy_02_01_2024.csv")
+    pd.DataFrame({
+        "TckrSymb": ["AAA"], "ClsPric": [10.4], "ISIN": ["INE000A01001"], "FinInstrmId": [500001],
+        "TtlTradgVol": [50],
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_first_read_keeps_the_csv(cache_dir):
+    csv_path = _write_nse_csv(str(cache_dir))
+
+    df = load_bhavcopy("NSE", csv_path, ["SYMBOL", " CLOSE_PRICE"])
+
+    assert os.path.exists(csv_path)
+    assert os.path.exists(columnar_path(csv_path))
+    assert is_cached(csv_path)
+    pd.testing.assert_frame_equal(df, pd.read_csv(csv_path, usecols=["SYMBOL", " CLOSE_PRICE"]))
+    # Columns outside KEEP_COLUMNS stay in the CSV only
+    assert " TTL_TRD_QNTY" in pd.read_csv(csv_path).columns
+    assert " TTL_TRD_QNTY" not in load_bhavcopy("NSE", csv_path).columns
+
+
+def test_remove_migrated_csvs(cache_dir):
+    nse_path = _write_nse_csv(str(cache_dir))
+    bse_path = _write_bse_csv(str(cache_dir))
+    load_bhavcopy("NSE", nse_path)
+    load_bhavcopy("BSE", bse_path)
+    not_migrated = os.path.join(str(cache_dir), "nse_bhavcopy_03_01_2024.csv")
+    pd.DataFrame({"SYMBOL": ["AAA"], " SERIES": [" EQ"], " CLOSE_PRICE": [11.0]}).to_csv(not_migrated, index=False)
+
+    assert remove_migrated_csvs(str(cache_dir)) == 2
+
+    assert not os.path.exists(nse_path) and not os.path.exists(bse_path)
+    assert os.path.exists(not_migrated)
+    assert is_cached(nse_path) and is_cached(bse_path)
+    # The BSE file's ISINs were saved before it went
+    assert IsinIndex(str(cache_dir)).isin_of("AAA") == "INE000A01001"
+    assert os.path.exists(os.path.join(str(cache_dir), INDEX_FILE))
+
+
+def _parsed_bhavcopy(tmp_path):
+    """A bhavcopy as read_csv parses it: text with gaps, ints, floats with NaN"""
+    path = tmp_path / "parsed.csv"
+    pd.DataFrame({
+        "TckrSymb": ["AAA", None, "CCC", "DDD"],
+        "ISIN": ["INE000A01001", "INE000B01001", None, "INE000D01001"],
+        "FinInstrmId": [500001, 500002, 500003, 500004],
+        "ClsPric": [10.5, None, 30.25, 0.0],
+        "SctySrs": ["A", "B", "X", "T"],
+        "TtlTradgVol": [100, 0, 7, 2 ** 40],
+    }).to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def test_columnar_round_trip_keeps_values_and_dtypes(tmp_path):
+    df = _parsed_bhavcopy(tmp_path)
+    path = str(tmp_path / "parsed.npz")
+
+    write_columnar(path, df)
+    loaded = read_columnar(path)
+
+    pd.testing.assert_frame_equal(loaded, df)
+    assert loaded["TckrSymb"].isna().tolist() == [False, True, False, False]
+    assert not os.path.exists(path + ".tmp")
+    # Text columns are stored as unicode arrays, with a mask only where values are missing
+    with np.load(path, allow_pickle=False) as npz:
+        assert npz["SctySrs"].dtype.kind == "U"
+        assert sorted(name for name in npz.files if name.endswith(".missing")) == [
+            "ISIN.missing", "TckrSymb.missing",
+        ]
+
+
+def test_columnar_projection(tmp_path):
+    df = _parsed_bhavcopy(tmp_path)
+    path = str(tmp_path / "parsed.npz")
+
+    # Columns missing from the bhavcopy are skipped when writing and reading
+    write_columnar(path, df, ["ClsPric", "TckrSymb", "SC_CODE", "ISIN"])
+    assert list(read_columnar(path).columns) == ["ClsPric", "TckrSymb", "ISIN"]
+
+    loaded = read_columnar(path, ["ISIN", "SC_NAME", "ClsPric"])
+    pd.testing.assert_frame_equal(loaded, df[["ISIN", "ClsPric"]])
+
+
+def test_empty_bhavcopy_round_trip(tmp_path):
+    df = _parsed_bhavcopy(tmp_path).iloc[:0]
+    path = str(tmp_path / "empty.npz")
+
+    write_columnar(path, df)
+    loaded = read_columnar(path)
+
+    assert list(loaded.columns) == list(df.columns)
+    assert len(loaded) == 0
+    assert loaded["ClsPric"].dtype == df["ClsPric"].dtype
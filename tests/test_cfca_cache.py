@@ -0,0 +1,116 @@
+"""
+ProcessedCFCACache: fingerprinted exports and parsing only new rows
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.cfca_cache import CACHE_FILE, ProcessedCFCACache
+
+
+class _CountingParser:
+    """Parses 'Split <from> <to>' purposes, remembering every PURPOSE it was given"""
+
+    def __init__(self):
+        self.parsed = []
+
+    def __call__(self, purposes):
+        self.parsed.extend(purposes)
+        values = []
+        for purpose in purposes:
+            parts = purpose.split()
+            values.append((float(parts[1]), float(parts[2])) if parts[0] == "Split" else (np.nan, np.nan))
+        return pd.DataFrame(values, columns=["from_value", "to_value"], index=purposes.index)
+
+
+def _write_export(path, rows):
+    pd.DataFrame(rows, columns=["SYMBOL", "PURPOSE", "EX-DATE"]).to_csv(path, index=False)
+    return str(path)
+
+
+ROWS = [
+    ("AAA", "Split 10 2", "15-Feb-2024"),
+    ("BBB", "Dividend Rs 5", "01-Mar-2024"),
+    ("CCC", "Split 10 5", "10-Jan-2024"),
+]
+
+
+@pytest.fixture
+def export(tmp_path):
+    return _write_export(tmp_path / "CF-CA-equities.csv", ROWS)
+
+
+def test_unchanged_export_is_not_parsed_again(tmp_path, export):
+    parser = _CountingParser()
+    first = ProcessedCFCACache(str(tmp_path)).load([export], parser)
+    assert parser.parsed == [purpose for _, purpose, _ in ROWS]
+    assert first["from_value"].tolist()[0] == 10.0 and np.isnan(first["from_value"].tolist()[1])
+
+    parser.parsed.clear()
+    second = ProcessedCFCACache(str(tmp_path)).load([export], parser)
+    assert parser.parsed == []
+    pd.testing.assert_frame_equal(second, first, check_dtype=False)
+
+
+def test_changed_export_parses_only_new_rows(tmp_path, export):
+    parser = _CountingParser()
+    ProcessedCFCACache(str(tmp_path)).load([export], parser)
+
+    _write_export(export, ROWS + [("DDD", "Split 10 1", "27-Jan-2024")])
+    parser.parsed.clear()
+    store = ProcessedCFCACache(str(tmp_path)).load([export], parser)
+
+    assert parser.parsed == ["Split 10 1"]
+    assert store["SYMBOL"].tolist() == ["AAA", "BBB", "CCC", "DDD"]
+    assert store["to_value"].tolist()[3] == 1.0
+
+
+def test_unreadable_cache_is_rebuilt(tmp_path, export):
+    parser = _CountingParser()
+    ProcessedCFCACache(str(tmp_path)).load([export], parser)
+    with open(tmp_path / CACHE_FILE, "w") as f:
+        f.write("not,the,cache\n")
+
+    parser.parsed.clear()
+    store = ProcessedCFCACache(str(tmp_path)).load([export], parser)
+    assert len(parser.parsed) == len(ROWS)
+    assert len(store) == len(ROWS)
+
+
+def test_exports_are_deduplicated_and_newest_wins(tmp_path):
+    older = _write_export(tmp_path / "CF-CA-2023.csv", [
+        ("AAA", "Split 10 2", "15-Feb-2024"),
+        ("EEE", "Split 2 1", "05-May-2023"),
+    ])
+    newer = _write_export(tmp_path / "CF-CA-2024.csv", ROWS)
+    # The newer export carries an extra column for a row both list
+    df = pd.read_csv(newer)
+    df["REMARKS"] = ["revised", None, None]
+    df.to_csv(newer, index=False)
+
+    parser = _CountingParser()
+    store = ProcessedCFCACache(str(tmp_path)).load([older, newer], parser)
+
+    # AAA's PURPOSE is parsed once, although both exports list it
+    assert sorted(parser.parsed) == sorted(["Split 10 2", "Split 2 1", "Dividend Rs 5", "Split 10 5"])
+    assert sorted(store["SYMBOL"]) == ["AAA", "BBB", "CCC", "EEE"]
+    assert store.loc[store["SYMBOL"] == "AAA", "REMARKS"].tolist() == ["revised"]
+
+
+def test_rows_of_a_deleted_export_stay(tmp_path):
+    older = _write_export(tmp_path / "CF-CA-2023.csv", [("EEE", "Split 2 1", "05-May-2023")])
+    newer = _write_export(tmp_path / "CF-CA-2024.csv", ROWS)
+    parser = _CountingParser()
+    ProcessedCFCACache(str(tmp_path)).load([older, newer], parser)
+
+    os.remove(older)
+    parser.parsed.clear()
+    store = ProcessedCFCACache(str(tmp_path)).load([newer], parser)
+
+    assert parser.parsed == []
+    assert "EEE" in store["SYMBOL"].tolist()
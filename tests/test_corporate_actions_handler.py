@@ -0,0 +1,66 @@
+"""
+CorporateActionsHandler as-of volumes against the replayed reversal
+"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.corporate_actions_handler import CorporateActionsHandler
+from Utils.holdings_util import HoldingsTable
+
+
+@pytest.fixture
+def handler(tmp_path):
+    # Two uneven splits, where one ceil on the combined ratio differs from one per action
+    pd.DataFrame([
+        {"SYMBOL": "AAA", "PURPOSE": "Face Value Split From Rs 10/- Per Share To Rs 3/- Per Share",
+         "EX-DATE": "15-Feb-2024"},
+        {"SYMBOL": "AAA", "PURPOSE": "Face Value Split From Rs 3/- Per Share To Rs 7/- Per Share",
+         "EX-DATE": "10-Apr-2024"},
+    ]).to_csv(tmp_path / "CF-CA-equities.csv", index=False)
+    return CorporateActionsHandler(str(tmp_path))
+
+
+@pytest.fixture
+def holdings_df():
+    return pd.DataFrame({
+        "NSE Name ": ["AAA", "AAA", "AAA", "AAA"],
+        "Symbol": ["NSE"] * 4,
+        "Broker": ["Zerodha"] * 4,
+        "File": ["F1"] * 4,
+        "No. ": [10, 11, 25, 40],
+        "Cost/Sh": [1.0] * 4,
+        "Net Cost": [1.0] * 4,
+        "Net Sale": [np.nan] * 4,
+        "DOP": pd.to_datetime(["2024-01-02", "2024-01-02", "2024-03-01", None]),
+        "S. Date": pd.NaT,
+    })
+
+
+@pytest.mark.parametrize("as_of", [date(2024, 1, 10), date(2024, 2, 15), date(2024, 3, 5), date(2024, 5, 1)])
+def test_quantity_as_of_matches_reverse_actions(handler, holdings_df, as_of):
+    start = (pd.Timestamp(as_of) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    expected = handler.reverse_actions(holdings_df, start)["No. "].tolist()
+
+    scalar = [
+        handler.quantity_as_of(row["NSE Name "], row["No. "], as_of, row["DOP"])
+        for _, row in holdings_df.iterrows()
+    ]
+    holdings = HoldingsTable.from_dataframe(holdings_df)
+    vectorized = handler.quantities_as_of_on_holdings(holdings, as_of).tolist()
+
+    assert scalar == expected
+    assert vectorized == expected
+
+
+def test_lot_without_dop_is_never_adjusted(handler, holdings_df):
+    assert handler.adjustment_factor("AAA", date(2024, 1, 1), pd.NaT) == 1.0
+    assert handler.quantity_as_of("AAA", 40, date(2024, 1, 1), None) == 40
+    holdings = HoldingsTable.from_dataframe(holdings_df)
+    assert handler.quantities_as_of_on_holdings(holdings, date(2024, 1, 1))[3] == 40
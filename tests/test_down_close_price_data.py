@@ -0,0 +1,208 @@
+"""
+Bhavcopy downloads: retries, backoff and the adaptive rate limiter
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Utils.down_close_price_data as dcp
+
+
+def _response(status, content=b"SYMBOL\n"):
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.url = "http://stand-in/bhavcopy"
+    return response
+
+
+class _FakeFetcher:
+    """Answers with the given statuses in turn"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def get(self, exchange, url, headers=None, timeout=None):
+        self.calls += 1
+        return _response(self.statuses.pop(0))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(dcp.time, "sleep", slept.append)
+    return slept
+
+
+def test_bse_retries_back_off(sleeps):
+    fetcher = _FakeFetcher(500, 502, 200)
+
+    content = dcp.download_bhavcopy("BSE", datetime(2024, 1, 2), retries=3, fetcher=fetcher)
+
+    assert content == b"SYMBOL\n"
+    assert fetcher.calls == 3
+    assert len(sleeps) == 2
+    assert dcp.RETRY_BASE_DELAY / 2 <= sleeps[0] <= dcp.RETRY_BASE_DELAY
+    assert dcp.RETRY_BASE_DELAY <= sleeps[1] <= 2 * dcp.RETRY_BASE_DELAY
+
+
+def test_no_wait_after_the_last_attempt(sleeps):
+    fetcher = _FakeFetcher(500, 500)
+    assert dcp.download_bhavcopy("BSE", datetime(2024, 1, 2), retries=2, fetcher=fetcher) is None
+    assert len(sleeps) == 1
+
+
+def test_404_is_final(sleeps):
+    fetcher = _FakeFetcher(404, 200)
+    with pytest.raises(dcp.BhavcopyNotFound):
+        dcp.download_bhavcopy("BSE", datetime(2024, 1, 2), fetcher=fetcher)
+    assert fetcher.calls == 1
+    assert sleeps == []
+
+
+def test_nse_only_retries_throttled_responses(sleeps):
+    assert dcp.download_bhavcopy("NSE", datetime(2024, 1, 2), fetcher=_FakeFetcher(500, 200)) is None
+    fetcher = _FakeFetcher(429, 200)
+    assert dcp.download_bhavcopy("NSE", datetime(2024, 1, 2), fetcher=fetcher) == b"SYMBOL\n"
+    assert fetcher.calls == 2
+
+
+def test_retry_delay_is_capped():
+    for attempt in range(12):
+        delay = dcp.retry_delay(attempt)
+        step = min(dcp.RETRY_MAX_DELAY, dcp.RETRY_BASE_DELAY * 2 ** attempt)
+        assert step / 2 <= delay <= step
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(dcp.time, "monotonic", fake)
+    return fake
+
+
+def _request(limiter, latency=0.1, status=200, size=0, retry_after=None):
+    assert limiter.try_acquire() == 0.0
+    limiter.release(latency, status, size, retry_after)
+
+
+def test_limit_grows_by_about_one_per_window(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=2, max_limit=4)
+    expected = 2.0
+    for _ in range(6):
+        _request(limiter)
+        expected = min(4, expected + 1 / expected)
+        assert limiter.limit == pytest.approx(expected)
+
+    for _ in range(50):
+        _request(limiter)
+    assert limiter.limit == 4
+
+
+def test_throttled_response_halves_and_pauses(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=8, base_cooldown=5.0, max_cooldown=15.0)
+
+    _request(limiter, status=429)
+    assert limiter.limit == 4
+    assert limiter.try_acquire() == pytest.approx(5.0)
+
+    # Each further throttle doubles the pause, up to max_cooldown
+    clock.now += 5
+    _request(limiter, status=503)
+    assert limiter.limit == 2
+    assert limiter.try_acquire() == pytest.approx(10.0)
+    clock.now += 10
+    _request(limiter, status=429)
+    assert limiter.try_acquire() == pytest.approx(15.0)
+    clock.now += 15
+    _request(limiter, status=429)
+    assert limiter.try_acquire() == pytest.approx(15.0)
+    assert limiter.limit == 1
+
+    # A healthy response resets the cooldown
+    clock.now += 15
+    _request(limiter)
+    _request(limiter, status=429)
+    assert limiter.try_acquire() == pytest.approx(5.0)
+
+    # Retry-After sets the pause, the cooldown still doubles behind it
+    clock.now += 5
+    _request(limiter, status=429, retry_after=2.5)
+    assert limiter.try_acquire() == pytest.approx(2.5)
+    clock.now += 2.5
+    _request(limiter, status=429)
+    assert limiter.try_acquire() == pytest.approx(15.0)
+    assert limiter.throttled == 7
+
+
+def test_failed_request_counts_as_overload(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=4, min_limit=3)
+    _request(limiter, status=None)
+    assert limiter.limit == 3
+    assert limiter.failed == 1 and limiter.throttled == 0
+    assert limiter.try_acquire() > 0
+
+
+def test_404_leaves_the_limit_alone(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=3)
+    _request(limiter, status=404)
+    _request(limiter, status=404)
+    assert limiter.limit == 3
+    assert limiter.missing == 2 and limiter.completed == 0
+    assert limiter.try_acquire() == 0.0
+
+
+def test_rising_latency_trims_the_limit(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=2, latency_factor=2.0)
+    for _ in range(10):
+        _request(limiter, latency=0.1)
+    before = limiter.limit
+
+    _request(limiter, latency=5.0)
+    assert limiter.limit == pytest.approx(before * 0.8)
+    # Not again until a window of requests has passed
+    _request(limiter, latency=5.0)
+    assert limiter.limit > before * 0.8
+
+
+def test_try_acquire_respects_the_limit(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=2)
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() is None
+
+    limiter.release(0.1, 200)
+    assert limiter.try_acquire() == 0.0
+
+
+def test_stats_measure_busy_time_only(clock):
+    limiter = dcp.AdaptiveRateLimiter(initial_limit=2)
+    assert limiter.stats()["requests_per_s"] == 0.0
+
+    for _ in range(4):
+        limiter.try_acquire()
+        clock.now += 0.5
+        limiter.release(0.5, 200, size=250_000)
+        # Idle time between requests is not counted
+        clock.now += 10
+    _request(limiter, status=404)
+
+    stats = limiter.stats()
+    assert stats["completed"] == 4 and stats["missing"] == 1
+    assert stats["requests_per_s"] == 2.0
+    assert stats["mb_per_s"] == 0.5
+    assert stats["limit"] == round(limiter.limit, 2)
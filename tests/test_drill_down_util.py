@@ -0,0 +1,103 @@
+"""
+DrillDownTracker and enter_tracks against the row-by-row enter_track
+"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.drill_down_util import DrillDownTracker, check_and_create_drill_down_track_df, enter_track, enter_tracks
+
+DAY = date(2024, 1, 2)
+
+# share name, broker, File, quantity, purchase cost, market price: repeated keys
+# with equal and different market prices, and a lot without a File (never merged)
+LOTS = [
+    ("AAA", "Zerodha", "F1", 10, 100.0, 120.0),
+    ("BBB", "Zerodha", "F1", 5, 50.0, 40.0),
+    ("AAA", "Zerodha", "F1", 4, 110.0, 120.0),
+    ("AAA", "HDFC", "F1", 3, 90.0, 120.0),
+    ("AAA", "Zerodha", "F1", 6, 95.0, 121.0),
+    ("CCC", "Zerodha", None, 2, 10.0, 11.0),
+    ("CCC", "Zerodha", None, 3, 12.0, 11.0),
+    ("BBB", "Zerodha", "F1", 7, 55.0, 40.0),
+]
+
+
+def _seed():
+    """A saved track with one row of DAY that the lots merge into"""
+    return pd.DataFrame([
+        {"date": date(2024, 1, 1), "share name": "AAA", "broker": "Zerodha", "File": "F1",
+         "purchase cost": 100.0, "quantity": 10, "t_day mkt price": 118.0, "total market value": 1180.0},
+        {"date": DAY, "share name": "BBB", "broker": "Zerodha", "File": "F1",
+         "purchase cost": 45.0, "quantity": 2, "t_day mkt price": 40.0, "total market value": 80.0},
+    ])
+
+
+def _reference(seed, lots, day=DAY):
+    df = seed
+    for name, broker, file, qty, cost, price in lots:
+        df = enter_track(df, day, name, broker, file, qty, cost, price, qty * price)
+    return df
+
+
+def _assert_same(frame, reference):
+    pd.testing.assert_frame_equal(
+        frame.reset_index(drop=True), reference.reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_enter_matches_enter_track():
+    tracker = DrillDownTracker(check_and_create_drill_down_track_df())
+    for name, broker, file, qty, cost, price in LOTS:
+        tracker.enter(DAY, name, broker, file, qty, cost, price, qty * price)
+
+    _assert_same(tracker.to_frame(), _reference(check_and_create_drill_down_track_df(), LOTS))
+    assert len(tracker) == 5
+
+
+def test_enter_merges_into_seed_rows():
+    tracker = DrillDownTracker(_seed())
+    for name, broker, file, qty, cost, price in LOTS:
+        tracker.enter(DAY, name, broker, file, qty, cost, price, qty * price)
+
+    frame = tracker.to_frame()
+    _assert_same(frame, _reference(_seed(), LOTS))
+    # The seed frame itself is left as loaded
+    pd.testing.assert_frame_equal(tracker._seed, _seed())
+    assert tracker.contains(DAY, "BBB", "Zerodha", "F1")
+    assert not tracker.contains(DAY, "CCC", "Zerodha", None)
+
+
+def _columns(lots):
+    names, brokers, files, quantities, costs, prices = (list(col) for col in zip(*lots))
+    quantities, prices = np.array(quantities), np.array(prices)
+    return names, brokers, files, quantities, np.array(costs), prices, quantities * prices
+
+
+def test_enter_tracks_matches_enter_track():
+    tracker = DrillDownTracker(check_and_create_drill_down_track_df())
+    enter_tracks(tracker, DAY, *_columns(LOTS))
+
+    _assert_same(tracker.to_frame(), _reference(check_and_create_drill_down_track_df(), LOTS))
+
+
+def test_enter_tracks_merges_existing_keys():
+    tracker = DrillDownTracker(_seed())
+    # The same lots again, so every mergeable key is already in the track
+    enter_tracks(tracker, DAY, *_columns(LOTS))
+    enter_tracks(tracker, DAY, *_columns(LOTS[::-1]))
+
+    _assert_same(tracker.to_frame(), _reference(_reference(_seed(), LOTS), LOTS[::-1]))
+
+
+def test_enter_tracks_on_a_dataframe():
+    frame = enter_tracks(_seed(), DAY, *_columns(LOTS))
+    _assert_same(frame, _reference(_seed(), LOTS))
+
+    unchanged = enter_tracks(_seed(), DAY, [], [], [], [], [], [], [])
+    _assert_same(unchanged, _seed())
@@ -0,0 +1,156 @@
+"""
+IsinIndex intervals and ticker resolution
+"""
+import json
+import os
+import random
+import sys
+from datetime import date
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.isin_index import INDEX_FILE, IsinIndex
+
+
+def _old_format(code, name, isin):
+    """BSE_EQ_BHAVCOPY rows (before 2024): short name and scrip code, no ticker symbol"""
+    return pd.DataFrame({"SC_CODE": [code], "SC_NAME": [name], "CLOSE": [1.0], "ISIN_CODE": [isin]})
+
+
+def _new_format(symbol, code, isin):
+    """BhavCopy_BSE_CM rows (2024 onwards)"""
+    return pd.DataFrame({"TckrSymb": [symbol], "FinInstrmId": [code], "ClsPric": [1.0], "ISIN": [isin]})
+
+
+@pytest.fixture
+def mixed_index(tmp_path):
+    index = IsinIndex(str(tmp_path))
+    for day in (date(2023, 11, 1), date(2023, 12, 1), date(2023, 12, 29)):
+        index.ingest(_old_format(500001, "ACME INDS", "INE000A01001"), day)
+    index.ingest(_new_format("ACME", 500001, "INE000A01001"), date(2024, 1, 1))
+    index.ingest(_new_format("ACMENEW", 500001, "INE000A01001"), date(2024, 6, 3))
+    index.ingest(_new_format("ACMENEW", 500001, "INE000A01001"), date(2024, 6, 4))
+    return index
+
+
+def test_old_format_rows_store_the_code_only(mixed_index):
+    assert mixed_index._intervals["INE000A01001"] == [
+        [date(2023, 11, 1).toordinal(), date(2023, 12, 29).toordinal(), "", "500001"],
+        [date(2024, 1, 1).toordinal(), date(2024, 1, 1).toordinal(), "ACME", "500001"],
+        [date(2024, 6, 3).toordinal(), date(2024, 6, 4).toordinal(), "ACMENEW", "500001"],
+    ]
+    assert mixed_index.resolve("INE000A01001", date(2023, 12, 1)) == ("", "500001")
+    # The short name never becomes a symbol
+    assert mixed_index.isin_of("ACME INDS") is None
+
+
+def test_resolve_ticker_across_formats(mixed_index):
+    # Old format dates take the nearest interval that has a symbol
+    assert mixed_index.resolve_ticker("ACMENEW.NS", date(2023, 11, 15)) == "ACME.NS"
+    assert mixed_index.resolve_ticker("ACME.BO", date(2023, 12, 1)) == "ACME.BO"
+    assert mixed_index.resolve_ticker("ACMENEW.NS", date(2024, 3, 1)) == "ACME.NS"
+    assert mixed_index.resolve_ticker("ACME.NS", date(2024, 6, 4)) == "ACMENEW.NS"
+    assert mixed_index.resolve_ticker("ACME.NS", date(2023, 1, 2)) is None
+    assert mixed_index.resolve_ticker("OTHER.NS", date(2024, 6, 4)) is None
+
+
+def test_old_format_only_isin_does_not_resolve(tmp_path):
+    index = IsinIndex(str(tmp_path))
+    index.ingest(_old_format(500002, "ZETA", "INE000Z01002"), date(2023, 5, 2))
+    assert index.resolve("INE000Z01002", date(2023, 5, 2)) == ("", "500002")
+    assert index.isin_of("ZETA") is None
+    assert index._nearest_symbol("INE000Z01002", date(2023, 5, 2)) is None
+
+
+def test_index_written_by_an_older_version_is_rebuilt(tmp_path):
+    with open(tmp_path / INDEX_FILE, "w") as f:
+        json.dump({"files": ["bse_bhavcopy_01_11_2023"], "intervals": {
+            "INE000A01001": [[738825, 738825, "ACME INDS", "500001"]]
+        }}, f)
+    index = IsinIndex(str(tmp_path))
+    assert index._intervals == {}
+    assert index.isin_of("ACME INDS") is None
+
+
+def test_save_and_load_round_trip(mixed_index, tmp_path):
+    mixed_index.save()
+    loaded = IsinIndex(str(tmp_path))
+    assert loaded._intervals == mixed_index._intervals
+    assert loaded.resolve_ticker("ACME.NS", date(2023, 12, 1)) == "ACME.NS"
+
+
+ISIN = "INE000B01001"
+JAN = date(2024, 1, 1).toordinal()
+
+
+def _intervals_after(*entries):
+    """Intervals of one ISIN after _add-ing (day offset from JAN, symbol) entries in turn"""
+    index = IsinIndex.__new__(IsinIndex)
+    index._intervals = {}
+    for offset, symbol in entries:
+        index._add(ISIN, JAN + offset, symbol, "500002")
+    return [(start - JAN, end - JAN, symbol) for start, end, symbol, _ in index._intervals[ISIN]]
+
+
+def _symbol_on(intervals, offset):
+    """Symbol of the interval starting last on or before a day, as resolve() picks it"""
+    return [symbol for start, _, symbol in intervals if start <= offset][-1]
+
+
+def test_add_extends_and_merges_neighbours():
+    # Later and earlier days with the same symbol stretch the interval
+    assert _intervals_after((5, "AAA"), (8, "AAA"), (2, "AAA")) == [(2, 8, "AAA")]
+    # A day already covered changes nothing
+    assert _intervals_after((2, "AAA"), (8, "AAA"), (5, "AAA")) == [(2, 8, "AAA")]
+    # A day in the gap joins the interval with its symbol
+    assert _intervals_after((1, "AAA"), (9, "BBB"), (5, "AAA")) == [(1, 5, "AAA"), (9, 9, "BBB")]
+    assert _intervals_after((1, "AAA"), (9, "BBB"), (5, "BBB")) == [(1, 1, "AAA"), (5, 9, "BBB")]
+    assert _intervals_after((1, "AAA"), (5, "BBB"), (3, "AAA"), (4, "BBB")) == [(1, 3, "AAA"), (4, 5, "BBB")]
+    # A new symbol after the last interval starts its own
+    assert _intervals_after((1, "AAA"), (4, "BBB")) == [(1, 1, "AAA"), (4, 4, "BBB")]
+
+
+def test_add_splits_around_a_conflicting_day():
+    assert _intervals_after((1, "AAA"), (9, "AAA"), (5, "BBB")) == [
+        (1, 4, "AAA"), (5, 5, "BBB"), (6, 9, "AAA"),
+    ]
+    # At either end of the interval only one side is left
+    assert _intervals_after((1, "AAA"), (9, "AAA"), (1, "BBB")) == [(1, 1, "BBB"), (2, 9, "AAA")]
+    assert _intervals_after((1, "AAA"), (9, "AAA"), (9, "BBB")) == [(1, 8, "AAA"), (9, 9, "BBB")]
+    # A one-day interval is replaced
+    assert _intervals_after((1, "AAA"), (3, "CCC"), (1, "BBB")) == [(1, 1, "BBB"), (3, 3, "CCC")]
+    # A corrected day resolves to its new symbol again
+    corrected = _intervals_after((1, "AAA"), (5, "BBB"), (9, "AAA"), (5, "AAA"))
+    assert [_symbol_on(corrected, offset) for offset in (1, 5, 9)] == ["AAA", "AAA", "AAA"]
+    # ... and a day between two of its intervals with the same symbol joins them
+    assert _intervals_after((1, "AAA"), (5, "BBB"), (9, "AAA"), (5, "AAA"), (7, "AAA")) == [
+        (1, 1, "AAA"), (5, 9, "AAA"),
+    ]
+
+
+def test_add_in_any_order_resolves_every_ingested_day():
+    rng = random.Random(7)
+    for _ in range(50):
+        truth = {offset: rng.choice(["AAA", "BBB"]) for offset in rng.sample(range(60), 25)}
+        entries = list(truth.items())
+        rng.shuffle(entries)
+        intervals = _intervals_after(*entries)
+
+        assert all(start <= end for start, end, _ in intervals)
+        assert all(end < start for (_, end, _), (start, _, _) in zip(intervals, intervals[1:]))
+        for offset, symbol in truth.items():
+            assert _symbol_on(intervals, offset) == symbol
+
+
+def test_add_in_date_order_keeps_a_symbol_until_it_changes():
+    days = sorted(random.Random(11).sample(range(120), 40))
+    truth = {offset: "AAA" if offset < 50 else "BBB" if offset < 90 else "CCC" for offset in days}
+    intervals = _intervals_after(*truth.items())
+
+    assert [symbol for _, _, symbol in intervals] == ["AAA", "BBB", "CCC"]
+    assert intervals[0][0] == days[0] and intervals[-1][1] == days[-1]
+    for offset in range(days[0], days[-1] + 1):
+        assert _symbol_on(intervals, offset) == truth[max(day for day in days if day <= offset)]
@@ -0,0 +1,174 @@
+"""
+PortfolioProcessor runs on a small holdings sheet, for both engines
+"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stock_analysis_app as app
+from Utils.corporate_actions_handler import CorporateActionsHandler
+
+START = date(2024, 1, 1)
+END = date(2024, 1, 5)
+MIXED_START = date(2024, 1, 1)
+MIXED_END = date(2024, 3, 29)
+
+
+def _write_workspace(directory):
+    """Holdings sheet, CFCA export and close prices for START..END"""
+    os.makedirs(os.path.join(directory, "Excels"))
+    holdings = pd.DataFrame([
+        # Blank DOP, sold during the run
+        {"Cat": "Normal", "NSE Name ": "AAA", "Symbol": "NSE", "Name of Shares": "AAA Ltd",
+         "Broker": "Zerodha", "DOP": None, "S. Date": pd.Timestamp(2024, 1, 3),
+         "Cost/Sh": 10.0, "No. ": 5, "Net Cost": 50.0, "Net Sale": 60.0, "File": "F1"},
+        {"Cat": "Normal", "NSE Name ": "BBB", "Symbol": "NSE", "Name of Shares": "BBB Ltd",
+         "Broker": "Zerodha", "DOP": pd.Timestamp(2024, 1, 2), "S. Date": None,
+         "Cost/Sh": 20.0, "No. ": 3, "Net Cost": 60.0, "Net Sale": np.nan, "File": "F1"},
+    ])
+    main_path = os.path.join(directory, "main.xlsx")
+    holdings.to_excel(main_path, sheet_name="Sheet1", index=False)
+
+    pd.DataFrame([
+        {"SYMBOL": "CCC", "PURPOSE": "Face Value Split From Rs. 10 To Rs. 2/-", "EX-DATE": "01-Mar-2024"},
+    ]).to_csv(os.path.join(directory, "Excels", "CF-CA-equities.csv"), index=False)
+
+    dates = [d.strftime("%Y-%m-%d") for d in pd.date_range(START, END)]
+    price_df = pd.DataFrame({d: [12.0, 21.0] for d in dates})
+    price_df.insert(0, "ticker", ["AAA.NS", "BBB.NS"])
+    return main_path, price_df
+
+
+def _run(tmp_path, main_path, price_df, start, end, engine):
+    """PortfolioProcessor after processing start..end with one engine"""
+    config = app.AppConfig(
+        config_file=str(tmp_path / "defaults.json"),
+        main_file_path=main_path,
+        sales_purchase_file_path=str(tmp_path / "sales_purchase.xlsx"),
+        sheet_name="Sheet1",
+        start_date=start,
+        end_date=end,
+        engine=engine,
+    )
+    df = app.DataLoader.load_main_dataframe(main_path, "Sheet1")
+    price_manager = app.PriceDataManager(start, end)
+    price_manager.set_price_df(price_df)
+    processor = app.PortfolioProcessor(
+        df=df,
+        config=config,
+        brokers=app.DataLoader.get_unique_brokers(df),
+        price_manager=price_manager,
+        cfca_handler=CorporateActionsHandler("Excels"),
+    )
+    assert processor.process()
+    return processor
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_sold_lot_without_dop(tmp_path, monkeypatch, engine):
+    monkeypatch.chdir(tmp_path)
+    main_path, price_df = _write_workspace(str(tmp_path))
+
+    processor = _run(tmp_path, main_path, price_df, START, END, engine)
+
+    track = processor.transaction_recorder.to_frame()
+    sells = track[track["Sell Date"].notna()]
+    assert len(sells) == 1
+    sell = sells.iloc[0]
+    assert pd.isna(sell["Purchase Date"])
+    assert sell["Sell Date"] == date(2024, 1, 3)
+    assert sell["Stock Symbol"] == "AAA"
+    assert sell["Quantity"] == 5
+
+
+def _write_mixed_workspace(directory):
+    """
+    Sheet exercising corporate actions, holidays and gaps in the prices.
+
+    AAA splits, BBB consolidates and CCC has two splits on one ex-date;
+    lots are bought and sold around those dates, one lot has no NSE Name
+    and two have no DOP. Weekends and 2024-01-26 have no prices, and some
+    tickers miss single days.
+    """
+    os.makedirs(os.path.join(directory, "Excels"))
+    rows = [
+        # NSE Name, Broker, DOP, S. Date, Cost/Sh, No., File
+        ("AAA", "Zerodha", date(2023, 12, 1), None, 100.0, 7, "F1"),
+        ("AAA", "HDFC", date(2024, 1, 10), date(2024, 2, 15), 110.0, 3, "F1"),
+        ("AAA", "Zerodha", date(2024, 2, 20), None, 25.0, 12, "F2"),
+        ("BBB", "HDFC", date(2023, 11, 3), date(2024, 3, 5), 9.0, 95, "F1"),
+        ("BBB", "HDFC", date(2024, 1, 2), None, 9.5, 33, "F2"),
+        ("BBB", "Zerodha", date(2024, 3, 6), None, 90.0, 4, "F1"),
+        ("CCC", "Zerodha", date(2023, 6, 1), None, 300.0, 9, "F1"),
+        ("CCC", "HDFC", date(2024, 1, 29), date(2024, 2, 28), 310.0, 5, None),
+        ("CCC", "Zerodha", date(2024, 2, 9), None, 31.0, 50, "F2"),
+        ("DDD", None, date(2024, 1, 5), date(2024, 1, 26), 40.0, 10, "F1"),
+        ("DDD", "Zerodha", None, date(2024, 2, 1), 42.0, 6, "F2"),
+        ("DDD", "HDFC", None, None, 41.0, 8, "F1"),
+        (None, "Zerodha", date(2024, 1, 15), None, 5.0, 100, "F1"),
+    ]
+    holdings = pd.DataFrame([
+        {"Cat": "Normal", "NSE Name ": name, "Symbol": "NSE", "Name of Shares": f"{name} Ltd",
+         "Broker": broker, "DOP": pd.Timestamp(dop) if dop else None,
+         "S. Date": pd.Timestamp(sell) if sell else None, "Cost/Sh": cost, "No. ": quantity,
+         "Net Cost": cost * quantity, "Net Sale": cost * quantity * 1.1 if sell else np.nan, "File": file}
+        for name, broker, dop, sell, cost, quantity, file in rows
+    ])
+    main_path = os.path.join(directory, "main.xlsx")
+    holdings.to_excel(main_path, sheet_name="Sheet1", index=False)
+
+    pd.DataFrame([
+        {"SYMBOL": "AAA", "PURPOSE": "Face Value Split From Rs. 10 To Rs. 2/-", "EX-DATE": "15-Feb-2024"},
+        {"SYMBOL": "BBB", "PURPOSE": "Consolidation Of Equity Shares From Re 1 Per Share To Rs 10 Per Share",
+         "EX-DATE": "05-Mar-2024"},
+        {"SYMBOL": "CCC", "PURPOSE": "Fv Splt Frm Rs 10 To Rs 5", "EX-DATE": "09-Feb-2024"},
+        {"SYMBOL": "CCC", "PURPOSE": "Fv Splt Frm Rs 5 To Re 1", "EX-DATE": "09-Feb-2024"},
+        {"SYMBOL": "AAA", "PURPOSE": "Dividend - Rs 5 Per Share", "EX-DATE": "01-Mar-2024"},
+    ]).to_csv(os.path.join(directory, "Excels", "CF-CA-equities.csv"), index=False)
+
+    tickers = ["AAA.NS", "BBB.NS", "CCC.NS", "DDD.NS"]
+    rng = np.random.default_rng(7)
+    prices = {}
+    for day in pd.date_range(MIXED_START, MIXED_END):
+        if day.weekday() >= 5 or day.date() == date(2024, 1, 26):
+            continue
+        column = np.round(rng.uniform(10, 500, len(tickers)), 2)
+        column[rng.random(len(tickers)) < 0.1] = np.nan
+        prices[day.strftime("%Y-%m-%d")] = column
+    price_df = pd.DataFrame(prices)
+    price_df.insert(0, "ticker", tickers)
+    return main_path, price_df
+
+
+def test_engines_give_the_same_outputs(tmp_path, monkeypatch):
+    # Blocks of a few days, so the vectorized engine carries state across blocks
+    monkeypatch.setattr(app, "VECTOR_BLOCK_CELLS", 64)
+
+    outputs = {}
+    for engine in ("loop", "vectorized"):
+        workspace = tmp_path / engine
+        workspace.mkdir()
+        monkeypatch.chdir(workspace)
+        main_path, price_df = _write_mixed_workspace(str(workspace))
+        processor = _run(workspace, main_path, price_df, MIXED_START, MIXED_END, engine)
+        outputs[engine] = processor
+
+    loop, vectorized = outputs["loop"], outputs["vectorized"]
+    assert loop.sales_purchase_dict.keys() == vectorized.sales_purchase_dict.keys()
+    for broker, buffer in loop.sales_purchase_dict.items():
+        pd.testing.assert_frame_equal(buffer.to_frame(), vectorized.sales_purchase_dict[broker].to_frame())
+    pd.testing.assert_frame_equal(loop.drill_down_tracker.to_frame(), vectorized.drill_down_tracker.to_frame())
+    pd.testing.assert_frame_equal(loop.transaction_recorder.to_frame(), vectorized.transaction_recorder.to_frame())
+
+    # The run covers every case the sheet sets up
+    track = loop.transaction_recorder.to_frame()
+    # DDD sold on the 2024-01-26 holiday is not logged, like in the row-based code
+    assert track["Sell Date"].notna().sum() == 4
+    assert track["Purchase Date"].isna().sum() == 1
+    assert len(loop.sales_purchase_dict["Overall"].to_frame()) == 89
@@ -0,0 +1,211 @@
+"""
+PriceWarehouse: widening, recovery after interrupted updates, closed dates and price_df
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Utils.down_close_price_data as down_close_price_data
+import Utils.isin_index as isin_index_module
+import Utils.price_warehouse as price_warehouse
+from Utils.price_warehouse import MATRIX_FILE, META_FILE, PriceWarehouse
+
+
+def _prices(**close):
+    return pd.Series({symbol.replace("_", "."): price for symbol, price in close.items()})
+
+
+def _row(warehouse, date_str):
+    """Stored prices of a date by symbol, NaNs dropped"""
+    row = warehouse._open_matrix()[warehouse._date_rows[date_str]]
+    return {symbol: row[i] for i, symbol in enumerate(warehouse.symbols) if not np.isnan(row[i])}
+
+
+@pytest.fixture
+def narrow(monkeypatch):
+    monkeypatch.setattr(price_warehouse, "MIN_WIDTH", 4)
+
+
+def test_add_flush_and_reload(tmp_path, narrow):
+    warehouse = PriceWarehouse(str(tmp_path))
+    warehouse.add("2024-01-02", _prices(AAA_NS=10.0, BBB_BO=20.0))
+    warehouse.add("2024-01-03", pd.Series({"AAA.NS": "11.5", np.nan: 1.0, "CCC.NS": "n/a"}))
+    warehouse.add("2024-01-02", _prices(AAA_NS=10.5))
+    warehouse.flush()
+
+    loaded = PriceWarehouse(str(tmp_path))
+    assert loaded.dates == ["2024-01-02", "2024-01-03"]
+    assert "2024-01-03" in loaded and "2024-01-04" not in loaded
+    # Replacing a date's row drops its other prices; unparseable prices are NaN
+    assert _row(loaded, "2024-01-02") == {"AAA.NS": 10.5}
+    assert _row(loaded, "2024-01-03") == {"AAA.NS": 11.5}
+
+
+def test_widening_keeps_stored_rows(tmp_path, narrow):
+    warehouse = PriceWarehouse(str(tmp_path))
+    warehouse.add("2024-01-02", _prices(S0_NS=0.0, S1_NS=1.0, S2_NS=2.0))
+    warehouse.add("2024-01-03", pd.Series({f"S{i}.NS": float(i) for i in range(9)}))
+
+    assert warehouse.width == 16
+    assert os.path.getsize(tmp_path / MATRIX_FILE) == 2 * 16 * 8
+    assert _row(warehouse, "2024-01-02") == {"S0.NS": 0.0, "S1.NS": 1.0, "S2.NS": 2.0}
+    warehouse.flush()
+
+    loaded = PriceWarehouse(str(tmp_path))
+    assert loaded.width == 16
+    assert _row(loaded, "2024-01-03") == {f"S{i}.NS": float(i) for i in range(9)}
+
+
+def test_rows_past_the_metadata_are_dropped(tmp_path, narrow):
+    warehouse = PriceWarehouse(str(tmp_path))
+    warehouse.add("2024-01-02", _prices(AAA_NS=10.0))
+    warehouse.flush()
+    # An interrupted update: the row is written, the metadata is not
+    warehouse.add("2024-01-03", _prices(AAA_NS=99.0))
+
+    loaded = PriceWarehouse(str(tmp_path))
+    assert loaded.dates == ["2024-01-02"]
+    loaded.add("2024-01-04", _prices(AAA_NS=12.0))
+    loaded.flush()
+
+    assert os.path.getsize(tmp_path / MATRIX_FILE) == 2 * 4 * 8
+    reloaded = PriceWarehouse(str(tmp_path))
+    assert reloaded.dates == ["2024-01-02", "2024-01-04"]
+    assert _row(reloaded, "2024-01-04") == {"AAA.NS": 12.0}
+
+
+def test_truncated_matrix_starts_a_new_warehouse(tmp_path, narrow):
+    warehouse = PriceWarehouse(str(tmp_path))
+    for day in ("2024-01-02", "2024-01-03", "2024-01-04"):
+        warehouse.add(day, _prices(AAA_NS=10.0))
+    warehouse.flush()
+    warehouse._close_matrix()
+    with open(tmp_path / MATRIX_FILE, "r+b") as f:
+        f.truncate(2 * 4 * 8 + 3)
+
+    loaded = PriceWarehouse(str(tmp_path))
+    assert len(loaded) == 0 and loaded.symbols == []
+    loaded.add("2024-01-05", _prices(BBB_NS=5.0))
+    loaded.flush()
+    assert PriceWarehouse(str(tmp_path)).dates == ["2024-01-05"]
+
+
+def test_unreadable_metadata_starts_a_new_warehouse(tmp_path):
+    with open(tmp_path / META_FILE, "w") as f:
+        f.write("{not json")
+    assert len(PriceWarehouse(str(tmp_path))) == 0
+
+
+class _FakeDays:
+    """Stands in for iter_bhavcopy_days: results by date, remembering what was requested"""
+
+    def __init__(self, results):
+        self.results = results
+        self.requested = []
+
+    def __call__(self, dates, combine):
+        for d in dates:
+            date_str = d.strftime("%Y-%m-%d")
+            self.requested.append(date_str)
+            yield (date_str,) + self.results[date_str]
+
+
+def test_update_records_only_settled_closed_dates(tmp_path, monkeypatch):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    holiday, trading, recent, failed = (
+        today - timedelta(days=30), today - timedelta(days=29), today - timedelta(days=1), today - timedelta(days=28),
+    )
+    fake = _FakeDays({
+        holiday.strftime("%Y-%m-%d"): (None, True),
+        trading.strftime("%Y-%m-%d"): (_prices(AAA_NS=10.0), False),
+        recent.strftime("%Y-%m-%d"): (None, True),
+        failed.strftime("%Y-%m-%d"): (None, False),
+    })
+    monkeypatch.setattr(down_close_price_data, "iter_bhavcopy_days", fake)
+    dates = [holiday, trading, failed, recent]
+
+    warehouse = PriceWarehouse(str(tmp_path))
+    assert warehouse.update(dates) == 1
+    assert warehouse.closed_dates == {holiday.strftime("%Y-%m-%d")}
+
+    # Closed and stored dates are not requested again; the rest is
+    fake.requested.clear()
+    reloaded = PriceWarehouse(str(tmp_path))
+    assert reloaded.update(dates) == 0
+    assert fake.requested == [failed.strftime("%Y-%m-%d"), recent.strftime("%Y-%m-%d")]
+
+    fake.requested.clear()
+    fake.results[holiday.strftime("%Y-%m-%d")] = (_prices(AAA_NS=9.0), False)
+    assert reloaded.update(dates, retry_closed=True) == 1
+    assert holiday.strftime("%Y-%m-%d") in fake.requested
+    assert reloaded.closed_dates == set()
+    with open(tmp_path / META_FILE) as f:
+        assert json.load(f)["closed_dates"] == []
+
+
+class _FakeIsinIndex:
+    """NEWCO traded as OLDCO before 2024-01-04"""
+
+    def resolve_ticker_dates(self, ticker, days):
+        symbol, _, exchange = ticker.rpartition(".")
+        if symbol not in ("NEWCO", "OLDCO"):
+            return [None] * len(days)
+        return [f"{'OLDCO' if day < datetime(2024, 1, 4).date() else 'NEWCO'}.{exchange}" for day in days]
+
+
+def test_price_df_follows_symbols_and_fills_renamed_tickers(tmp_path, monkeypatch):
+    monkeypatch.setattr(isin_index_module, "get_isin_index", _FakeIsinIndex)
+    warehouse = PriceWarehouse(str(tmp_path))
+    warehouse.add("2024-01-02", _prices(OLDCO_NS=50.0, AAA_NS=10.0, AAA_BO=10.1))
+    warehouse.add("2024-01-03", _prices(OLDCO_NS=51.0, AAA_NS=11.0))
+    warehouse.add("2024-01-04", _prices(NEWCO_NS=52.0, BBB_NS=20.0))
+
+    tickers = ["NEWCO.NS", "AAA.NS", "AAA.BO", "ZZZ.NS"]
+    renamed = ["XYZ.NS", "AAA.NS", "AAA.BO", "ZZZ.NS"]
+    symbols_dict = {"2024-01-02": renamed, "2024-01-03": renamed, "2024-01-04": tickers}
+    # 2024-01-05 is not in the warehouse and is left out
+    dates = [datetime(2024, 1, day) for day in (2, 3, 4, 5)]
+
+    df = warehouse.price_df(tickers, dates, symbols_dict)
+
+    assert list(df.columns) == ["ticker", "2024-01-02", "2024-01-03", "2024-01-04"]
+    assert df["ticker"].tolist() == tickers
+    table = df.set_index("ticker")
+    # XYZ has no ISIN in the index; NEWCO is filled from OLDCO on its own dates only
+    assert table.loc["NEWCO.NS"].isna().tolist() == [True, True, False]
+    assert table.loc["AAA.NS"].tolist()[:2] == [10.0, 11.0]
+    assert table.loc["AAA.BO", "2024-01-02"] == 10.1 and np.isnan(table.loc["AAA.BO", "2024-01-03"])
+    assert table.loc["ZZZ.NS"].isna().all()
+
+    symbols_dict = {day: tickers for day in symbols_dict}
+    table = warehouse.price_df(tickers, dates, symbols_dict).set_index("ticker")
+    assert table.loc["NEWCO.NS"].tolist() == [50.0, 51.0, 52.0]
+
+
+def test_price_df_without_stored_dates(tmp_path):
+    warehouse = PriceWarehouse(str(tmp_path))
+    df = warehouse.price_df(["AAA.NS"], [datetime(2024, 1, 2)], {"2024-01-02": ["AAA.NS"]})
+    assert df["ticker"].tolist() == ["AAA.NS"]
+    assert list(df.columns) == ["ticker"]
+
+
+def test_price_df_without_an_isin_index(tmp_path, monkeypatch, caplog):
+    def unreadable():
+        raise OSError("bhavcopies is read-only")
+
+    monkeypatch.setattr(isin_index_module, "get_isin_index", unreadable)
+    warehouse = PriceWarehouse(str(tmp_path))
+    warehouse.add("2024-01-02", _prices(OLDCO_NS=50.0, AAA_NS=10.0))
+
+    table = warehouse.price_df(["NEWCO.NS", "AAA.NS"], [datetime(2024, 1, 2)],
+                               {"2024-01-02": ["NEWCO.NS", "AAA.NS"]}).set_index("ticker")
+    assert np.isnan(table.loc["NEWCO.NS", "2024-01-02"])
+    assert table.loc["AAA.NS", "2024-01-02"] == 10.0
+    assert "renamed tickers left unfilled" in caplog.text
@@ -0,0 +1,86 @@
+"""
+SalesPurchaseBuffer against the row-by-row concat it replaces
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.sales_purchase_util import SALES_PURCHASE_COLUMNS, SalesPurchaseBuffer
+
+
+def _rows(count, start=date(2024, 1, 1)):
+    return [
+        {"Date": start + timedelta(days=i), "Value": 100.0 + i, "Purchase": float(i % 3),
+         "Sales": float(i % 5), "Net Fund": 1.5 * i, "Units": 10.0 + i / 7, "NAV": 100.0 / (i + 1)}
+        for i in range(count)
+    ]
+
+
+def _concat(seed, rows):
+    """The per-row pd.concat the buffer replaces"""
+    df = seed
+    for row in rows:
+        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    return df
+
+
+def _seed():
+    return pd.DataFrame([{
+        "Date": pd.Timestamp(2023, 12, 29), "Value": 90.0, "Purchase": 0.0, "Sales": 0.0,
+        "Net Fund": 5.0, "Units": 9.0, "NAV": 10.0,
+    }])
+
+
+def test_append_grows_past_chunks():
+    rows = _rows(23)
+    buffer = SalesPurchaseBuffer(_seed(), chunk_size=4)
+    for row in rows:
+        buffer.append(row)
+
+    assert len(buffer) == 24
+    pd.testing.assert_frame_equal(buffer.to_frame(), _concat(_seed(), rows), check_dtype=False)
+
+
+def test_extend_with_arrays_and_scalars():
+    rows = _rows(10)
+    buffer = SalesPurchaseBuffer(chunk_size=3)
+    buffer.append(rows[0])
+    buffer.extend({
+        "Date": [row["Date"] for row in rows[1:]],
+        "Value": np.array([row["Value"] for row in rows[1:]]),
+        "Purchase": np.array([row["Purchase"] for row in rows[1:]]),
+        "Sales": np.array([row["Sales"] for row in rows[1:]]),
+        "Net Fund": np.array([row["Net Fund"] for row in rows[1:]]),
+        "Units": np.array([row["Units"] for row in rows[1:]]),
+        "NAV": np.array([row["NAV"] for row in rows[1:]]),
+    })
+    buffer.extend({"Date": [date(2024, 2, 1), date(2024, 2, 2)], "Value": 1.0, "Purchase": 0.0,
+                   "Sales": 0.0, "Net Fund": 2.0, "Units": 3.0, "NAV": 4.0})
+
+    expected = rows + [
+        {"Date": day, "Value": 1.0, "Purchase": 0.0, "Sales": 0.0, "Net Fund": 2.0, "Units": 3.0, "NAV": 4.0}
+        for day in (date(2024, 2, 1), date(2024, 2, 2))
+    ]
+    pd.testing.assert_frame_equal(buffer.to_frame(), pd.DataFrame(expected))
+
+
+def test_last_row():
+    empty = SalesPurchaseBuffer()
+    assert empty.empty
+    assert empty.last_row() is None
+    assert list(empty.to_frame().columns) == SALES_PURCHASE_COLUMNS
+
+    seeded = SalesPurchaseBuffer(_seed())
+    assert not seeded.empty
+    assert seeded.last_row() == _seed().iloc[-1].to_dict()
+    pd.testing.assert_frame_equal(seeded.to_frame(), _seed())
+
+    rows = _rows(3)
+    for row in rows:
+        seeded.append(row)
+    assert seeded.last_row() == rows[-1]
@@ -0,0 +1,89 @@
+"""
+TransactionRecorder against the one-row concat per transaction it replaces
+"""
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.sell_purchase_track_util import (
+    TransactionRecorder, check_and_create_sell_purchase_track_df, enter_purchase_track, enter_sell_track
+)
+
+# (kind, purchase date, sell date, broker, file, symbol, price, quantity)
+TRANSACTIONS = [
+    ("buy", date(2024, 1, 2), None, "Zerodha", "F1", "AAA", 100.5, 10),
+    ("buy", date(2024, 1, 3), None, "HDFC", None, "BBB", 20.0, 3),
+    ("sell", date(2024, 1, 2), date(2024, 1, 10), "Zerodha", "F1", "AAA", 120.25, 10),
+    ("sell", pd.NaT, date(2024, 1, 11), "HDFC", "F2", "CCC", 7.0, 4),
+    ("buy", date(2024, 1, 12), None, "unknown", "F1", "AAA", 99.0, 1),
+]
+
+
+def _concat(seed):
+    """Rows built the way the old enter_*_track functions built them"""
+    df = seed
+    for kind, purchase_date, sell_date, broker, file, symbol, price, quantity in TRANSACTIONS:
+        df = pd.concat([df, pd.DataFrame({
+            'Purchase Date': [purchase_date],
+            'Sell Date': [sell_date],
+            'Broker': [broker],
+            'File': [file],
+            'Stock Symbol': [symbol],
+            'Purchase Price': [price if kind == "buy" else None],
+            'Sell Price': [price if kind == "sell" else None],
+            'Quantity': [quantity],
+        })], ignore_index=True)
+    return df
+
+
+def _record(recorder):
+    for kind, purchase_date, sell_date, broker, file, symbol, price, quantity in TRANSACTIONS:
+        if kind == "buy":
+            recorder.record_purchase(purchase_date, broker, file, symbol, price, quantity)
+        else:
+            recorder.record_sell(purchase_date, sell_date, broker, file, symbol, price, quantity)
+    return recorder
+
+
+def _saved_log():
+    return pd.DataFrame([{
+        'Purchase Date': "2023-12-01", 'Sell Date': None, 'Broker': "Zerodha", 'File': "F1",
+        'Stock Symbol': "AAA", 'Purchase Price': 90.0, 'Sell Price': None, 'Quantity': 2,
+    }])
+
+
+def test_recorder_matches_concat():
+    recorder = _record(TransactionRecorder())
+    assert len(recorder) == len(TRANSACTIONS)
+    pd.testing.assert_frame_equal(recorder.to_frame(), _concat(check_and_create_sell_purchase_track_df()),
+                                  check_dtype=False)
+
+
+def test_recorder_appends_to_a_saved_log():
+    recorder = _record(TransactionRecorder(_saved_log()))
+    assert len(recorder) == len(TRANSACTIONS) + 1
+    pd.testing.assert_frame_equal(recorder.to_frame(), _concat(_saved_log()), check_dtype=False)
+
+
+def test_empty_recorder_returns_the_saved_log():
+    pd.testing.assert_frame_equal(TransactionRecorder(_saved_log()).to_frame(), _saved_log())
+
+
+def test_enter_functions_accept_a_frame_or_a_recorder():
+    df = check_and_create_sell_purchase_track_df()
+    recorder = TransactionRecorder()
+    for kind, purchase_date, sell_date, broker, file, symbol, price, quantity in TRANSACTIONS:
+        if kind == "buy":
+            df = enter_purchase_track(df, purchase_date, broker, file, symbol, price, quantity)
+            assert enter_purchase_track(recorder, purchase_date, broker, file, symbol, price, quantity) is recorder
+        else:
+            df = enter_sell_track(df, purchase_date, sell_date, broker, file, symbol, price, quantity)
+            assert enter_sell_track(recorder, purchase_date, sell_date, broker, file, symbol, price, quantity) is recorder
+
+    expected = _concat(check_and_create_sell_purchase_track_df())
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(recorder.to_frame(), expected, check_dtype=False)
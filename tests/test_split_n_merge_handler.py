@@ -0,0 +1,97 @@
+"""
+Face value parsing: precompiled patterns and column-wise extraction against the per-row parser
+"""
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.split_n_merge_handler import extract_face_value_columns, extract_face_values, is_face_value_action
+
+
+def _reference_extract(text):
+    """extract_face_values as it was, with inline patterns and chained replaces"""
+    clean_text = text.replace("/-", "").replace("/", "").replace("-", " ")
+    clean_text = clean_text.replace(".", " ")
+
+    match = re.search(r"(?:from|frm)\s+[^0-9]*([0-9]+)[^0-9]+to\s+[^0-9]*([0-9]+)", clean_text, flags=re.IGNORECASE)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+
+    match = re.search(r"rs?\s*\.?\s*([0-9]+)[^0-9]+to\s+rs?|re\s*\.?\s*([0-9]+)", clean_text, flags=re.IGNORECASE)
+    if match:
+        nums = [g for g in match.groups() if g]
+        if len(nums) == 2:
+            return int(nums[0]), int(nums[1])
+
+    match = re.search(r"(?:rs|re)\s*([0-9]+)\s*.*?\s*to\s*(?:rs|re)\s*([0-9]+)", clean_text, flags=re.IGNORECASE)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+
+    return None, None
+
+
+DOCUMENTED = [
+    ("Face Value Split From Rs. 10 To Rs. 2/-", (10, 2)),
+    ("Face Value Split (Sub Division) - From Rs 10/- Per Share To Re 1/- Per Share", (10, 1)),
+    ("Consolidation Of Equity Shares From Re 1 Per Share To Rs 10 Per Share", (1, 10)),
+    ("Fv Splt Frm Rs 10 To Re 1", (10, 1)),
+    ("Fv Splt Frm Rs 10 To Rs 2", (10, 2)),
+    ("Fv Split Rs.10/- To Rs.2/", (10, 2)),
+]
+
+OTHER_PURPOSES = [
+    "Dividend - Rs 5 Per Share",
+    "Bonus 1:1",
+    "Annual General Meeting/Dividend - Rs 2.50 Per Share",
+    "Stock Split",
+    "FV SPLIT FROM RS-5/- TO RE-1/-",
+    "Rights 1:4 @ Premium Rs 90/-",
+    "Consolidation Of Shares",
+]
+
+
+@pytest.mark.parametrize("text, expected", DOCUMENTED)
+def test_documented_examples(text, expected):
+    assert extract_face_values(text) == expected
+    assert is_face_value_action(text)
+
+
+@pytest.mark.parametrize("text", [text for text, _ in DOCUMENTED] + OTHER_PURPOSES)
+def test_matches_the_inline_patterns(text):
+    assert extract_face_values(text) == _reference_extract(text)
+
+
+def test_face_value_actions():
+    assert is_face_value_action("Fv Splt Frm Rs 10 To Re 1")
+    assert is_face_value_action("Consolidation Of Shares")
+    assert not is_face_value_action("Dividend - Rs 5 Per Share")
+    assert not is_face_value_action("Bonus 1:1")
+
+
+def test_columns_match_per_row_parsing():
+    # Repeated texts and missing PURPOSE cells, as in a real export
+    purposes = [text for text, _ in DOCUMENTED] + OTHER_PURPOSES
+    purposes = purposes + purposes[::2] + [None, np.nan]
+
+    from_values, to_values = extract_face_value_columns(purposes)
+
+    assert from_values.dtype == float and to_values.dtype == float
+    for purpose, from_value, to_value in zip(purposes, from_values, to_values):
+        if not isinstance(purpose, str) or not is_face_value_action(purpose):
+            assert np.isnan(from_value) and np.isnan(to_value)
+            continue
+        expected = _reference_extract(purpose)
+        np.testing.assert_array_equal([from_value, to_value], np.array(expected, dtype=float))
+
+
+def test_columns_accept_a_series():
+    purposes = pd.Series(["Fv Split Rs.10/- To Rs.2/", "Bonus 1:1"], index=[7, 3])
+    from_values, to_values = extract_face_value_columns(purposes)
+    np.testing.assert_array_equal(from_values, [10.0, np.nan])
+    np.testing.assert_array_equal(to_values, [2.0, np.nan])
@@ -0,0 +1,186 @@
+"""
+SymbolMap against the per-day dict map_symbols used to build, and the lazy SymbolChangeRegistry
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Utils.symbol_change_handler as symbol_change_handler
+from Utils.symbol_change_handler import SymbolChangeRegistry, map_symbols
+
+# name, old symbol, new symbol, date: a chain, two changes on one day, a change
+# on the first day of the range, one after it, a no-op and one before it
+CHANGES = [
+    ("Acme", "ACME", "ACMEIND", "2024-01-10"),
+    ("Acme", "ACMEIND", "ACMENEW", "2024-02-05"),
+    ("Beta", "BETA", "BETALTD", "2024-02-05"),
+    ("Gamma", "GAMMA", "GAMMAX", "2024-01-01"),
+    ("Delta", "DELTA", "DELTA2", "2024-04-01"),
+    ("Omega", "OMEGA", "OMEGA", "2024-01-20"),
+    ("Old", "OLDCO", "OLDCO2", "2023-06-01"),
+]
+
+TICKERS = ["ACMENEW.NS", "BETALTD.NS", "GAMMAX.NS", "DELTA2.NS", "OLDCO2.NS", "ACMENEW.BO"]
+
+
+def _write_changes(path, rows):
+    pd.DataFrame(rows).to_csv(path, header=False, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def changes_file(tmp_path, monkeypatch):
+    path = _write_changes(tmp_path / "symbolchange.csv", CHANGES)
+    monkeypatch.setattr(symbol_change_handler, "_registry", SymbolChangeRegistry(path))
+    return path
+
+
+def _reference(symbol_list, start, end, path):
+    """The day-by-day walk map_symbols used to do"""
+    df = pd.read_csv(path, encoding="latin1", header=None)
+    df.columns = ["name", "old_symbol", "new_symbol", "date"]
+    df = df[df["old_symbol"] != df["new_symbol"]].copy()
+    df["date"] = pd.to_datetime(df["date"])
+
+    start_date, end_date = pd.Timestamp(start), pd.Timestamp(end)
+    current_date = max(df["date"].max(), end_date)
+    date_to_symbols = {}
+    updated_symbols = symbol_list[:]
+    while current_date >= start_date:
+        if start_date <= current_date <= end_date:
+            date_to_symbols[current_date.strftime("%Y-%m-%d")] = updated_symbols[:]
+        for _, row in df[df["date"] == current_date].iterrows():
+            updated_symbols = [
+                row["old_symbol"] + '.NS' if symbol == (row["new_symbol"] + '.NS') else symbol
+                for symbol in updated_symbols
+            ]
+        current_date -= timedelta(days=1)
+    return date_to_symbols
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-01-01", "2024-03-31"),
+    ("2023-12-15", "2024-01-31"),
+    ("2024-02-05", "2024-02-05"),
+    ("2024-05-01", "2024-05-31"),
+])
+def test_matches_the_per_day_dict(changes_file, start, end):
+    symbol_map = map_symbols(TICKERS, start, end)
+    expected = _reference(TICKERS, start, end, changes_file)
+
+    assert symbol_map.keys() == sorted(expected)
+    assert len(symbol_map) == len(expected)
+    for date_str, symbols in expected.items():
+        assert date_str in symbol_map
+        assert symbol_map[date_str] == symbols
+
+
+def test_dates_outside_the_range(changes_file):
+    symbol_map = map_symbols(TICKERS, "2024-01-01", "2024-01-31")
+    for missing in ("2023-12-31", "2024-02-01", "not a date", None):
+        assert missing not in symbol_map
+    with pytest.raises(KeyError):
+        symbol_map["2024-02-01"]
+
+
+def test_intervals_per_ticker(changes_file):
+    symbol_map = map_symbols(TICKERS, "2024-01-01", "2024-03-31")
+
+    assert symbol_map.intervals["ACMENEW.NS"] == [
+        (date(2024, 1, 1), date(2024, 1, 9), "ACME.NS"),
+        (date(2024, 1, 10), date(2024, 2, 4), "ACMEIND.NS"),
+        (date(2024, 2, 5), date(2024, 3, 31), "ACMENEW.NS"),
+    ]
+    # Renamed on the first day of the range; not renamed yet at its end
+    assert symbol_map.intervals["GAMMAX.NS"] == [(date(2024, 1, 1), date(2024, 3, 31), "GAMMAX.NS")]
+    assert symbol_map.intervals["DELTA2.NS"] == [(date(2024, 1, 1), date(2024, 3, 31), "DELTA.NS")]
+    # Only NSE tickers are renamed
+    assert symbol_map.intervals["ACMENEW.BO"] == [(date(2024, 1, 1), date(2024, 3, 31), "ACMENEW.BO")]
+
+
+def test_empty_range(changes_file):
+    symbol_map = map_symbols(TICKERS, "2024-02-01", "2024-01-31")
+    assert len(symbol_map) == 0
+    assert symbol_map.keys() == []
+    assert "2024-02-01" not in symbol_map
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Paths read through pd.read_csv"""
+    read_paths = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(path, *args, **kwargs):
+        read_paths.append(path)
+        return read_csv(path, *args, **kwargs)
+
+    monkeypatch.setattr(symbol_change_handler.pd, "read_csv", counting_read_csv)
+    return read_paths
+
+
+def test_registry_reads_lazily_and_once(tmp_path, reads):
+    path = _write_changes(tmp_path / "symbolchange.csv", CHANGES)
+    registry = SymbolChangeRegistry(path)
+    assert reads == []
+
+    registry.latest_symbol("ACME")
+    registry.changes_after(date(2024, 1, 1))
+    registry.latest_symbol("BETA")
+    assert reads == [path]
+
+    # A missing file is only noticed on first use
+    SymbolChangeRegistry(str(tmp_path / "missing.csv"))
+
+
+def test_registry_reloads_a_changed_file(tmp_path, reads):
+    path = _write_changes(tmp_path / "symbolchange.csv", CHANGES)
+    registry = SymbolChangeRegistry(path)
+    assert registry.latest_symbol("DELTA") == "DELTA2"
+
+    _write_changes(path, CHANGES + [("Delta", "DELTA2", "DELTA3", "2024-06-01")])
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+
+    assert registry.latest_symbol("DELTA") == "DELTA3"
+    assert len(reads) == 2
+
+
+def test_changes_after_groups_by_date(tmp_path):
+    registry = SymbolChangeRegistry(_write_changes(tmp_path / "symbolchange.csv", CHANGES))
+
+    assert registry.changes_after(date(2024, 1, 1)) == [
+        (date(2024, 1, 10), [("ACME", "ACMEIND")]),
+        (date(2024, 2, 5), [("ACMEIND", "ACMENEW"), ("BETA", "BETALTD")]),
+        (date(2024, 4, 1), [("DELTA", "DELTA2")]),
+    ]
+    assert registry.changes_after(date(2024, 4, 1)) == []
+    # The no-op row is dropped
+    assert all(old != new for _, changes in registry.changes_after(date(2000, 1, 1)) for old, new in changes)
+
+
+def test_latest_symbol_follows_chains(tmp_path):
+    registry = SymbolChangeRegistry(_write_changes(tmp_path / "symbolchange.csv", CHANGES))
+
+    assert registry.latest_symbol("ACME") == "ACMENEW"
+    assert registry.latest_symbol("ACMEIND") == "ACMENEW"
+    assert registry.latest_symbol("ACMENEW") == "ACMENEW"
+    assert registry.latest_symbol("OMEGA") == "OMEGA"
+    assert registry.latest_symbol("UNLISTED") == "UNLISTED"
+
+
+def test_reused_symbol_follows_its_last_company(tmp_path):
+    registry = SymbolChangeRegistry(_write_changes(tmp_path / "symbolchange.csv", [
+        ("First", "AAA", "BBB", "2023-01-02"),
+        ("Second", "CCC", "AAA", "2023-06-01"),
+        ("Second", "AAA", "DDD", "2024-03-01"),
+    ]))
+
+    assert registry.latest_symbol("AAA") == "DDD"
+    assert registry.latest_symbol("CCC") == "DDD"
+    assert registry.latest_symbol("BBB") == "BBB"